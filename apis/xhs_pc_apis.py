@@ -4,8 +4,11 @@ import re
 import urllib
 import requests
 import time
+from http.cookiejar import DefaultCookiePolicy
 from retry import retry
+from requests.adapters import HTTPAdapter
 from requests.exceptions import ConnectionError, Timeout, RequestException
+from urllib3.util.retry import Retry
 from xhs_utils.xhs_util import splice_str, generate_request_params, generate_x_b3_traceid, get_common_headers
 from loguru import logger
 
@@ -28,10 +31,27 @@ API_CODE_RATE_LIMITED = 300013        # 访问频次异常
 class XHS_Apis():
     def __init__(self):
         self.base_url = "https://edith.xiaohongshu.com"
+        self.session = self._create_session()
 
     @staticmethod
+    def _create_session():
+        """
+        创建复用连接的Session：同一实例的所有请求共享连接池（keep-alive），省去重复的TLS握手
+
+        Cookie由每个请求显式传入（Cookie池会切换账号），Session本身不保存服务端下发的Cookie
+        """
+        session = requests.Session()
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        adapter = HTTPAdapter(
+            pool_connections=50, pool_maxsize=50,
+            max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504], raise_on_status=False)
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
     @retry(exceptions=(ConnectionError, Timeout), tries=3, delay=2, backoff=2, logger=logger)
-    def _request_with_retry(method, url, **kwargs):
+    def _request_with_retry(self, method, url, **kwargs):
         """
         带重试机制的HTTP请求
 
@@ -42,9 +62,9 @@ class XHS_Apis():
         """
         try:
             if method.upper() == 'GET':
-                response = requests.get(url, **kwargs)
+                response = self.session.get(url, **kwargs)
             else:
-                response = requests.post(url, **kwargs)
+                response = self.session.post(url, **kwargs)
             return response
         except (ConnectionError, Timeout) as e:
             logger.warning(f"网络请求失败，正在重试: {e}")
@@ -82,7 +102,7 @@ class XHS_Apis():
         try:
             api = "/api/sns/web/v1/homefeed/category"
             headers, cookies, data = generate_request_params(cookies_str, api)
-            response = requests.get(self.base_url + api, headers=headers, cookies=cookies, proxies=proxies)
+            response = self.session.get(self.base_url + api, headers=headers, cookies=cookies, proxies=proxies)
             res_json = response.json()
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
@@ -122,7 +142,7 @@ class XHS_Apis():
                 "need_filter_image": False
             }
             headers, cookies, trans_data = generate_request_params(cookies_str, api, data)
-            response = requests.post(self.base_url + api, headers=headers, data=trans_data, cookies=cookies, proxies=proxies)
+            response = self.session.post(self.base_url + api, headers=headers, data=trans_data, cookies=cookies, proxies=proxies)
             res_json = response.json()
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
@@ -176,7 +196,7 @@ class XHS_Apis():
             }
             splice_api = splice_str(api, params)
             headers, cookies, data = generate_request_params(cookies_str, splice_api)
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
+            response = self.session.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
             res_json = response.json()
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
@@ -194,7 +214,7 @@ class XHS_Apis():
         try:
             api = f"/api/sns/web/v1/user/selfinfo"
             headers, cookies, data = generate_request_params(cookies_str, api)
-            response = requests.get(self.base_url + api, headers=headers, cookies=cookies, proxies=proxies)
+            response = self.session.get(self.base_url + api, headers=headers, cookies=cookies, proxies=proxies)
             res_json = response.json()
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
@@ -213,7 +233,7 @@ class XHS_Apis():
         try:
             api = f"/api/sns/web/v2/user/me"
             headers, cookies, data = generate_request_params(cookies_str, api)
-            response = requests.get(self.base_url + api, headers=headers, cookies=cookies, proxies=proxies)
+            response = self.session.get(self.base_url + api, headers=headers, cookies=cookies, proxies=proxies)
             res_json = response.json()
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
@@ -242,7 +262,7 @@ class XHS_Apis():
             }
             splice_api = splice_str(api, params)
             headers, cookies, data = generate_request_params(cookies_str, splice_api)
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
+            response = self.session.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
             res_json = response.json()
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
@@ -304,7 +324,7 @@ class XHS_Apis():
             }
             splice_api = splice_str(api, params)
             headers, cookies, data = generate_request_params(cookies_str, splice_api)
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
+            response = self.session.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
             res_json = response.json()
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
@@ -366,7 +386,7 @@ class XHS_Apis():
             }
             splice_api = splice_str(api, params)
             headers, cookies, data = generate_request_params(cookies_str, splice_api)
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
+            response = self.session.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
             res_json = response.json()
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
@@ -460,7 +480,7 @@ class XHS_Apis():
             }
             splice_api = splice_str(api, params)
             headers, cookies, data = generate_request_params(cookies_str, splice_api)
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
+            response = self.session.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
             res_json = response.json()
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
@@ -567,7 +587,7 @@ class XHS_Apis():
                 ]
             }
             headers, cookies, data = generate_request_params(cookies_str, api, data)
-            response = requests.post(self.base_url + api, headers=headers, data=data.encode('utf-8'), cookies=cookies, proxies=proxies)
+            response = self.session.post(self.base_url + api, headers=headers, data=data.encode('utf-8'), cookies=cookies, proxies=proxies)
             res_json = response.json()
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
@@ -632,7 +652,7 @@ class XHS_Apis():
                 }
             }
             headers, cookies, data = generate_request_params(cookies_str, api, data)
-            response = requests.post(self.base_url + api, headers=headers, data=data.encode('utf-8'), cookies=cookies, proxies=proxies)
+            response = self.session.post(self.base_url + api, headers=headers, data=data.encode('utf-8'), cookies=cookies, proxies=proxies)
             res_json = response.json()
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
@@ -691,13 +711,13 @@ class XHS_Apis():
             headers, cookies, data = generate_request_params(cookies_str, splice_api)
 
             # 添加详细的调试日志
-            logger.debug(f"评论API请求URL: {self.base_url + splice_api}")
-            logger.debug(f"请求参数: note_id={note_id}, cursor={cursor}, xsec_token={xsec_token[:20]}...")
+            logger.debug("评论API请求URL: {}{}", self.base_url, splice_api)
+            logger.debug("请求参数: note_id={}, cursor={}, xsec_token={}...", note_id, cursor, xsec_token[:20])
 
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
+            response = self.session.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
 
             # 记录响应状态
-            logger.debug(f"HTTP状态码: {response.status_code}")
+            logger.debug("HTTP状态码: {}", response.status_code)
 
             res_json = response.json()
             success, msg = res_json["success"], res_json["msg"]
@@ -800,7 +820,7 @@ class XHS_Apis():
             }
             splice_api = splice_str(api, params)
             headers, cookies, data = generate_request_params(cookies_str, splice_api)
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
+            response = self.session.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
             res_json = response.json()
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
@@ -829,7 +849,7 @@ class XHS_Apis():
             
             # 如果没有子评论，直接返回
             if sub_comment_count == 0:
-                logger.debug(f"评论 {comment['id']} 没有{level}级评论")
+                logger.debug("评论 {} 没有{}级评论", comment['id'], level)
                 return True, 'success', comment
 
             # 检查当前已有的子评论数量是否等于预期数量
@@ -837,7 +857,7 @@ class XHS_Apis():
 
             # 如果数量已经完整（当前数≥预期数），直接递归处理
             if current_count >= sub_comment_count:
-                logger.debug(f"评论 {comment['id']} 的{level}级评论已完整（{current_count}/{sub_comment_count}）")
+                logger.debug("评论 {} 的{}级评论已完整（{}/{}）", comment['id'], level, current_count, sub_comment_count)
                 # 递归处理已有的子评论
                 for sub_comment in comment['sub_comments']:
                     self.get_note_all_inner_comment(sub_comment, xsec_token, cookies_str, proxies, level + 1)
@@ -859,7 +879,7 @@ class XHS_Apis():
                     # 分页获取子评论
                     while True:
                         page += 1
-                        logger.debug(f"获取评论 {comment['id']} 的第 {page} 页{level}级评论")
+                        logger.debug("获取评论 {} 的第 {} 页{}级评论", comment['id'], page, level)
                         success, msg, res_json = self.get_note_inner_comment(comment, cursor, xsec_token, cookies_str, proxies)
 
                         if not success:
@@ -887,7 +907,7 @@ class XHS_Apis():
                         # 提取评论
                         comments = res_json["data"]["comments"]
                         inner_comment_list.extend(comments)
-                        logger.debug(f"  成功获取 {len(comments)} 条子评论")
+                        logger.debug("  成功获取 {} 条子评论", len(comments))
 
                         # 检查分页
                         if 'cursor' in res_json["data"]:
@@ -970,7 +990,7 @@ class XHS_Apis():
                 sub_comment_count = int(sub_comment_count) if sub_comment_count.isdigit() else 0
 
             if sub_comment_count == 0:
-                logger.debug(f"评论 {comment['id']} 没有{level}级评论")
+                logger.debug("评论 {} 没有{}级评论", comment['id'], level)
                 return True, 'success', comment
 
             # 检查当前已有的子评论数量是否等于预期数量
@@ -978,7 +998,7 @@ class XHS_Apis():
 
             # 如果数量已经完整（当前数≥预期数），直接递归处理
             if current_count >= sub_comment_count:
-                logger.debug(f"评论 {comment['id']} 的{level}级评论已完整（{current_count}/{sub_comment_count}）")
+                logger.debug("评论 {} 的{}级评论已完整（{}/{}）", comment['id'], level, current_count, sub_comment_count)
                 # 递归处理已有的子评论
                 for sub_comment in comment['sub_comments']:
                     self.get_note_all_inner_comment_with_provider(
@@ -1011,7 +1031,7 @@ class XHS_Apis():
                     # 分页获取子评论
                     while True:
                         page += 1
-                        logger.debug(f"获取评论 {comment['id']} 的第 {page} 页{level}级评论")
+                        logger.debug("获取评论 {} 的第 {} 页{}级评论", comment['id'], page, level)
 
                         # 请求子评论
                         success, msg, res_json = self.get_note_inner_comment(
@@ -1047,7 +1067,7 @@ class XHS_Apis():
                         # 提取评论
                         comments = res_json["data"]["comments"]
                         inner_comment_list.extend(comments)
-                        logger.debug(f"  成功获取 {len(comments)} 条子评论")
+                        logger.debug("  成功获取 {} 条子评论", len(comments))
 
                         # 增量保存：立即保存每条获取到的子评论
                         if save_callback:
@@ -1186,7 +1206,7 @@ class XHS_Apis():
         try:
             api = "/api/sns/web/unread_count"
             headers, cookies, data = generate_request_params(cookies_str, api)
-            response = requests.get(self.base_url + api, headers=headers, cookies=cookies, proxies=proxies)
+            response = self.session.get(self.base_url + api, headers=headers, cookies=cookies, proxies=proxies)
             res_json = response.json()
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
@@ -1210,7 +1230,7 @@ class XHS_Apis():
             }
             splice_api = splice_str(api, params)
             headers, cookies, data = generate_request_params(cookies_str, splice_api)
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
+            response = self.session.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
             res_json = response.json()
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
@@ -1260,7 +1280,7 @@ class XHS_Apis():
             }
             splice_api = splice_str(api, params)
             headers, cookies, data = generate_request_params(cookies_str, splice_api)
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
+            response = self.session.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
             res_json = response.json()
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
@@ -1310,7 +1330,7 @@ class XHS_Apis():
             }
             splice_api = splice_str(api, params)
             headers, cookies, data = generate_request_params(cookies_str, splice_api)
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
+            response = self.session.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
             res_json = response.json()
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
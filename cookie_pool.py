@@ -11,11 +11,44 @@ import time
 import random
 import threading
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 from pathlib import Path
 from loguru import logger
 import hashlib
 
+
+class RateLimiter:
+    """令牌桶限流器：允许短时突发，长期请求速率不超过rate"""
+
+    def __init__(self, rate: float = 2.0, burst: int = 5):
+        """
+        初始化限流器
+
+        Args:
+            rate: 每秒补充的令牌数（长期平均请求速率）
+            burst: 令牌桶容量（允许的最大突发请求数）
+        """
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """获取一个令牌，令牌不足时阻塞等待"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            wait_time = (1 - self.tokens) / self.rate
+            # 预先扣除本次令牌，等待期间其他线程会排在后面
+            self.tokens -= 1
+        time.sleep(wait_time)
+
+
 class CookieAccount:
     """单个Cookie账号"""
     
@@ -45,6 +78,7 @@ class CookieAccount:
         # 冷却控制
         self.cooldown_until = None  # 冷却结束时间
         self.min_interval = 3  # 最小使用间隔(秒)
+        self.limiter = RateLimiter(rate=2.0, burst=5)  # 请求级限流（令牌桶）
         
         # 统计信息
         self.success_count = 0  # 成功次数
@@ -167,7 +201,7 @@ class CookiePool:
         """
         self.config_file = config_file
         self.accounts: Dict[str, CookieAccount] = {}
-        self.lock = threading.Lock()
+        self.lock = threading.RLock()  # 可重入：add_account等持锁时还会调用save_config
         
         # 轮换策略
         self.strategy = "round_robin"  # round_robin, random, least_used
@@ -210,34 +244,35 @@ class CookiePool:
     
     def save_config(self):
         """保存配置文件"""
-        try:
-            config = {
-                'strategy': self.strategy,
-                'accounts': []
-            }
+        with self.lock:
+            try:
+                config = {
+                    'strategy': self.strategy,
+                    'accounts': []
+                }
             
-            for account in self.accounts.values():
-                config['accounts'].append({
-                    'cookie_str': account.cookie_str,
-                    'name': account.name,
-                    'remark': account.remark,
-                    'is_active': account.is_active,
-                    'use_count': account.use_count,
-                    'success_count': account.success_count,
-                    'fail_count': account.fail_count,
-                    'error_count': account.error_count,
-                    'total_notes': account.total_notes,
-                    'daily_limit': account.daily_limit,
-                    'min_interval': account.min_interval
-                })
+                for account in self.accounts.values():
+                    config['accounts'].append({
+                        'cookie_str': account.cookie_str,
+                        'name': account.name,
+                        'remark': account.remark,
+                        'is_active': account.is_active,
+                        'use_count': account.use_count,
+                        'success_count': account.success_count,
+                        'fail_count': account.fail_count,
+                        'error_count': account.error_count,
+                        'total_notes': account.total_notes,
+                        'daily_limit': account.daily_limit,
+                        'min_interval': account.min_interval
+                    })
             
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(config, f, ensure_ascii=False, indent=2)
+                with open(self.config_file, 'w', encoding='utf-8') as f:
+                    json.dump(config, f, ensure_ascii=False, indent=2)
                 
-            logger.info("配置已保存")
+                logger.info("配置已保存")
             
-        except Exception as e:
-            logger.error(f"保存配置文件失败: {e}")
+            except Exception as e:
+                logger.error(f"保存配置文件失败: {e}")
     
     def add_account(self, cookie_str: str, name: str = None, remark: str = "") -> bool:
         """
@@ -307,6 +342,66 @@ class CookiePool:
             logger.info(f"选择账号: {selected.name} (今日第 {selected.daily_use_count} 次)")
             return selected
     
+    def try_use_account(self, account: CookieAccount) -> bool:
+        """
+        尝试继续使用指定账号（粘性复用时调用），可用则标记使用
+        
+        Returns:
+            账号当前是否可用
+        """
+        with self.lock:
+            can_use, reason = account.can_use()
+            if can_use:
+                account.use()
+            else:
+                logger.debug(f"账号 {account.name} 不可用: {reason}")
+            return can_use
+
+    def round_robin_available(self) -> Iterator[Optional[CookieAccount]]:
+        """
+        按轮换策略逐个产出可用账号，每个账号最多产出一次
+
+        近期出错较多的账号（error_count较大）排在后面，只有前面的账号都失败时才会用到；
+        暂时不可用（冷却中/请求过快）的账号留到下一轮再检查；
+        某一轮一个可用账号都没有时产出None，由调用方决定等待还是放弃
+        
+        Yields:
+            已标记使用的账号对象，或None（本轮无可用账号）
+        """
+        with self.lock:
+            accounts = list(self.accounts.values())
+            if self.strategy == "random":
+                random.shuffle(accounts)
+            elif self.strategy == "least_used":
+                accounts.sort(key=lambda x: x.daily_use_count)
+            elif accounts:  # round_robin：从上次使用的下一个开始
+                start = (self.last_used_index + 1) % len(accounts)
+                accounts = accounts[start:] + accounts[:start]
+            # 按错误次数降级（稳定排序，错误次数相同的账号保持上面的轮换顺序）
+            accounts.sort(key=lambda x: x.error_count)
+            positions = {account.cookie_id: idx for idx, account in enumerate(self.accounts.values())}
+
+        remaining = accounts
+        while remaining:
+            deferred = []
+            yielded = False
+            for account in remaining:
+                with self.lock:
+                    can_use, reason = account.can_use()
+                    if can_use:
+                        account.use()
+                        self.last_used_index = positions.get(account.cookie_id, self.last_used_index)
+                if not can_use:
+                    logger.debug(f"账号 {account.name} 不可用: {reason}")
+                    deferred.append(account)
+                    continue
+                yielded = True
+                logger.info(f"选择账号: {account.name} (今日第 {account.daily_use_count} 次)")
+                yield account
+            remaining = deferred
+            if remaining and not yielded:
+                yield None
+
     def mark_account_success(self, cookie_id: str, notes_count: int = 1):
         """标记账号成功"""
         if cookie_id in self.accounts:
@@ -340,16 +435,37 @@ class CookiePool:
             self.save_config()
             logger.info(f"轮换策略已设置为: {strategy}")
     
+    def _reset_inplace(self, cookie_id: str) -> bool:
+        """重置账号状态（只改内存，不保存配置）"""
+        account = self.accounts.get(cookie_id)
+        if account is None:
+            return False
+        account.is_active = True
+        account.error_count = 0
+        account.cooldown_until = None
+        account.daily_use_count = 0
+        logger.info(f"账号 {account.name} 已重置")
+        return True
+
     def reset_account(self, cookie_id: str):
         """重置账号状态"""
-        if cookie_id in self.accounts:
-            account = self.accounts[cookie_id]
-            account.is_active = True
-            account.error_count = 0
-            account.cooldown_until = None
-            account.daily_use_count = 0
+        with self.lock:
+            if self._reset_inplace(cookie_id):
+                self.save_config()
+
+    def reset_all_accounts(self) -> int:
+        """
+        重置所有账号状态，全部重置后只保存一次配置
+        
+        Returns:
+            重置的账号数量
+        """
+        with self.lock:
+            cookie_ids = list(self.accounts)
+            for cookie_id in cookie_ids:
+                self._reset_inplace(cookie_id)
             self.save_config()
-            logger.info(f"账号 {account.name} 已重置")
+        return len(cookie_ids)
     
     def update_account_settings(self, cookie_id: str, daily_limit: int = None, min_interval: int = None):
         """更新账号设置"""
@@ -364,14 +480,23 @@ class CookiePool:
             return True
         return False
     
+    def bulk_update(self, **fields):
+        """
+        批量修改所有账号的属性，全部修改完成后只保存一次配置
+        
+        Args:
+            fields: 账号属性名到新值的映射，值为None的字段会被忽略
+        """
+        fields = {k: v for k, v in fields.items() if v is not None}
+        with self.lock:
+            for account in self.accounts.values():
+                for name, value in fields.items():
+                    setattr(account, name, value)
+            self.save_config()
+
     def update_all_settings(self, daily_limit: int = None, min_interval: int = None):
         """批量更新所有账号设置"""
-        for account in self.accounts.values():
-            if daily_limit is not None:
-                account.daily_limit = daily_limit
-            if min_interval is not None:
-                account.min_interval = min_interval
-        self.save_config()
+        self.bulk_update(daily_limit=daily_limit, min_interval=min_interval)
         logger.info(f"所有账号设置已更新: 每日限制={daily_limit}, 最小间隔={min_interval}")
     
     def batch_add_from_file(self, file_path: str) -> int:
@@ -422,13 +547,10 @@ cookie_pool = CookiePool()
 def initialize_pool_from_env():
     """从.env文件初始化号池"""
     try:
-        from dotenv import load_dotenv
-        import os
-        
-        load_dotenv()
+        from xhs_utils.common_util import load_env
         
-        # 尝试从环境变量加载多个Cookie
-        cookies_str = os.getenv('COOKIES', '')
+        # 尝试从环境变量加载多个Cookie（.env只解析一次）
+        cookies_str = load_env() or ''
         if cookies_str:
             # 支持多个Cookie，用双换行符分隔
             cookies_list = cookies_str.split('\n\n')
@@ -6,14 +6,49 @@
 
 import json
 import os
+import queue
+import random
+import ijson
+import threading
 import time
-import traceback
+from urllib.parse import urlparse, parse_qs
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from loguru import logger
 from apis.xhs_pc_apis import XHS_Apis
 from xhs_utils.common_util import init
 from xhs_utils.data_util import handle_note_info, download_note, handle_comment_info
-from progress_manager import ProgressManager
+from progress_manager import ProgressManager, note_id_from_url, note_list_key
+
+try:
+    import orjson
+except ImportError:  # orjson为可选依赖，缺失时退回标准库json
+    orjson = None
+
+# Cookie池无可用账号时的退避参数（秒）：base * 2^轮数 + 抖动，上限为MAX
+RETRY_BACKOFF_BASE = 0.5
+RETRY_BACKOFF_MAX = 30
+
+# 媒体文件下载线程数（与笔记处理线程池相互独立）
+MEDIA_DOWNLOAD_WORKERS = 8
+
+# 源JSON小于该大小时整体读入用orjson解析，更大的文件用ijson流式解析以控制内存
+SOURCE_FAST_LOAD_MAX_BYTES = 64 * 1024 * 1024
+
+# 后台导出线程池：Excel等收尾工作不阻塞下一批笔记/文件的抓取
+_POST_POOL = ThreadPoolExecutor(max_workers=2)
+
+# 每个笔记开始处理时打印的进度横幅
+_SEP = '=' * 60
+_PROGRESS_TMPL = (
+    f"\n{_SEP}\n"
+    "[{i}/{tot}] 总进度: {c}/{k} ({pct:.1f}%)\n"
+    "成功: {c} | 失败: {f} | 剩余: {p} | 预计剩余时间: {eta}\n"
+    f"{_SEP}"
+)
+
+# parse_comment_count 用：去掉数量单位（万/w/W）和空白
+_COUNT_UNIT_TRANS = str.maketrans('', '', 'wW万 \t')
 
 
 def parse_comment_count(count_str):
@@ -29,36 +64,287 @@ def parse_comment_count(count_str):
     :param count_str: 评论数量字符串或整数
     :return: 整数形式的评论数量
     """
+    if isinstance(count_str, int):
+        return count_str
+    if not isinstance(count_str, str):
+        return 0
+
     try:
-        # 如果已经是整数，直接返回
-        if isinstance(count_str, int):
-            return count_str
+        # 一次translate去掉单位和空白，按是否带单位决定倍数
+        count_str = count_str.strip()
+        multiplier = 10000 if ('万' in count_str or 'w' in count_str or 'W' in count_str) else 1
+        return int(float(count_str.translate(_COUNT_UNIT_TRANS)) * multiplier)
+    except Exception as e:
+        logger.warning(f"解析评论数量失败: {count_str}, 错误: {e}")
+        return 0
 
-        # 如果是字符串，进行解析
-        if isinstance(count_str, str):
-            count_str = count_str.strip()
 
-            # 处理包含"万"的情况
-            if '万' in count_str:
-                num_str = count_str.replace('万', '').strip()
-                return int(float(num_str) * 10000)
+# 获取评论阶段才会写入的笔记字段，序列化时统一拼接在末尾（与原先逐次写入时的顺序一致）
+NOTE_TAIL_FIELDS = ('comments_file', 'comments')
 
-            # 处理包含"w"或"W"的情况
-            elif 'w' in count_str.lower():
-                num_str = count_str.replace('w', '').replace('W', '').strip()
-                return int(float(num_str) * 10000)
+# comment_count 会在获取评论后改写，先用占位符占住它在笔记中的原位置
+_COMMENT_COUNT_PLACEHOLDER = '\x00comment_count\x00'
 
-            # 纯数字字符串
-            else:
-                return int(count_str)
 
-        # 其他类型返回0
-        return 0
-    except Exception as e:
-        logger.warning(f"解析评论数量失败: {count_str}, 错误: {e}")
+def _serialize_note_base(note: dict) -> tuple:
+    """
+    笔记正文只序列化一次，comment_count 的位置以占位符切开，写文件时再填入实际值
+
+    :param note: 笔记信息
+    :return: (占位符之前的文本, 是否找到占位符, 占位符之后的文本)
+    """
+    base = {k: v for k, v in note.items() if k not in NOTE_TAIL_FIELDS}
+    if 'comment_count' in base:
+        base['comment_count'] = _COMMENT_COUNT_PLACEHOLDER
+    text = _dumps_bytes(base, indent=True).decode('utf-8')
+    # JSON字符串中的引号都会被转义，带引号的占位符只可能是comment_count的值本身
+    return text.partition(_dumps_bytes(_COMMENT_COUNT_PLACEHOLDER).decode('utf-8'))
+
+
+def _render_note_json(base_parts: tuple, comment_count, tail: dict) -> str:
+    """
+    用序列化好的笔记正文拼出完整JSON文本，字段顺序与直接序列化整个笔记相同
+
+    :param base_parts: _serialize_note_base 的返回值
+    :param comment_count: 写入的评论数量
+    :param tail: 需要追加在末尾的字段
+    :return: JSON文本
+    """
+    head, found, rest = base_parts
+    text = head + _dumps_bytes(comment_count).decode('utf-8') + rest if found else head
+    return _splice_json_tail(text, tail)
+
+
+def _splice_json_tail(base_text: str, tail: dict) -> str:
+    """
+    将tail中的字段拼接到已序列化的JSON对象末尾，避免重复序列化整个笔记
+
+    :param base_text: _dumps_bytes(..., indent=True) 解码得到的非空JSON对象文本
+    :param tail: 需要追加的字段
+    :return: 合并后的JSON文本
+    """
+    if not tail:
+        return base_text
+    tail_text = _dumps_bytes(tail, indent=True).decode('utf-8')
+    # base_text 以 "\n}" 结尾，tail_text 以 "{\n" 开头
+    return base_text[:-2] + ',\n' + tail_text[2:]
+
+
+def _dumps_bytes(obj, indent: bool = False) -> bytes:
+    """
+    序列化为UTF-8字节，优先使用orjson
+
+    :param obj: 要序列化的对象
+    :param indent: 是否缩进2格
+    :return: JSON字节串
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, option=option)
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None).encode('utf-8')
+
+
+def _fast_load_json(file_path: str):
+    """
+    读取整个JSON文件，优先使用orjson（直接解析字节，不经过文本解码）
+
+    :param file_path: JSON文件路径
+    :return: 解析后的对象
+    """
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _iter_jsonl(file_path: str):
+    """逐行读取JSONL文件，每次产出一条记录"""
+    loads = orjson.loads if orjson is not None else json.loads
+    with open(file_path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                yield loads(line)
+
+
+def _note_summary_stub(note: dict) -> dict:
+    """
+    汇总中只记录笔记的索引信息，完整内容在 note_{id}_full.json 中
+
+    :param note: 笔记完整信息
+    :return: {note_id, title, comment_count, file}
+    """
+    return {
+        'note_id': note.get('note_id'),
+        'title': note.get('title'),
+        'comment_count': note.get('comment_count', 0),
+        'file': f"note_{note.get('note_id')}_full.json"
+    }
+
+
+# Excel表头对应的笔记字段，顺序与 handle_note_info 的返回值一致（save_to_xlsx按位置写列）
+NOTE_XLSX_FIELDS = (
+    'note_id', 'note_url', 'note_type', 'user_id', 'home_url', 'nickname', 'avatar',
+    'title', 'desc', 'liked_count', 'collected_count', 'comment_count', 'share_count',
+    'video_cover', 'video_addr', 'image_list', 'tags', 'upload_time', 'ip_location',
+)
+
+
+def _iter_full_notes(output_dir: str, successful_file: str):
+    """按汇总索引逐个读取笔记完整信息文件，表头字段按固定顺序排在前面，其余字段保持原顺序"""
+    for stub in _iter_jsonl(successful_file):
+        note = _fast_load_json(os.path.join(output_dir, stub['file']))
+        yield {**{k: note.get(k, '') for k in NOTE_XLSX_FIELDS}, **note}
+
+
+def _write_summary_json(summary_file: str, process_info: dict, successful_file: str, failed_file: str):
+    """
+    流式生成汇总JSON：笔记记录直接从JSONL逐行拷贝，不在内存中汇总
+
+    :param summary_file: 汇总JSON文件路径
+    :param process_info: 处理信息
+    :param successful_file: 成功笔记的JSONL文件
+    :param failed_file: 失败笔记的JSONL文件
+    """
+    with open(summary_file, 'wb') as out:
+        out.write(b'{\n  "process_info": ')
+        out.write(_dumps_bytes(process_info, indent=True).replace(b'\n', b'\n  '))
+        for key, jsonl_file in (('successful_notes', successful_file), ('failed_notes', failed_file)):
+            out.write(f',\n  "{key}": ['.encode('utf-8'))
+            first = True
+            with open(jsonl_file, 'rb') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    out.write(b'\n    ' if first else b',\n    ')
+                    out.write(line)
+                    first = False
+            out.write(b']' if first else b'\n  ]')
+        out.write(b'\n}\n')
+
+
+class _CommentWriter:
+    """
+    评论文件的后台写线程：抓取线程只负责把评论序列化后放入有界队列，
+    由写线程批量追加到文件，网络请求与磁盘写入互相重叠
+    """
+
+    def __init__(self, fd: int, maxsize: int = 1024, batch_size: int = 256):
+        """
+        :param fd: 以O_APPEND打开的文件描述符
+        :param maxsize: 队列容量（写入跟不上时抓取线程会在put处等待）
+        :param batch_size: 每次最多合并写入的行数
+        """
+        self.fd = fd
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.error = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def put(self, line: bytes):
+        """放入一行已编码的评论"""
+        self.queue.put(line)
+
+    def flush(self):
+        """等待已放入的评论全部写入文件，写入出错时抛出异常"""
+        self.queue.join()
+        if self.error:
+            raise self.error
+
+    def close(self):
+        """写完剩余评论后结束写线程"""
+        self.queue.put(None)
+        self.thread.join()
+
+    def _run(self):
+        while True:
+            items = [self.queue.get()]
+            try:
+                while len(items) < self.batch_size:
+                    items.append(self.queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            lines = [item for item in items if item is not None]
+            try:
+                if lines and self.error is None:
+                    view = memoryview(b''.join(lines))
+                    while view:
+                        view = view[os.write(self.fd, view):]
+            except OSError as e:
+                self.error = e
+                logger.error(f"写入评论文件失败: {e}")
+            finally:
+                for _ in items:
+                    self.queue.task_done()
+
+            if len(lines) != len(items):
+                return
+
+
+def _coerce_str_count(value):
+    """字符串形式的子评论数转整数，非数字返回0"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
         return 0
 
 
+def _coerce_int_count(value):
+    """整数形式的子评论数，缺失时返回0"""
+    return value or 0
+
+
+def build_note_ref(note):
+    """
+    将笔记数据或URL统一为 {'url', 'note_id', 'xsec_token'}，URL只解析一次
+
+    :param note: 笔记URL字符串，或包含note_url / note_id+xsec_token的笔记数据
+    :return: 笔记引用字典，无法确定URL时返回None
+    """
+    if isinstance(note, str):
+        note = {'note_url': note}
+    elif 'url' in note and 'note_url' not in note:
+        note = {'note_url': note['url'], **note}
+
+    if note.get('note_url'):
+        url = note['note_url']
+        parsed = urlparse(url)
+        xsec_token = parse_qs(parsed.query).get('xsec_token', [''])[0]
+        # 与进度管理器使用同一套ID提取规则，非 /explore/ 链接退回取路径最后一段
+        note_id = note_id_from_url(url) or parsed.path.rstrip('/').split('/')[-1]
+        return {'url': url, 'note_id': note_id, 'xsec_token': xsec_token}
+
+    if note.get('note_id') and note.get('xsec_token'):
+        # 根据note_id和xsec_token构建URL
+        url = f"https://www.xiaohongshu.com/explore/{note['note_id']}?xsec_token={note['xsec_token']}"
+        return {'url': url, 'note_id': note['note_id'], 'xsec_token': note['xsec_token']}
+
+    return None
+
+
+def build_note_refs(notes):
+    """
+    批量构建笔记引用
+    缺少xsec_token的笔记仍保留在列表中：处理时 get_note_full_info 不发请求直接返回失败，
+    笔记会记入失败列表和进度，用户能看到原因
+
+    :param notes: 笔记数据（或URL）的可迭代对象
+    :return: 笔记引用列表
+    """
+    note_refs = []
+    for note in notes:
+        ref = build_note_ref(note)
+        if ref is None:
+            continue
+        if not ref['xsec_token']:
+            logger.warning(f"⚠️ 笔记缺少xsec_token，将记为失败: {ref['url']}")
+        note_refs.append(ref)
+    return note_refs
+
+
 class JsonToFullData:
     """
     解析JSON文件并获取完整笔记信息的类
@@ -73,34 +359,37 @@ class JsonToFullData:
         self.xhs_apis = XHS_Apis()
         self.cookie_pool = cookie_pool
         self.progress_manager = None  # 将在process时初始化
+        self.post_futures = []  # 提交到后台导出线程池的任务（defer_excel=True时）
         
     def parse_json_file(self, json_file_path: str):
         """
-        解析JSON文件，提取笔记URL列表
+        解析JSON文件，提取笔记引用列表
         
         :param json_file_path: JSON文件路径
-        :return: 成功状态, 消息, 笔记URL列表
+        :return: 成功状态, 消息, 笔记引用列表（{'url', 'note_id', 'xsec_token'}）
         """
         try:
-            with open(json_file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            if 'notes' not in data:
-                return False, 'JSON文件格式错误，缺少notes字段', []
-            
-            notes = data['notes']
-            note_urls = []
-            
-            for note in notes:
-                if 'note_url' in note:
-                    note_urls.append(note['note_url'])
-                elif 'note_id' in note and 'xsec_token' in note:
-                    # 根据note_id和xsec_token构建URL
-                    note_url = f"https://www.xiaohongshu.com/explore/{note['note_id']}?xsec_token={note['xsec_token']}"
-                    note_urls.append(note_url)
-            
-            logger.info(f'从 {json_file_path} 解析出 {len(note_urls)} 个笔记URL')
-            return True, f'成功解析 {len(note_urls)} 个笔记URL', note_urls
+            if orjson is not None and os.path.getsize(json_file_path) <= SOURCE_FAST_LOAD_MAX_BYTES:
+                # 常见大小的搜索结果直接整体解析，orjson比逐项流式解析快得多
+                data = _fast_load_json(json_file_path)
+                if not isinstance(data, dict) or data.get('notes') is None:
+                    return False, 'JSON文件格式错误，缺少notes字段', []
+                note_refs = build_note_refs(data['notes'])
+                logger.info(f'从 {json_file_path} 解析出 {len(note_refs)} 个笔记URL')
+                return True, f'成功解析 {len(note_refs)} 个笔记URL', note_refs
+
+            # 超大文件：流式解析notes数组，逐条提取URL，避免把整个文件加载进内存
+            with open(json_file_path, 'rb') as f:
+                note_refs = build_note_refs(ijson.items(f, 'notes.item'))
+
+                if not note_refs:
+                    # 区分"notes为空"和"缺少notes字段"
+                    f.seek(0)
+                    if next(ijson.items(f, 'notes'), None) is None:
+                        return False, 'JSON文件格式错误，缺少notes字段', []
+
+            logger.info(f'从 {json_file_path} 解析出 {len(note_refs)} 个笔记URL')
+            return True, f'成功解析 {len(note_refs)} 个笔记URL', note_refs
 
         except Exception as e:
             error_msg = f'解析JSON文件失败: {str(e)}'
@@ -128,7 +417,6 @@ class JsonToFullData:
             else:
                 return False, "未提供Cookie且Cookie池不可用", None, None
 
-        tried_cookie_ids = set()  # 记录已尝试的Cookie ID
         total_accounts = len(self.cookie_pool.accounts)
 
         if total_accounts == 0:
@@ -137,39 +425,32 @@ class JsonToFullData:
 
         logger.info(f"Cookie池共有 {total_accounts} 个账号可供重试")
 
+        tried_count = 0  # 已尝试的账号数
         wait_rounds = 0  # 等待轮数计数器
         max_wait_rounds = 10  # 最大等待轮数（增加到10轮）
 
-        while len(tried_cookie_ids) < total_accounts:
-            # 获取可用账号
-            account = self.cookie_pool.get_available_account()
-
-            if not account:
-                # 如果没有可用账号，检查是否所有账号都已尝试过
-                if len(tried_cookie_ids) >= total_accounts:
-                    logger.error("所有Cookie账号均已尝试")
-                    break
-
-                # 如果还有未尝试的账号，但暂时都不可用（可能在冷却中）
+        # 轮询迭代器保证每个账号最多尝试一次
+        for account in self.cookie_pool.round_robin_available():
+            if account is None:
+                # 还有未尝试的账号，但暂时都不可用（可能在冷却中）
                 if wait_rounds < max_wait_rounds:
+                    # 指数退避+随机抖动，避免多个任务同时醒来再次触发限流
+                    wait_time = min(RETRY_BACKOFF_MAX,
+                                    RETRY_BACKOFF_BASE * (2 ** wait_rounds) + random.random() * RETRY_BACKOFF_BASE)
                     wait_rounds += 1
-                    # 等待时间递增：5秒起步，每轮+1秒，最多10秒
-                    wait_time = min(5 + wait_rounds - 1, 10)
-                    logger.warning(f"所有账号暂时不可用，等待 {wait_time} 秒后重试 (第 {wait_rounds}/{max_wait_rounds} 轮)")
+                    logger.warning(f"所有账号暂时不可用，等待 {wait_time:.1f} 秒后重试 (第 {wait_rounds}/{max_wait_rounds} 轮)")
                     time.sleep(wait_time)
                     continue
                 else:
                     logger.error(f"等待 {max_wait_rounds} 轮后仍无可用账号")
                     break
 
-            # 跳过已尝试的Cookie
-            if account.cookie_id in tried_cookie_ids:
-                continue
-
-            tried_cookie_ids.add(account.cookie_id)
-            logger.info(f"尝试Cookie账号: {account.name} ({len(tried_cookie_ids)}/{total_accounts})")
+            tried_count += 1
+            logger.info(f"尝试Cookie账号: {account.name} ({tried_count}/{total_accounts})")
 
             try:
+                # 按账号令牌桶限流，代替固定的请求间隔
+                account.limiter.acquire()
                 # 调用API，传入Cookie
                 success, msg, data = api_func(*args, cookies_str=account.cookie_str, **kwargs)
 
@@ -189,6 +470,29 @@ class JsonToFullData:
         logger.error(f"所有 {total_accounts} 个Cookie账号均已尝试失败")
         return False, f"所有Cookie账号({total_accounts}个)均失败", None, None
 
+    def call_with_sticky_account(self, sticky_account, api_func, *args, **kwargs):
+        """
+        优先使用上一次成功的账号调用API，失败或不可用时才回退到Cookie池全遍历
+
+        :param sticky_account: 上一次请求成功的账号（可为None）
+        :param api_func: 要调用的API方法
+        :return: success, msg, data, account（使用的账号）
+        """
+        if sticky_account is not None and self.cookie_pool and self.cookie_pool.try_use_account(sticky_account):
+            try:
+                sticky_account.limiter.acquire()
+                success, msg, data = api_func(*args, cookies_str=sticky_account.cookie_str, **kwargs)
+                if success:
+                    self.cookie_pool.mark_account_success(sticky_account.cookie_id)
+                    return success, msg, data, sticky_account
+                self.cookie_pool.mark_account_error(sticky_account.cookie_id, msg)
+                logger.warning(f"❌ Cookie {sticky_account.name} 失败: {msg}，切换到Cookie池轮换")
+            except Exception as e:
+                self.cookie_pool.mark_account_error(sticky_account.cookie_id, str(e))
+                logger.warning(f"❌ Cookie {sticky_account.name} 异常: {e}，切换到Cookie池轮换")
+
+        return self.get_with_cookie_pool_retry(api_func, *args, **kwargs)
+
     def save_comments_streaming(self, note_id: str, xsec_token: str, output_file: str,
                                 expected_comment_count: int = 0, cookies_str: str = None,
                                 proxies: dict = None):
@@ -208,13 +512,13 @@ class JsonToFullData:
         resume_page = 0
         resume_total = 0
 
-        if self.progress_manager:
-            note_progress = self.progress_manager.get_note_progress(note_id)
-            comments_progress = note_progress.get('comments', {})
+        # 整个笔记期间复用同一个进度句柄，更新直接写入该笔记的进度字典
+        progress = self.progress_manager.open_note(note_id) if self.progress_manager else None
 
-            if comments_progress.get('last_cursor'):
-                resume_cursor = comments_progress['last_cursor']
-                resume_total = comments_progress.get('total_fetched', 0)
+        if progress:
+            if progress.last_cursor:
+                resume_cursor = progress.last_cursor
+                resume_total = progress.total_fetched
                 resume_page = resume_total // 10  # 假设每页10条
                 logger.info(f"🔄 检测到评论断点，从第 {resume_page + 1} 页继续（已有{resume_total}条）")
 
@@ -223,290 +527,264 @@ class JsonToFullData:
         total_comments = resume_total
 
         # ========== 设置预期评论总数 ==========
-        if self.progress_manager and expected_comment_count > 0:
+        if progress and expected_comment_count > 0:
             logger.info(f"📊 设置预期评论总数: {expected_comment_count:,}")
-            self.progress_manager.update_comments_progress(
-                note_id=note_id,
-                total_expected=expected_comment_count
-            )
+            progress.total_expected = expected_comment_count
 
-        # 创建或追加评论文件
-        file_mode = 'a' if resume_total > 0 else 'w'
-        if file_mode == 'w':
-            # 首次获取，清空文件
-            with open(output_file, 'w', encoding='utf-8') as f:
-                pass
+        # 创建或追加评论文件（首次获取时清空文件），整个笔记期间只打开一次
+        # 直接使用O_APPEND的原始文件描述符，由后台写线程批量追加
+        open_flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT
+        if resume_total <= 0:
+            open_flags |= os.O_TRUNC
+        comments_fd = os.open(output_file, open_flags, 0o644)
+        writer = _CommentWriter(comments_fd)
 
-        logger.info(f"开始流式获取评论: note_id={note_id} (从cursor={cursor[:20] if cursor else '开头'})")
+        def write_comment(comment_data):
+            """序列化一条评论并交给写线程"""
+            writer.put(_dumps_bytes(comment_data) + b'\n')
 
-        while True:
-            page += 1
-            # 保存当前页的cursor（用于断点续传）
-            current_page_cursor = cursor
+        # 每条评论都要补充的固定字段，整个笔记期间不变，用dict.update一次合并
+        comment_meta = {'note_id': note_id}
+        level1_meta = {'note_id': note_id, '_level': 1, '_parent_id': ''}  # 一级评论无父级
 
-            # 计算进度百分比（如果有预期数量）
-            progress_info = ""
-            if expected_comment_count > 0 and total_comments > 0:
-                progress_pct = (total_comments / expected_comment_count) * 100
-                progress_info = f" | 进度: {total_comments:,}/{expected_comment_count:,} ({progress_pct:.1f}%)"
+        def flush_pending():
+            """等待写线程把已提交的评论全部写入文件（每页结束及退出时调用）"""
+            writer.flush()
 
-            logger.info(f"📄 正在获取第 {page} 页一级评论{progress_info}")
+        has_expected = expected_comment_count > 0
+        # 同一笔记的翻页沿用上一次成功的账号，只在失败时重新轮换
+        sticky_account = None
 
-            # ========== 实时更新当前页数 ==========
-            if self.progress_manager:
-                self.progress_manager.update_comments_progress(
-                    note_id=note_id,
-                    current_page=page
-                )
+        logger.info(f"开始流式获取评论: note_id={note_id} (从cursor={cursor[:20] if cursor else '开头'})")
 
-            # 使用Cookie池全遍历重试
-            success, msg, res_json, account = self.get_with_cookie_pool_retry(
-                self.xhs_apis.get_note_out_comment,
-                note_id, cursor, xsec_token,
-                proxies=proxies
-            )
+        try:
+            while True:
+                page += 1
+                # 保存当前页的cursor（用于断点续传）
+                current_page_cursor = cursor
+
+                # 计算进度百分比（如果有预期数量）
+                progress_info = ""
+                if has_expected and total_comments > 0:
+                    progress_pct = (total_comments / expected_comment_count) * 100
+                    progress_info = f" | 进度: {total_comments:,}/{expected_comment_count:,} ({progress_pct:.1f}%)"
+
+                logger.info(f"📄 正在获取第 {page} 页一级评论{progress_info}")
+
+                # ========== 实时更新当前页数 ==========
+                if progress:
+                    progress.current_page = page
+
+                # 优先沿用上一页的账号，失败时使用Cookie池全遍历重试
+                success, msg, res_json, account = self.call_with_sticky_account(
+                    sticky_account,
+                    self.xhs_apis.get_note_out_comment,
+                    note_id, cursor, xsec_token,
+                    proxies=proxies
+                )
+                if account is not None:
+                    sticky_account = account
 
-            if not success:
-                error_msg = f"第 {page} 页获取失败（所有Cookie已尝试）: {msg}"
-                logger.error(error_msg)
-                # ========== 记录错误到进度 ==========
-                if self.progress_manager:
-                    self.progress_manager.update_comments_progress(
-                        note_id=note_id,
-                        error=error_msg
-                    )
-                break
-
-            # 检查返回数据结构
-            if not res_json or 'data' not in res_json:
-                warning_msg = f"第 {page} 页返回数据异常，停止获取"
-                logger.warning(warning_msg)
-                # ========== 记录警告到进度 ==========
-                if self.progress_manager:
-                    self.progress_manager.update_comments_progress(
-                        note_id=note_id,
-                        warning=warning_msg
-                    )
-                break
-
-            data = res_json.get('data', {})
-
-            # 检查是否有comments字段
-            if 'comments' not in data:
-                warning_msg = f"第 {page} 页返回data中没有comments字段"
-                logger.warning(warning_msg)
-                logger.debug(f"返回数据: {res_json}")
-
-                # 如果是第1页且data为空，很可能是xsec_token过期
-                if page == 1 and data == {}:
-                    error_msg = "xsec_token已过期或Cookie权限不足，评论API返回空数据"
-                    logger.error("=" * 60)
-                    logger.error("❌ 评论API返回空数据，可能原因：")
-                    logger.error("   1. xsec_token已过期（最常见）")
-                    logger.error("   2. Cookie权限不足")
-                    logger.error("   3. 笔记评论被限制或已删除")
-                    logger.error("")
-                    logger.error("💡 解决方案：")
-                    logger.error("   • 方案A: 重新搜索该关键词，获取新的笔记URL")
-                    logger.error("   • 方案B: 浏览器访问笔记页面，复制新URL（包含最新xsec_token）")
-                    logger.error("   • 方案C: 更新Cookie池中的Cookie")
-                    logger.error("=" * 60)
+                if not success:
+                    error_msg = f"第 {page} 页获取失败（所有Cookie已尝试）: {msg}"
+                    logger.error(error_msg)
                     # ========== 记录错误到进度 ==========
-                    if self.progress_manager:
-                        self.progress_manager.update_comments_progress(
-                            note_id=note_id,
-                            error=error_msg
-                        )
-                else:
+                    if progress:
+                        progress.add_error(error_msg)
+                    break
+
+                # 检查返回数据结构
+                if not res_json or 'data' not in res_json:
+                    warning_msg = f"第 {page} 页返回数据异常，停止获取"
+                    logger.warning(warning_msg)
                     # ========== 记录警告到进度 ==========
-                    if self.progress_manager:
-                        self.progress_manager.update_comments_progress(
-                            note_id=note_id,
-                            warning=warning_msg
-                        )
-                break
-
-            comments = data['comments']
-            has_more = data.get('has_more', False)
-
-            # ✅ 增量保存评论（每获取一条就立即保存）
-            if comments:
-                logger.info(f"第 {page} 页获取到 {len(comments)} 条一级评论，开始增量获取并保存所有层级的子评论...")
-
-                # 定义Cookie提供函数
-                def get_cookie_for_comment():
-                    """为评论获取提供Cookie（支持Cookie池和单Cookie）"""
-                    # 优先使用当前请求的account（Cookie池）
-                    if account and account.cookie_str:
-                        return True, account.cookie_str
-                    # 其次尝试从Cookie池获取新账号
-                    elif self.cookie_pool:
-                        temp_account = self.cookie_pool.get_available_account()
-                        if temp_account:
-                            return True, temp_account.cookie_str
-                    # 最后使用提供的cookies_str（单Cookie模式）
-                    elif cookies_str:
-                        return True, cookies_str
-                    # 都没有则返回失败
-                    logger.error("❌ 无可用Cookie：既没有Cookie池也没有提供cookies_str参数")
-                    return False, None
-
-                # 创建增量保存回调函数（每获取一条子评论就立即保存）
-                page_saved_count = 0  # 本页已保存的评论计数（包括子评论）
-                last_progress_update = 0  # 上次更新进度时的评论数
-
-                def save_comment_callback(comment_data, level):
-                    """
-                    增量保存单条评论的回调函数（增强版：实时更新进度）
-                    :param comment_data: 评论数据（已包含_level和_parent_id）
-                    :param level: 评论层级
-                    """
-                    nonlocal page_saved_count, total_comments, last_progress_update
-                    try:
-                        # 添加note_id字段
-                        comment_data['note_id'] = note_id
+                    if progress:
+                        progress.add_warning(warning_msg)
+                    break
 
-                        # 立即追加到JSONL文件
-                        with open(output_file, 'a', encoding='utf-8') as f:
-                            f.write(json.dumps(comment_data, ensure_ascii=False) + '\n')
-                            f.flush()  # 立即刷新到磁盘
+                data = res_json.get('data', {})
+
+                # 检查是否有comments字段
+                if 'comments' not in data:
+                    warning_msg = f"第 {page} 页返回data中没有comments字段"
+                    logger.warning(warning_msg)
+                    logger.debug("返回数据: {}", res_json)
+
+                    # 如果是第1页且data为空，很可能是xsec_token过期
+                    if page == 1 and data == {}:
+                        error_msg = "xsec_token已过期或Cookie权限不足，评论API返回空数据"
+                        logger.error("=" * 60)
+                        logger.error("❌ 评论API返回空数据，可能原因：")
+                        logger.error("   1. xsec_token已过期（最常见）")
+                        logger.error("   2. Cookie权限不足")
+                        logger.error("   3. 笔记评论被限制或已删除")
+                        logger.error("")
+                        logger.error("💡 解决方案：")
+                        logger.error("   • 方案A: 重新搜索该关键词，获取新的笔记URL")
+                        logger.error("   • 方案B: 浏览器访问笔记页面，复制新URL（包含最新xsec_token）")
+                        logger.error("   • 方案C: 更新Cookie池中的Cookie")
+                        logger.error("=" * 60)
+                        # ========== 记录错误到进度 ==========
+                        if progress:
+                            progress.add_error(error_msg)
+                    else:
+                        # ========== 记录警告到进度 ==========
+                        if progress:
+                            progress.add_warning(warning_msg)
+                    break
 
-                        page_saved_count += 1
-                        total_comments += 1
+                comments = data['comments']
+                has_more = data.get('has_more', False)
+
+                # ✅ 增量保存评论（每获取一条就立即保存）
+                if comments:
+                    logger.info(f"第 {page} 页获取到 {len(comments)} 条一级评论，开始增量获取并保存所有层级的子评论...")
+
+                    # 定义Cookie提供函数
+                    def get_cookie_for_comment():
+                        """为评论获取提供Cookie（支持Cookie池和单Cookie）"""
+                        # 优先使用本笔记粘性复用的account（Cookie池）
+                        if sticky_account and sticky_account.cookie_str:
+                            return True, sticky_account.cookie_str
+                        # 其次尝试从Cookie池获取新账号
+                        elif self.cookie_pool:
+                            temp_account = self.cookie_pool.get_available_account()
+                            if temp_account:
+                                return True, temp_account.cookie_str
+                        # 最后使用提供的cookies_str（单Cookie模式）
+                        elif cookies_str:
+                            return True, cookies_str
+                        # 都没有则返回失败
+                        logger.error("❌ 无可用Cookie：既没有Cookie池也没有提供cookies_str参数")
+                        return False, None
+
+                    # 创建增量保存回调函数（每获取一条子评论就立即保存）
+                    page_saved_count = 0  # 本页已保存的评论计数（包括子评论）
+
+                    def save_comment_callback(comment_data, level):
+                        """
+                        增量保存单条评论的回调函数（增强版：实时更新进度）
+                        :param comment_data: 评论数据（已包含_level和_parent_id）
+                        :param level: 评论层级
+                        """
+                        nonlocal page_saved_count, total_comments
+                        try:
+                            # 添加note_id字段
+                            comment_data.update(comment_meta)
 
-                        # ========== ✅ 每50条更新一次进度（实时性） ==========
-                        if self.progress_manager and (total_comments - last_progress_update) >= 50:
-                            self.progress_manager.update_comments_progress(
-                                note_id=note_id,
-                                total_fetched=total_comments,
-                                current_page=page
-                            )
-                            last_progress_update = total_comments
-                            logger.debug(f"    🔄 实时进度已更新: {total_comments:,} 条评论")
+                            # 追加到JSONL文件（缓冲写入，每页结束时刷盘）
+                            write_comment(comment_data)
 
-                        # 每100条打印一次进度
-                        if page_saved_count % 100 == 0:
-                            logger.debug(f"    已增量保存 {page_saved_count} 条评论（累计: {total_comments:,}）")
-                    except Exception as e:
-                        logger.warning(f"    保存评论失败: {e}")
+                            page_saved_count += 1
+                            total_comments += 1
 
-                # 处理每条一级评论，获取所有层级的子评论
-                for idx, comment in enumerate(comments, 1):
-                    # 先保存一级评论本身
-                    comment['note_id'] = note_id
-                    comment['_level'] = 1  # 一级评论
-                    comment['_parent_id'] = ''  # 一级评论无父级
+                            # 每100条打印一次进度
+                            if page_saved_count % 100 == 0:
+                                logger.debug("    已增量保存 {} 条评论（累计: {:,}）", page_saved_count, total_comments)
+                        except Exception as e:
+                            logger.warning(f"    保存评论失败: {e}")
 
-                    with open(output_file, 'a', encoding='utf-8') as f:
-                        f.write(json.dumps(comment, ensure_ascii=False) + '\n')
-                        f.flush()
+                    # 同一页的sub_comment_count类型一致，按第一条评论选定转换函数
+                    first_sub_count = comments[0].get('sub_comment_count')
+                    coerce_count = _coerce_str_count if isinstance(first_sub_count, str) else _coerce_int_count
 
-                    page_saved_count += 1
-                    total_comments += 1
+                    # 处理每条一级评论，获取所有层级的子评论
+                    n_comments = len(comments)
+                    for idx, comment in enumerate(comments, 1):
+                        # 先保存一级评论本身
+                        comment.update(level1_meta)
 
-                    # 检查是否有子评论
-                    sub_count = comment.get('sub_comment_count', 0)
-                    logger.debug(f"  [{idx}/{len(comments)}] 评论 {comment.get('id', 'N/A')[:20]}, sub_comment_count={sub_count}")
+                        write_comment(comment)
 
-                    if isinstance(sub_count, str):
-                        sub_count = int(sub_count) if sub_count.isdigit() else 0
+                        page_saved_count += 1
+                        total_comments += 1
 
-                    if sub_count > 0:
-                        logger.info(f"  💬 [{idx}/{len(comments)}] 评论ID: {comment.get('id', 'N/A')[:16]}... | 预期子评论: {sub_count:,} 条")
+                        # 检查是否有子评论
+                        sub_count = coerce_count(comment.get('sub_comment_count', 0))
+                        logger.debug("  [{}/{}] 评论 {}, sub_comment_count={}", idx, n_comments, comment.get('id', 'N/A')[:20], sub_count)
 
-                        try:
-                            # 使用新方法获取所有层级的子评论，传入保存回调
-                            sub_start_time = time.time()
-                            success, msg, full_comment = self.xhs_apis.get_note_all_inner_comment_with_provider(
-                                comment, xsec_token, get_cookie_for_comment, proxies,
-                                level=2, max_level=10,  # 最多支持10层评论
-                                save_callback=save_comment_callback  # ✅ 传入增量保存回调
-                            )
-                            sub_elapsed = time.time() - sub_start_time
-
-                            if success:
-                                actual_sub_count = len(full_comment.get('sub_comments', []))
-                                logger.info(f"  ✅ 子评论获取完成 | 实际获取: {actual_sub_count:,} 条 | 耗时: {sub_elapsed:.1f}秒")
-
-                                # 如果实际获取数少于预期，发出警告
-                                if actual_sub_count < sub_count * 0.9:  # 允许10%的误差
-                                    warning_msg = f"子评论数量不足：预期{sub_count}条，实际{actual_sub_count}条 ({actual_sub_count/sub_count*100:.1f}%)"
-                                    logger.warning(f"  ⚠️ {warning_msg}")
-                                    if self.progress_manager:
-                                        self.progress_manager.update_comments_progress(
-                                            note_id=note_id,
-                                            warning=warning_msg
-                                        )
-                            else:
-                                warning_msg = f"子评论获取失败: {msg}"
-                                logger.warning(f"  ❌ {warning_msg}")
-                                # ========== 记录警告到进度 ==========
-                                if self.progress_manager:
-                                    self.progress_manager.update_comments_progress(
-                                        note_id=note_id,
-                                        warning=warning_msg
-                                    )
+                        if sub_count > 0:
+                            logger.info(f"  💬 [{idx}/{n_comments}] 评论ID: {comment.get('id', 'N/A')[:16]}... | 预期子评论: {sub_count:,} 条")
 
-                        except Exception as e:
-                            warning_msg = f"处理评论异常: {e}"
-                            logger.warning(f"  ⚠️ {warning_msg}，继续处理下一条")
-                            # ========== 记录警告到进度 ==========
-                            if self.progress_manager:
-                                self.progress_manager.update_comments_progress(
-                                    note_id=note_id,
-                                    warning=warning_msg
+                            try:
+                                # 使用新方法获取所有层级的子评论，传入保存回调
+                                sub_start_time = time.time()
+                                success, msg, full_comment = self.xhs_apis.get_note_all_inner_comment_with_provider(
+                                    comment, xsec_token, get_cookie_for_comment, proxies,
+                                    level=2, max_level=10,  # 最多支持10层评论
+                                    save_callback=save_comment_callback  # ✅ 传入增量保存回调
                                 )
+                                sub_elapsed = time.time() - sub_start_time
+
+                                if success:
+                                    actual_sub_count = len(full_comment.get('sub_comments', []))
+                                    logger.info(f"  ✅ 子评论获取完成 | 实际获取: {actual_sub_count:,} 条 | 耗时: {sub_elapsed:.1f}秒")
+
+                                    # 如果实际获取数少于预期，发出警告
+                                    if actual_sub_count < sub_count * 0.9:  # 允许10%的误差
+                                        warning_msg = f"子评论数量不足：预期{sub_count}条，实际{actual_sub_count}条 ({actual_sub_count/sub_count*100:.1f}%)"
+                                        logger.warning(f"  ⚠️ {warning_msg}")
+                                        if progress:
+                                            progress.add_warning(warning_msg)
+                                else:
+                                    warning_msg = f"子评论获取失败: {msg}"
+                                    logger.warning(f"  ❌ {warning_msg}")
+                                    # ========== 记录警告到进度 ==========
+                                    if progress:
+                                        progress.add_warning(warning_msg)
 
-                logger.info(f"✅ 第 {page} 页已增量保存 {page_saved_count} 条评论（累计: {total_comments}）")
-            else:
-                logger.info(f"第 {page} 页没有评论数据，停止获取")
-                break
-
-            # 检查是否还有更多
-            if not has_more:
-                logger.info(f"has_more为False，评论获取完成")
-                # 标记评论获取完成，保存最后状态
-                if self.progress_manager:
-                    self.progress_manager.update_comments_progress(
-                        note_id=note_id,
-                        total_fetched=total_comments,
-                        last_cursor=cursor,  # 保存当前cursor（已经是最后一页了）
-                        completed=True
-                    )
-                break
-
-            # 获取下一页cursor
-            if 'cursor' in data:
-                next_cursor = str(data['cursor'])
-                logger.debug(f"下一页cursor: {next_cursor}")
-
-                # ========== 更新评论进度（支持断点续传）==========
-                # 重要：在成功处理完当前页后，保存下一页的cursor
-                # 这样断点续传时，会从下一页开始，不会重复也不会丢失数据
-                if self.progress_manager:
-                    self.progress_manager.update_comments_progress(
-                        note_id=note_id,
-                        total_fetched=total_comments,
-                        last_cursor=next_cursor,  # ✅ 保存下一页的cursor作为断点
-                        current_page=page
-                    )
+                            except Exception as e:
+                                warning_msg = f"处理评论异常: {e}"
+                                logger.warning(f"  ⚠️ {warning_msg}，继续处理下一条")
+                                # ========== 记录警告到进度 ==========
+                                if progress:
+                                    progress.add_warning(warning_msg)
 
-                # 更新cursor为下一页
-                cursor = next_cursor
-            else:
-                logger.info("没有cursor字段，评论获取完成")
-                # 标记评论获取完成，保存最后状态
-                if self.progress_manager:
-                    self.progress_manager.update_comments_progress(
-                        note_id=note_id,
-                        total_fetched=total_comments,
-                        last_cursor=cursor,  # 保存最后一个cursor
-                        completed=True
-                    )
-                break
+                    # 每页结束时刷盘，保证之后记录的断点cursor与文件内容一致
+                    flush_pending()
+                    logger.info(f"✅ 第 {page} 页已增量保存 {page_saved_count} 条评论（累计: {total_comments}）")
+                else:
+                    logger.info(f"第 {page} 页没有评论数据，停止获取")
+                    break
 
-            # 避免请求过快
-            time.sleep(0.5)
+                # 检查是否还有更多
+                if not has_more:
+                    logger.info(f"has_more为False，评论获取完成")
+                    # 标记评论获取完成，保存最后状态
+                    if progress:
+                        progress.total_fetched = total_comments
+                        progress.last_cursor = cursor  # 保存当前cursor（已经是最后一页了）
+                        progress.completed = True
+                    break
+
+                # 获取下一页cursor
+                if 'cursor' in data:
+                    next_cursor = str(data['cursor'])
+                    logger.debug("下一页cursor: {}", next_cursor)
+
+                    # ========== 更新评论进度（支持断点续传）==========
+                    # 重要：在成功处理完当前页后，保存下一页的cursor
+                    # 这样断点续传时，会从下一页开始，不会重复也不会丢失数据
+                    if progress:
+                        progress.total_fetched = total_comments
+                        progress.last_cursor = next_cursor  # ✅ 保存下一页的cursor作为断点
+                        progress.current_page = page
+
+                    # 更新cursor为下一页
+                    cursor = next_cursor
+                else:
+                    logger.info("没有cursor字段，评论获取完成")
+                    # 标记评论获取完成，保存最后状态
+                    if progress:
+                        progress.total_fetched = total_comments
+                        progress.last_cursor = cursor  # 保存最后一个cursor
+                        progress.completed = True
+                    break
+        finally:
+            writer.close()
+            os.close(comments_fd)
+            if progress:
+                progress.close()
 
         # 如果循环正常结束（不是break退出），说明可能有异常
         # 不应该无条件标记为完成，因为可能是因为错误提前退出
@@ -514,7 +792,7 @@ class JsonToFullData:
 
         # 计算完成度并决定是否标记为完成
         is_completed = True  # 默认完成
-        if expected_comment_count > 0:
+        if has_expected:
             completion_pct = (total_comments / expected_comment_count) * 100
             if completion_pct < 50:
                 logger.warning(f"⚠️ 完成度过低: {completion_pct:.1f}% ({total_comments:,}/{expected_comment_count:,})")
@@ -532,13 +810,10 @@ class JsonToFullData:
                 is_completed = True
 
         # 更新进度管理器的完成状态
-        if self.progress_manager:
-            self.progress_manager.update_comments_progress(
-                note_id=note_id,
-                total_fetched=total_comments,
-                last_cursor=cursor,
-                completed=is_completed
-            )
+        if progress:
+            progress.total_fetched = total_comments
+            progress.last_cursor = cursor
+            progress.completed = is_completed
             if is_completed:
                 logger.debug(f"✅ 评论已标记为完成")
             else:
@@ -546,12 +821,12 @@ class JsonToFullData:
 
         return total_comments
 
-    def get_note_full_info(self, note_url: str, cookies_str: str = None, output_dir: str = None,
+    def get_note_full_info(self, note, cookies_str: str = None, output_dir: str = None,
                            proxies: dict = None, include_comments: bool = True):
         """
         获取单个笔记的完整信息（支持分步保存和Cookie池重试）
 
-        :param note_url: 笔记URL
+        :param note: 笔记引用（build_note_ref 的结果）或笔记URL
         :param cookies_str: 小红书cookies字符串（如果使用Cookie池则可选）
         :param output_dir: 输出目录（如果指定则分步保存文件）
         :param proxies: 代理设置
@@ -559,6 +834,18 @@ class JsonToFullData:
         :return: 成功状态, 消息, 笔记完整信息
         """
         try:
+            note_ref = build_note_ref(note)
+            if note_ref is None:
+                return False, '无效的笔记数据，缺少URL', None
+            note_url = note_ref['url']
+            xsec_token = note_ref['xsec_token']
+
+            # 缺少xsec_token时基本信息接口同样会失败，直接返回，不浪费一次请求
+            if not xsec_token:
+                logger.error(f"❌ URL中没有xsec_token参数，无法获取笔记: {note_url}")
+                logger.error(f"建议：重新搜索关键词或访问笔记页面获取新URL")
+                return False, 'URL中缺少xsec_token', None
+
             # 步骤1: 获取笔记基本信息（使用Cookie池重试）
             logger.info(f'开始获取笔记基本信息: {note_url}')
 
@@ -586,29 +873,23 @@ class JsonToFullData:
             # 添加获取时间戳
             processed_note['crawl_time'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-            # ✅ 步骤2: 立即保存基本信息（如果指定了output_dir）
+            # 笔记正文只序列化一次，basic/full文件都复用这份文本
+            base_parts = None
+            note_prefix = None  # 本笔记各输出文件的公共路径前缀
             if output_dir:
-                basic_file = os.path.join(output_dir, f"note_{note_id}_basic.json")
+                note_prefix = os.path.join(output_dir, f"note_{note_id}")
+                base_parts = _serialize_note_base(processed_note)
+
+            # ✅ 步骤2: 立即保存基本信息（仅在需要获取评论时作为断点，否则紧接着就会写完整文件）
+            if output_dir and include_comments:
+                basic_file = note_prefix + "_basic.json"
                 with open(basic_file, 'w', encoding='utf-8') as f:
-                    json.dump(processed_note, f, ensure_ascii=False, indent=2)
+                    f.write(_render_note_json(base_parts, processed_note.get('comment_count', 0), {}))
                 logger.info(f"✅ 笔记基本信息已保存: {basic_file}")
 
             # 步骤3: 流式获取和保存评论
             if include_comments:
                 try:
-                    # 提取xsec_token
-                    from urllib.parse import urlparse, parse_qs
-                    parsed = urlparse(note_url)
-                    query_params = parse_qs(parsed.query)
-                    xsec_token = query_params.get('xsec_token', [''])[0]
-
-                    if not xsec_token:
-                        logger.error(f"❌ URL中没有xsec_token参数，无法获取评论")
-                        logger.error(f"建议：重新搜索关键词或访问笔记页面获取新URL")
-                        processed_note['comments'] = []
-                        processed_note['comment_count'] = 0
-                        return True, '笔记基本信息获取成功，但缺少xsec_token无法获取评论', processed_note
-
                     if output_dir:
                         # 解析预期的评论总数
                         expected_count = parse_comment_count(processed_note.get('comment_count', 0))
@@ -618,7 +899,7 @@ class JsonToFullData:
                         cookie_to_use = account.cookie_str if account and hasattr(account, 'cookie_str') else cookies_str
 
                         # 流式保存到JSONL文件
-                        comments_file = os.path.join(output_dir, f"note_{note_id}_comments.jsonl")
+                        comments_file = note_prefix + "_comments.jsonl"
                         total_comments = self.save_comments_streaming(
                             note_id, xsec_token, comments_file,
                             expected_comment_count=expected_count,  # ✅ 传递预期评论数
@@ -659,9 +940,10 @@ class JsonToFullData:
 
             # ✅ 步骤4: 保存或更新完整信息JSON（如果指定了output_dir）
             if output_dir:
-                full_file = os.path.join(output_dir, f"note_{note_id}_full.json")
+                full_file = note_prefix + "_full.json"
+                tail = {k: processed_note[k] for k in NOTE_TAIL_FIELDS if k in processed_note}
                 with open(full_file, 'w', encoding='utf-8') as f:
-                    json.dump(processed_note, f, ensure_ascii=False, indent=2)
+                    f.write(_render_note_json(base_parts, processed_note.get('comment_count', 0), tail))
                 logger.info(f"✅ 笔记完整信息已保存: {full_file}")
 
             return True, '获取笔记完整信息成功', processed_note
@@ -669,15 +951,147 @@ class JsonToFullData:
         except Exception as e:
             error_msg = f'获取笔记完整信息失败: {str(e)}'
             logger.error(error_msg)
-            logger.debug(traceback.format_exc())
+            logger.opt(exception=True).debug("异常详情")
             return False, error_msg, None
     
+    def _process_single_note(self, i: int, note_ref: dict, pending_total: int, total_notes: int,
+                             process_start_time: float, cookies_str: str = None, output_dir: str = None,
+                             proxies: dict = None, include_comments: bool = True,
+                             download_media: bool = True, media_dir: str = None,
+                             media_pool: ThreadPoolExecutor = None, media_futures: list = None):
+        """
+        处理单个笔记：获取完整信息、下载媒体并更新进度（可在线程池中并发调用）
+
+        :param i: 当前笔记在待处理列表中的序号（从1开始）
+        :param note_ref: 笔记引用（{'url', 'note_id', 'xsec_token'}）
+        :param pending_total: 待处理笔记总数
+        :param total_notes: 全部笔记总数
+        :param process_start_time: 批处理开始时间（用于估算剩余时间）
+        :param media_pool: 媒体下载线程池，提供时下载提交到池中，不阻塞下一个笔记
+        :param media_futures: 收集 (future, 标题) 的列表，由调用方统一等待
+        :return: (True, 笔记完整信息) 或 (False, 失败记录)
+        """
+        note_url = note_ref['url']
+        note_id = None
+        # 绑定结构化字段，JSON日志（serialize=True的sink）里可直接按note_id过滤
+        note_log = logger.bind(note_url=note_url, index=i, pending_total=pending_total)
+        try:
+            # ========== 显示详细进度 ==========
+            elapsed = time.time() - process_start_time
+            remaining_time = self.progress_manager.estimate_remaining_time(i - 1, elapsed)
+            stats = self.progress_manager.get_statistics()
+
+            note_log.info(_PROGRESS_TMPL.format(
+                i=i, tot=pending_total, c=stats['completed'], k=total_notes,
+                pct=stats['completed'] / total_notes * 100, f=stats['failed'],
+                p=stats['pending'], eta=remaining_time
+            ))
+
+            # ========== 标记笔记开始处理 ==========
+            note_id = self.progress_manager.extract_note_id(note_url)
+            note_log = note_log.bind(note_id=note_id)
+            if note_id:
+                self.progress_manager.mark_note_processing(note_id, note_url)
+
+            note_log.info('正在处理笔记: {}', note_url)
+
+            # 使用新的分步保存方法
+            success, msg, full_note_info = self.get_note_full_info(
+                note_ref,
+                cookies_str=cookies_str,
+                output_dir=output_dir,  # 传递output_dir启用分步保存
+                proxies=proxies,
+                include_comments=include_comments
+            )
+
+            if success and full_note_info:
+                # 统计评论数
+                comment_count = full_note_info.get('comment_count', 0)
+
+                # 下载媒体文件
+                if download_media and media_pool is not None:
+                    future = media_pool.submit(download_note, full_note_info, media_dir, 'media')
+                    media_futures.append((future, full_note_info['title']))
+                elif download_media:
+                    try:
+                        download_note(full_note_info, media_dir, 'media')
+                        note_log.info('媒体文件下载成功: {}', full_note_info["title"])
+                    except Exception as e:
+                        note_log.warning('媒体文件下载失败: {}', e)
+
+                # ========== 标记笔记完成（检查评论完成度）==========
+                if note_id:
+                    # 从进度中读取评论实际完成状态
+                    note_progress = self.progress_manager.get_note_progress(note_id)
+                    comments_progress = note_progress.get('comments', {})
+                    comments_completed = comments_progress.get('completed', True)
+
+                    # 只有评论真正完成才标记笔记为完成
+                    details = {
+                        'comments': {
+                            'enabled': include_comments,
+                            'total_fetched': comment_count,
+                            'completed': comments_completed  # 使用实际完成状态
+                        },
+                        'media': {
+                            'enabled': download_media,
+                            'completed': True
+                        }
+                    }
+
+                    # 只有在评论完成（或未启用评论）时才标记笔记为完成
+                    if comments_completed or not include_comments:
+                        self.progress_manager.mark_note_completed(note_id, details)
+                        note_log.info("✅ 笔记已标记为完成: {}", note_id)
+                    else:
+                        # 评论未完成，保持为processing状态，方便下次继续
+                        note_log.warning("⚠️ 评论未完全获取，笔记保持为待处理状态: {}", note_id)
+                        note_log.info("💡 下次运行时将从断点继续获取剩余评论")
+
+                # 注意：单个笔记的JSON文件已经在get_note_full_info中保存，无需重复保存
+                return True, full_note_info
+            else:
+                note_log.error('处理失败: {}', msg)
+
+                # ========== 标记笔记失败 ==========
+                if note_id:
+                    self.progress_manager.mark_note_failed(note_id, msg)
+
+                return False, {
+                    'url': note_url,
+                    'error': msg,
+                    'note_id': note_id
+                }
+
+        except Exception as e:
+            # ========== 捕获任何未预期的异常，确保不中断整个批处理 ==========
+            error_msg = f'处理笔记时发生异常: {str(e)}'
+            note_log.error(error_msg)
+            note_log.opt(exception=True).debug("异常详情")
+
+            # 标记笔记失败
+            if note_id:
+                try:
+                    self.progress_manager.mark_note_failed(note_id, error_msg)
+                except Exception as mark_error:
+                    note_log.warning("标记笔记失败状态时出错: {}", mark_error)
+
+            # 继续处理下一个笔记
+            note_log.info("⏭️  跳过当前笔记，继续处理下一个...")
+            return False, {
+                'url': note_url,
+                'error': error_msg,
+                'note_id': note_id,
+                'exception': True
+            }
+
     def process_json_to_full_data(self, json_file_path: str = None, cookies_str: str = None,
                                  output_dir: str = None, include_comments: bool = True,
                                  download_media: bool = True, save_format: str = 'json',
                                  proxies: dict = None, note_data_list: list = None,
                                  min_completion_rate: float = 0.9, force_retry: bool = False,
-                                 resume_incomplete: bool = False):
+                                 resume_incomplete: bool = False, max_concurrency: int = None,
+                                 defer_excel: bool = False):
         """
         处理JSON文件或笔记数据列表，获取所有笔记的完整信息并保存
 
@@ -692,36 +1106,50 @@ class JsonToFullData:
         :param min_completion_rate: 最小评论完成度（0-1），默认0.9（90%）
         :param force_retry: 是否强制重新处理所有笔记（忽略进度）
         :param resume_incomplete: 是否只重试未完成的笔记
+        :param max_concurrency: 同时处理的笔记数，默认按Cookie池账号数（最多8个）
+        :param defer_excel: 是否把Excel导出放到后台线程（任务记录在self.post_futures，由调用方等待）
         :return: 成功状态, 消息, 处理结果统计
         """
         try:
             # ========== ✨ 新增：支持直接传入笔记数据 ==========
             if note_data_list is not None:
-                # 从笔记数据中提取URL列表
-                note_urls = []
-                for note in note_data_list:
-                    if 'note_url' in note:
-                        note_urls.append(note['note_url'])
-                    elif 'note_id' in note and 'xsec_token' in note:
-                        note_url = f"https://www.xiaohongshu.com/explore/{note['note_id']}?xsec_token={note['xsec_token']}"
-                        note_urls.append(note_url)
-
-                if not note_urls:
+                # 从笔记数据中提取笔记引用
+                note_refs = build_note_refs(note_data_list)
+
+                if not note_refs:
                     return False, '笔记数据中没有有效的URL', {}
 
                 # 使用笔记数据作为来源标识
-                json_source = f"direct_data_{len(note_urls)}_notes"
-                logger.info(f'直接处理 {len(note_urls)} 个笔记数据（无需JSON文件）')
+                json_source = f"direct_data_{len(note_refs)}_notes"
+                logger.info(f'直接处理 {len(note_refs)} 个笔记数据（无需JSON文件）')
 
             elif json_file_path is not None:
                 # 传统方式：解析JSON文件
-                parse_success, parse_msg, note_urls = self.parse_json_file(json_file_path)
+                parse_success, parse_msg, note_refs = self.parse_json_file(json_file_path)
                 if not parse_success:
                     return False, parse_msg, {}
                 json_source = json_file_path
 
             else:
                 return False, '必须提供 json_file_path 或 note_data_list 参数之一', {}
+
+            # 同一笔记可能在搜索结果中重复出现（不同xsec_token），按note_id去重，只处理第一次出现的
+            seen_note_ids = set()
+            deduped_refs = []
+            for ref in note_refs:
+                note_id = ref['note_id']
+                if note_id:
+                    if note_id in seen_note_ids:
+                        continue
+                    seen_note_ids.add(note_id)
+                deduped_refs.append(ref)
+            if len(deduped_refs) < len(note_refs):
+                logger.info(f'🔁 去除重复笔记 {len(note_refs) - len(deduped_refs)} 个，剩余 {len(deduped_refs)} 个')
+                note_refs = deduped_refs
+
+            # 进度管理按URL记录，处理时再按URL取回预解析好的引用
+            note_urls = [ref['url'] for ref in note_refs]
+            note_refs_by_url = {ref['url']: ref for ref in note_refs}
             
             # 创建输出目录
             if output_dir is None:
@@ -732,8 +1160,17 @@ class JsonToFullData:
                 else:
                     output_dir = f"parsed_direct_data_{timestamp}"
 
-            if not os.path.exists(output_dir):
-                os.makedirs(output_dir)
+            os.makedirs(output_dir, exist_ok=True)
+
+            # 本次批处理用到的输出路径统一在这里确定
+            media_dir = os.path.join(output_dir, "media_files") if download_media else None
+            successful_file = os.path.join(output_dir, "successful_notes.jsonl")
+            failed_file = os.path.join(output_dir, "failed_notes.jsonl")
+            summary_file = os.path.join(output_dir, "summary_all_notes.json")
+            excel_file = os.path.join(output_dir, "notes_data.xlsx")
+            total_notes = len(note_urls)
+            # 批处理断点只对同一来源、同一笔记列表有效
+            list_key = note_list_key(json_source, note_urls)
 
             # ========== 初始化进度管理器（支持断点续爬）==========
             self.progress_manager = ProgressManager(output_dir, json_source)
@@ -742,197 +1179,140 @@ class JsonToFullData:
             if force_retry:
                 logger.warning("🔄 强制重试模式：将重新处理所有笔记（忽略进度）")
                 pending_note_urls = note_urls
-                # 清空进度统计（但保留进度文件以便查看历史）
-                self.progress_manager.progress_data['statistics'] = {
-                    'completed': 0, 'failed': 0, 'skipped': 0,
-                    'processing': 0, 'pending': len(note_urls)
-                }
+                # 全部笔记重新进入待处理（保留进度文件以便查看历史；completed等计数由笔记状态决定）
+                self.progress_manager.progress_data['statistics']['pending'] = total_notes
             elif resume_incomplete:
                 logger.info("📝 仅重试未完成的笔记模式")
                 # 获取所有未完成的笔记（完成度不足的也会被识别）
                 pending_note_urls = self.progress_manager.get_pending_notes(note_urls, min_completion_rate)
             else:
-                # 正常模式：获取待处理笔记列表（自动跳过已完成）
-                pending_note_urls = self.progress_manager.get_pending_notes(note_urls, min_completion_rate)
+                # 正常模式：获取待处理笔记列表（自动跳过已完成，断点之前的笔记不再逐个判断）
+                next_index = self.progress_manager.load_next_index(total_notes, list_key)
+                if next_index:
+                    logger.info(f"🔄 检测到批处理断点，前 {next_index} 个笔记已完成")
+                pending_note_urls = self.progress_manager.get_pending_notes(
+                    note_urls, min_completion_rate, start_index=next_index
+                )
 
             if len(pending_note_urls) == 0:
                 logger.success("🎉 所有笔记已处理完成！")
-                # 读取汇总数据返回
-                summary_file = os.path.join(output_dir, "summary_all_notes.json")
-                if os.path.exists(summary_file):
-                    with open(summary_file, 'r', encoding='utf-8') as f:
-                        summary_data = json.load(f)
-                    result_stats = {
-                        'total_notes': len(note_urls),
-                        'successful_notes': summary_data['process_info']['successful_notes'],
-                        'failed_notes': summary_data['process_info']['failed_notes'],
-                        'total_comments': summary_data['process_info']['total_comments'],
-                        'output_directory': output_dir
-                    }
-                    return True, '所有笔记已完成', result_stats
-                else:
-                    return True, '所有笔记已完成', {}
+                # 直接用进度数据统计，不再解析汇总JSON
+                stats = self.progress_manager.get_statistics()
+                result_stats = {
+                    'total_notes': total_notes,
+                    'successful_notes': stats['completed'],
+                    'failed_notes': stats['failed'],
+                    'total_comments': self.progress_manager.get_total_comments_fetched(),
+                    'output_directory': output_dir
+                }
+                return True, '所有笔记已完成', result_stats
 
             # 创建媒体文件目录
-            if download_media:
-                media_dir = os.path.join(output_dir, "media_files")
-                if not os.path.exists(media_dir):
-                    os.makedirs(media_dir)
-
-            # 处理每个笔记
-            successful_notes = []
-            failed_notes = []
+            if media_dir:
+                os.makedirs(media_dir, exist_ok=True)
+
+            # 并发度：Cookie池模式下每个账号一个槽位（最多8个），单Cookie模式保持串行
+            if max_concurrency is None:
+                max_concurrency = min(8, len(self.cookie_pool.accounts)) if self.cookie_pool else 1
+            max_concurrency = max(1, max_concurrency)
+            logger.info(f"笔记并发处理数: {max_concurrency}")
+
+            # 处理每个笔记：结果逐条追加到JSONL，内存中只保留计数
+            successful_count = 0
+            failed_count = 0
             total_comments_count = 0
 
             # 记录开始时间（用于估算剩余时间）
             process_start_time = time.time()
 
-            for i, note_url in enumerate(pending_note_urls, 1):
-                note_id = None
-                try:
-                    # ========== 显示详细进度 ==========
-                    elapsed = time.time() - process_start_time
-                    remaining_time = self.progress_manager.estimate_remaining_time(i - 1, elapsed)
-                    stats = self.progress_manager.get_statistics()
-
-                    progress_msg = (
-                        f"\n{'='*60}\n"
-                        f"[{i}/{len(pending_note_urls)}] 总进度: {stats['completed']}/{len(note_urls)} "
-                        f"({stats['completed']/len(note_urls)*100:.1f}%)\n"
-                        f"成功: {stats['completed']} | 失败: {stats['failed']} | "
-                        f"剩余: {stats['pending']} | 预计剩余时间: {remaining_time}\n"
-                        f"{'='*60}"
-                    )
-                    logger.info(progress_msg)
-
-                    # ========== 标记笔记开始处理 ==========
-                    note_id = self.progress_manager.extract_note_id(note_url)
-                    if note_id:
-                        self.progress_manager.mark_note_processing(note_id, note_url)
-
-                    logger.info(f'正在处理笔记: {note_url}')
-
-                    # 使用新的分步保存方法
-                    success, msg, full_note_info = self.get_note_full_info(
-                        note_url,
-                        cookies_str=cookies_str,
-                        output_dir=output_dir,  # 传递output_dir启用分步保存
-                        proxies=proxies,
-                        include_comments=include_comments
-                    )
-
-                    if success and full_note_info:
-                        successful_notes.append(full_note_info)
+            # 媒体下载放到独立线程池，与后续笔记的API请求重叠
+            media_pool = ThreadPoolExecutor(max_workers=MEDIA_DOWNLOAD_WORKERS) if download_media else None
+            media_futures = []
+
+            def run(item):
+                i, note_url = item
+                return self._process_single_note(
+                    i, note_refs_by_url[note_url], len(pending_note_urls), total_notes, process_start_time,
+                    cookies_str=cookies_str, output_dir=output_dir, proxies=proxies,
+                    include_comments=include_comments, download_media=download_media,
+                    media_dir=media_dir, media_pool=media_pool, media_futures=media_futures
+                )
 
-                        # 统计评论数
-                        comment_count = full_note_info.get('comment_count', 0)
-                        total_comments_count += comment_count
+            # 批处理断点只在连续完成时推进，遇到失败或评论未完成的笔记就停在它之前
+            url_positions = {url: idx for idx, url in enumerate(note_urls)}
+            cursor_blocked = False
 
-                        # 下载媒体文件
-                        if download_media:
-                            try:
-                                download_note(full_note_info, media_dir, 'media')
-                                logger.info(f'媒体文件下载成功: {full_note_info["title"]}')
-                            except Exception as e:
-                                logger.warning(f'媒体文件下载失败: {str(e)}')
-
-                        # ========== 标记笔记完成（检查评论完成度）==========
-                        if note_id:
-                            # 从进度中读取评论实际完成状态
-                            note_progress = self.progress_manager.get_note_progress(note_id)
-                            comments_progress = note_progress.get('comments', {})
-                            comments_completed = comments_progress.get('completed', True)
-
-                            # 只有评论真正完成才标记笔记为完成
-                            details = {
-                                'comments': {
-                                    'enabled': include_comments,
-                                    'total_fetched': comment_count,
-                                    'completed': comments_completed  # 使用实际完成状态
-                                },
-                                'media': {
-                                    'enabled': download_media,
-                                    'completed': True
-                                }
-                            }
-
-                            # 只有在评论完成（或未启用评论）时才标记笔记为完成
-                            if comments_completed or not include_comments:
-                                self.progress_manager.mark_note_completed(note_id, details)
-                                logger.info(f"✅ 笔记已标记为完成: {note_id}")
+            try:
+                # 各笔记相互独立，用有界线程池重叠不同笔记的网络等待（map按提交顺序返回结果）
+                with ThreadPoolExecutor(max_workers=max_concurrency) as executor, \
+                        open(successful_file, 'wb') as succ_f, \
+                        open(failed_file, 'wb') as fail_f:
+                    for note_url, (success, payload) in zip(pending_note_urls,
+                                                            executor.map(run, enumerate(pending_note_urls, 1))):
+                        if success:
+                            succ_f.write(_dumps_bytes(_note_summary_stub(payload)))
+                            succ_f.write(b'\n')
+                            successful_count += 1
+                            total_comments_count += payload.get('comment_count', 0)
+                        else:
+                            fail_f.write(_dumps_bytes(payload))
+                            fail_f.write(b'\n')
+                            failed_count += 1
+
+                        if not cursor_blocked:
+                            note_id = self.progress_manager.extract_note_id(note_url)
+                            if success and note_id and self.progress_manager.is_note_completed(note_id, min_completion_rate):
+                                self.progress_manager.save_next_index(url_positions[note_url] + 1, total_notes, list_key)
                             else:
-                                # 评论未完成，保持为processing状态，方便下次继续
-                                logger.warning(f"⚠️ 评论未完全获取，笔记保持为待处理状态: {note_id}")
-                                logger.info(f"💡 下次运行时将从断点继续获取剩余评论")
-
-                        # 注意：单个笔记的JSON文件已经在get_note_full_info中保存，无需重复保存
-                    else:
-                        failed_notes.append({
-                            'url': note_url,
-                            'error': msg,
-                            'note_id': note_id
-                        })
-                        logger.error(f'处理失败: {msg}')
-
-                        # ========== 标记笔记失败 ==========
-                        if note_id:
-                            self.progress_manager.mark_note_failed(note_id, msg)
+                                cursor_blocked = True
 
-                except Exception as e:
-                    # ========== 捕获任何未预期的异常，确保不中断整个批处理 ==========
-                    error_msg = f'处理笔记时发生异常: {str(e)}'
-                    logger.error(error_msg)
-                    logger.debug(f"异常详情: {traceback.format_exc()}")
+                # 等待媒体下载结束，单个笔记失败只记录警告
+                for future, title in media_futures:
+                    try:
+                        future.result(timeout=300)
+                        logger.info(f'媒体文件下载成功: {title}')
+                    except Exception as e:
+                        logger.warning(f'媒体文件下载失败: {title}: {str(e)}')
+            finally:
+                if media_pool is not None:
+                    media_pool.shutdown(wait=True)
 
-                    failed_notes.append({
-                        'url': note_url,
-                        'error': error_msg,
-                        'note_id': note_id,
-                        'exception': True
-                    })
+            if not cursor_blocked:
+                self.progress_manager.save_next_index(total_notes, total_notes, list_key)
 
-                    # 标记笔记失败
-                    if note_id:
-                        try:
-                            self.progress_manager.mark_note_failed(note_id, error_msg)
-                        except Exception as mark_error:
-                            logger.warning(f"标记笔记失败状态时出错: {mark_error}")
+            # 进度按批合并写入，批处理结束时把剩余的变化落盘并同步到磁盘
+            self.progress_manager.flush(sync=True)
 
-                    # 继续处理下一个笔记
-                    logger.info("⏭️  跳过当前笔记，继续处理下一个...")
-            
             # 保存汇总数据
-            summary_data = {
-                'process_info': {
-                    'source_json': json_file_path,
-                    'total_notes': len(note_urls),
-                    'successful_notes': len(successful_notes),
-                    'failed_notes': len(failed_notes),
-                    'total_comments': total_comments_count,
-                    'include_comments': include_comments,
-                    'download_media': download_media,
-                    'process_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    'comment_storage': 'JSONL files (*.jsonl)' if include_comments else 'None'
-                },
-                'successful_notes': successful_notes,
-                'failed_notes': failed_notes
+            process_info = {
+                'source_json': json_file_path,
+                'total_notes': total_notes,
+                'successful_notes': successful_count,
+                'failed_notes': failed_count,
+                'total_comments': total_comments_count,
+                'include_comments': include_comments,
+                'download_media': download_media,
+                'process_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                'comment_storage': 'JSONL files (*.jsonl)' if include_comments else 'None'
             }
 
-            # 保存汇总JSON文件
+            # 保存汇总JSON文件（从JSONL流式拼接，格式与原汇总文件一致）
             if save_format in ['json', 'all']:
-                summary_file = os.path.join(output_dir, "summary_all_notes.json")
-                with open(summary_file, 'w', encoding='utf-8') as f:
-                    json.dump(summary_data, f, ensure_ascii=False, indent=2)
+                _write_summary_json(summary_file, process_info, successful_file, failed_file)
                 logger.success(f'汇总JSON文件保存到: {summary_file}')
 
             # 保存为Excel格式
             if save_format in ['excel', 'all']:
                 from xhs_utils.data_util import save_to_xlsx
 
-                # 保存笔记数据到Excel
-                if successful_notes:
-                    excel_file = os.path.join(output_dir, "notes_data.xlsx")
-                    save_to_xlsx(successful_notes, excel_file)
+                # 保存笔记数据到Excel（按索引逐个读取笔记文件，不一次性加载）
+                if successful_count and defer_excel:
+                    self.post_futures.append(
+                        _POST_POOL.submit(save_to_xlsx, _iter_full_notes(output_dir, successful_file), excel_file)
+                    )
+                    logger.info(f'笔记Excel文件将在后台保存到: {excel_file}')
+                elif successful_count:
+                    save_to_xlsx(_iter_full_notes(output_dir, successful_file), excel_file)
                     logger.success(f'笔记Excel文件保存到: {excel_file}')
 
                 # 注意：评论数据已保存为JSONL格式，不再自动转换为Excel
@@ -941,17 +1321,18 @@ class JsonToFullData:
                     logger.info(f'评论数据已保存为JSONL格式（每个笔记一个文件），共 {total_comments_count} 条评论')
                     logger.info(f'JSONL文件位置: {output_dir}/note_*_comments.jsonl')
             
-            # 保存处理结果统计
+            # 保存处理结果统计（复用汇总信息中的计数）
+            pi = process_info
             result_stats = {
-                'total_notes': len(note_urls),
-                'successful_notes': len(successful_notes),
-                'failed_notes': len(failed_notes),
-                'success_rate': len(successful_notes) / len(note_urls) * 100 if note_urls else 0,
-                'total_comments': total_comments_count,
+                'total_notes': pi['total_notes'],
+                'successful_notes': pi['successful_notes'],
+                'failed_notes': pi['failed_notes'],
+                'success_rate': pi['successful_notes'] / total_notes * 100 if total_notes else 0,
+                'total_comments': pi['total_comments'],
                 'output_directory': output_dir
             }
 
-            logger.success(f'处理完成！成功: {len(successful_notes)}, 失败: {len(failed_notes)}, 评论: {total_comments_count}条')
+            logger.success(f'处理完成！成功: {successful_count}, 失败: {failed_count}, 评论: {total_comments_count}条')
             logger.success(f'结果保存到目录: {output_dir}')
 
             return True, '处理完成', result_stats
@@ -959,61 +1340,89 @@ class JsonToFullData:
         except Exception as e:
             error_msg = f'处理JSON文件失败: {str(e)}'
             logger.error(error_msg)
+            if self.progress_manager:
+                self.progress_manager.flush()
             return False, error_msg, {}
     
     def batch_process_json_files(self, json_files: list, cookies_str: str, 
-                               output_base_dir: str = "batch_full_data", **kwargs):
+                               output_base_dir: str = "batch_full_data",
+                               max_parallel_files: int = None, pretty: bool = False, **kwargs):
         """
         批量处理多个JSON文件
         
         :param json_files: JSON文件路径列表
         :param cookies_str: 小红书cookies字符串
         :param output_base_dir: 输出基础目录
+        :param max_parallel_files: 同时处理的文件数，默认 min(文件数, 4)
+        :param pretty: 是否额外写一份带缩进的 batch_summary_{ts}.json 便于人工查看
         :param kwargs: 其他处理参数
         :return: 批量处理结果
         """
-        if not os.path.exists(output_base_dir):
-            os.makedirs(output_base_dir)
+        os.makedirs(output_base_dir, exist_ok=True)
         
-        batch_results = []
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        for json_file in json_files:
+
+        def process_one(json_file):
             logger.info(f'开始处理JSON文件: {json_file}')
             
             # 为每个JSON文件创建独立的输出目录
             json_name = os.path.splitext(os.path.basename(json_file))[0]
             output_dir = os.path.join(output_base_dir, f"{json_name}_{timestamp}")
             
-            success, msg, stats = self.process_json_to_full_data(
-                json_file, cookies_str, output_dir, **kwargs
+            # 每个文件使用独立的处理器（各自的进度管理器），共享同一个Cookie池
+            processor = JsonToFullData(cookie_pool=self.cookie_pool)
+            success, msg, stats = processor.process_json_to_full_data(
+                json_file, cookies_str, output_dir, defer_excel=True, **kwargs
             )
+            # Excel导出在后台进行，与下一个文件的抓取重叠
+            post_futures.extend(processor.post_futures)
             
-            batch_results.append({
+            return {
                 'json_file': json_file,
                 'success': success,
                 'message': msg,
                 'stats': stats,
                 'output_dir': output_dir if success else None
-            })
+            }
+
+        # 各文件输出目录互不相同，用线程池并行处理（Cookie池和限流器需要在同一进程内共享）
+        if max_parallel_files is None:
+            max_parallel_files = min(len(json_files), 4)
+        post_futures = []
+        with ThreadPoolExecutor(max_workers=max(1, max_parallel_files)) as executor:
+            batch_results = list(executor.map(process_one, json_files))
+
+        # 写批量汇总前等待所有后台导出完成
+        for future in post_futures:
+            try:
+                future.result()
+            except Exception as e:
+                logger.warning(f'后台导出Excel失败: {e}')
         
-        # 保存批量处理汇总结果
-        batch_summary = {
-            'batch_info': {
-                'total_files': len(json_files),
-                'successful_files': len([r for r in batch_results if r['success']]),
-                'total_notes_processed': sum([r['stats'].get('total_notes', 0) for r in batch_results]),
-                'total_successful_notes': sum([r['stats'].get('successful_notes', 0) for r in batch_results]),
-                'process_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            },
-            'results': batch_results
+        # 保存批量处理汇总结果：每个文件的结果一行（NDJSON），计数单独存一个小文件
+        batch_info = {
+            'total_files': len(json_files),
+            'successful_files': sum(1 for r in batch_results if r['success']),
+            'total_notes_processed': sum(r['stats'].get('total_notes', 0) for r in batch_results),
+            'total_successful_notes': sum(r['stats'].get('successful_notes', 0) for r in batch_results),
+            'process_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         }
-        
-        batch_summary_file = os.path.join(output_base_dir, f"batch_summary_{timestamp}.json")
-        with open(batch_summary_file, 'w', encoding='utf-8') as f:
-            json.dump(batch_summary, f, ensure_ascii=False, indent=2)
-        
-        logger.success(f'批量处理完成，汇总结果保存到: {batch_summary_file}')
+
+        batch_results_file = os.path.join(output_base_dir, f"batch_results_{timestamp}.jsonl")
+        with open(batch_results_file, 'wb') as f:
+            for r in batch_results:
+                f.write(_dumps_bytes(r) + b'\n')
+
+        batch_info_file = os.path.join(output_base_dir, f"batch_info_{timestamp}.json")
+        with open(batch_info_file, 'wb') as f:
+            f.write(_dumps_bytes(batch_info, indent=True))
+
+        if pretty:
+            batch_summary_file = os.path.join(output_base_dir, f"batch_summary_{timestamp}.json")
+            with open(batch_summary_file, 'wb') as f:
+                f.write(_dumps_bytes({'batch_info': batch_info, 'results': batch_results}, indent=True))
+
+        logger.success(f'批量处理完成，汇总结果保存到: {batch_results_file}')
         return batch_results
 
 
@@ -26,11 +26,9 @@ def update_all_intervals(min_interval: int = 1, daily_limit: int = 100):
 def reset_all_accounts():
     """重置所有账号状态（清除错误计数和冷却时间）"""
     pool = CookiePool()
+    reset_count = pool.reset_all_accounts()
 
-    for cookie_id in pool.accounts.keys():
-        pool.reset_account(cookie_id)
-
-    logger.info(f"✅ 已重置 {len(pool.accounts)} 个账号")
+    logger.info(f"✅ 已重置 {reset_count} 个账号")
 
 
 def show_pool_status():
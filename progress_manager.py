@@ -3,13 +3,239 @@
 进度管理器 - 支持断点续爬功能
 """
 
+import atexit
+import copy
+from collections import deque
+import functools
+import hashlib
 import json
 import os
 import re
-import traceback
+import threading
+import time
+import weakref
 from datetime import datetime
 from loguru import logger
 
+try:
+    import orjson
+except ImportError:  # orjson为可选依赖，缺失时退回标准库json
+    orjson = None
+
+
+# 评论进度的实时字段（页数/速度/警告）最多每隔这么多秒落盘一次
+COMMENTS_FLUSH_INTERVAL = 1.0
+# 笔记状态类事件（开始/完成/失败/媒体等）攒够这么多次或超过这么多秒才落盘一次
+PROGRESS_FLUSH_EVERY = 20
+PROGRESS_FLUSH_INTERVAL = 5.0
+# 追加日志超过这个大小时做一次全量保存（压缩），并清空日志
+PROGRESS_LOG_COMPACT_BYTES = 10 * 1024 * 1024
+
+# 每个笔记保留的最近错误/警告条数
+MAX_NOTE_MESSAGES = 10
+
+
+def _json_default(obj):
+    """errors/warnings 在内存中是deque，序列化时转成列表"""
+    if isinstance(obj, deque):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _dumps_progress(data: dict) -> bytes:
+    """序列化进度数据（紧凑格式，优先orjson）"""
+    if orjson is not None:
+        return orjson.dumps(data, default=_json_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'),
+                      default=_json_default).encode('utf-8')
+
+
+# 由状态索引（ID集合）维护计数的笔记状态
+_INDEXED_STATUSES = ('completed', 'failed', 'processing')
+
+# 新登记笔记的进度结构（mark_note_processing 中深拷贝后填入URL和开始时间）
+# comments/media 子结构在第一次更新评论/媒体进度时才创建，未启用的笔记不占内存和文件体积
+_NEW_NOTE_TEMPLATE = {
+    'status': 'processing',
+    'note_url': None,
+    'basic_info_saved': False,
+    'start_time': None,
+    'end_time': None,
+    'error_message': None
+}
+
+_NEW_COMMENTS_TEMPLATE = {
+    'enabled': False,
+    'total_expected': 0,
+    'total_fetched': 0,
+    'last_cursor': '',
+    'completed': False,
+    # ========== 实时进度字段 ==========
+    'current_page': 0,          # 当前正在爬取的页数
+    'crawl_speed': 0,           # 爬取速度（评论数/秒）
+    'errors': [],               # 错误列表
+    'warnings': [],             # 警告列表
+    'last_update_time': None,   # 最后更新时间
+    'last_update_ts': None      # 最后更新时间（epoch秒，用于计算速度）
+}
+
+_NEW_MEDIA_TEMPLATE = {
+    'enabled': False,
+    'images': {
+        'total': 0,
+        'downloaded': 0,
+        'urls': []
+    },
+    'videos': {
+        'total': 0,
+        'downloaded': 0,
+        'urls': []
+    },
+    'completed': False
+}
+
+
+def _note_subtree(note_progress: dict, key: str, template: dict) -> dict:
+    """取笔记的comments/media子结构，不存在时按模板创建"""
+    subtree = note_progress.get(key)
+    if subtree is None:
+        subtree = note_progress[key] = copy.deepcopy(template)
+    return subtree
+
+# 笔记URL中的ID：/explore/<十六进制ID>
+_EXPLORE_RE = re.compile(r'/explore/([a-f0-9]+)')
+_HEX_CHARS = frozenset('0123456789abcdef')
+
+_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+_now_cache = [0, ""]  # [epoch秒, 格式化字符串]
+
+
+def _now_str() -> str:
+    """当前时间的显示字符串，同一秒内复用已格式化的结果"""
+    now = int(time.time())
+    cache = _now_cache
+    if cache[0] != now:
+        cache[1] = time.strftime(_TIME_FORMAT, time.localtime(now))
+        cache[0] = now
+    return cache[1]
+
+
+# 所有存活的进度管理器，由后台线程按间隔统一落盘，进程退出时再落盘一次
+_LIVE_MANAGERS = weakref.WeakSet()
+_flusher_lock = threading.Lock()
+_flusher_thread = None
+
+
+def _flush_loop():
+    """后台落盘线程：每隔 COMMENTS_FLUSH_INTERVAL 秒把超时未保存的进度写入文件"""
+    while True:
+        time.sleep(COMMENTS_FLUSH_INTERVAL)
+        for manager in list(_LIVE_MANAGERS):
+            try:
+                manager._flush_if_due()
+            except Exception as e:
+                logger.warning(f"后台保存进度失败: {e}")
+
+
+def _ensure_flusher():
+    global _flusher_thread
+    with _flusher_lock:
+        if _flusher_thread is None:
+            _flusher_thread = threading.Thread(target=_flush_loop, name='progress-flusher', daemon=True)
+            _flusher_thread.start()
+
+
+@atexit.register
+def _flush_all_managers():
+    """进程退出（包括Ctrl+C）时把所有未落盘的进度写入文件"""
+    for manager in list(_LIVE_MANAGERS):
+        try:
+            manager.flush()
+        except Exception:
+            pass
+
+
+def _apply_progress_log(progress_data: dict, log_file: str) -> int:
+    """
+    把追加日志中的增量记录应用到进度快照
+
+    :param progress_data: progress.json 的内容（原地修改）
+    :param log_file: progress.jsonl 路径
+    :return: 应用的记录数
+    """
+    if not os.path.exists(log_file):
+        return 0
+
+    notes_progress = progress_data.get('notes_progress', {})
+    replayed = 0
+    with open(log_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # 进程中断时最后一行可能不完整
+                continue
+            note_progress = notes_progress.get(record.get('note_id'))
+            if not note_progress:
+                continue
+            if 'comments' in record:
+                note_progress.setdefault('comments', {}).update(record['comments'])
+                replayed += 1
+            elif note_progress.get('status') != record.get('status'):
+                note_progress['status'] = record['status']
+                replayed += 1
+    return replayed
+
+
+@functools.lru_cache(maxsize=10000)
+def note_id_from_url(note_url: str) -> str:
+    """
+    从笔记URL中提取笔记ID（同一URL会被反复查询，结果缓存）
+
+    :param note_url: 笔记URL
+    :return: 笔记ID，URL中没有 /explore/<ID> 时返回None
+    """
+    # 快速路径：/explore/<id>?... 形式直接切片，切出的ID不合规时再走正则
+    idx = note_url.find('/explore/')
+    if idx >= 0:
+        start = idx + len('/explore/')
+        end = note_url.find('?', start)
+        note_id = note_url[start:end] if end >= 0 else note_url[start:]
+        if note_id and _HEX_CHARS.issuperset(note_id):
+            return note_id
+    match = _EXPLORE_RE.search(note_url)
+    if match:
+        return match.group(1)
+    return None
+
+
+def note_list_key(json_source: str, note_urls: list) -> str:
+    """
+    计算笔记列表的标识：来源加上按顺序排列的笔记ID，用于确认批处理断点属于同一份笔记列表
+
+    :param json_source: 来源标识（源JSON文件路径等）
+    :param note_urls: 笔记URL列表
+    :return: 十六进制摘要
+    """
+    digest = hashlib.blake2b(str(json_source).encode('utf-8'), digest_size=16)
+    for note_url in note_urls:
+        digest.update(b'\n')
+        digest.update((note_id_from_url(note_url) or note_url).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def load_progress_snapshot(output_dir: str) -> dict:
+    """
+    只读加载某个输出目录的最新进度（progress.json 快照 + progress.jsonl 增量）
+
+    :param output_dir: 输出目录
+    :return: 进度数据
+    """
+    with open(os.path.join(output_dir, "progress.json"), 'r', encoding='utf-8') as f:
+        progress_data = json.load(f)
+    _apply_progress_log(progress_data, os.path.join(output_dir, "progress.jsonl"))
+    return progress_data
+
 
 class ProgressManager:
     """
@@ -21,24 +247,55 @@ class ProgressManager:
     - 提供进度查询和统计
     """
 
-    def __init__(self, output_dir: str, json_source: str = None):
+    def __init__(self, output_dir: str, json_source: str = None, durability: str = 'relaxed'):
         """
         初始化进度管理器
 
         :param output_dir: 输出目录
         :param json_source: 源JSON文件路径
+        :param durability: 'relaxed' 只在批处理结束时fsync（替换仍是原子的，崩溃最多丢失最近一次保存）；
+                           'strict' 每次保存都fsync
         """
+        if durability not in ('relaxed', 'strict'):
+            raise ValueError(f"durability 必须是 'relaxed' 或 'strict'，当前为: {durability}")
         self.output_dir = output_dir
+        self.durability = durability
         self.progress_file = os.path.join(output_dir, "progress.json")
+        # 外层批处理的断点：note_urls中前next_index个笔记均已完成
+        self.cursor_file = os.path.join(output_dir, "pipeline_cursor.json")
+        # 进度的追加日志（相对progress.json快照的增量），每行一条：
+        #   {note_id, status, ts}            笔记完成/失败
+        #   {note_id, comments: {...}, ts}   评论进度
+        # 全量保存progress.json后清空
+        self.resume_log_file = os.path.join(output_dir, "progress.jsonl")
+        self._resume_fp = None
+        self._log_bytes = 0
         self.progress_data = None
+        # 多个笔记可能在线程池中并发更新进度，所有读写进度数据的操作都需持有此锁
+        self.lock = threading.RLock()
+        # 笔记状态变化先合并到内存，按事件数/时间间隔全量写文件；评论进度只追加增量日志
+        self._dirty = False
+        self._last_flush_time = 0.0
+        self._pending_events = 0  # 上次落盘后累计的笔记状态事件数
+        self._dirty_comments = set()  # 评论进度有变化、尚未写入追加日志的笔记ID
+        self._completed_cache = {}  # note_id -> (min_completion_rate, 是否完成)
 
         # 确保输出目录存在
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
+        os.makedirs(output_dir, exist_ok=True)
 
         # 加载或创建进度文件
         self._load_or_create_progress(json_source)
 
+        # 回放追加日志（补上进度文件最近一次保存之后的状态变化），之后继续追加
+        self._replay_resume_log()
+        self._rebuild_status_index()
+        self._resume_fp = open(self.resume_log_file, 'a', encoding='utf-8', buffering=1)
+        self._log_bytes = self._resume_fp.tell()
+
+        # 评论进度等高频更新只标记dirty，由后台线程合并落盘，不阻塞抓取线程
+        _LIVE_MANAGERS.add(self)
+        _ensure_flusher()
+
     def _load_or_create_progress(self, json_source: str = None):
         """加载现有进度文件或创建新的"""
         if os.path.exists(self.progress_file):
@@ -60,6 +317,57 @@ class ProgressManager:
             self.progress_data = self._create_new_progress(json_source)
             logger.info(f"📝 创建新的进度文件: {self.progress_file}")
 
+    def _replay_resume_log(self):
+        """逐行读取追加日志，把快照之后的状态和评论进度同步到进度数据"""
+        replayed = _apply_progress_log(self.progress_data, self.resume_log_file)
+        if replayed:
+            self._dirty = True
+            logger.info(f"🔄 从追加日志恢复 {replayed} 条进度记录")
+
+    def _rebuild_status_index(self):
+        """按笔记状态建立ID集合，completed/failed/processing 计数直接取集合大小"""
+        self._status_ids = {status: set() for status in _INDEXED_STATUSES}
+        for note_id, note_progress in self.progress_data['notes_progress'].items():
+            ids = self._status_ids.get(note_progress.get('status'))
+            if ids is not None:
+                ids.add(note_id)
+        self._sync_statistics()
+
+    def _set_status(self, note_id: str, note_progress: dict, status: str):
+        """修改笔记状态并同步状态索引"""
+        self._completed_cache.pop(note_id, None)
+        old_ids = self._status_ids.get(note_progress.get('status'))
+        if old_ids is not None:
+            old_ids.discard(note_id)
+        self._status_ids[status].add(note_id)
+        note_progress['status'] = status
+
+    def _sync_statistics(self):
+        """把状态索引的计数写回 statistics（pending 由 get_pending_notes 维护）"""
+        statistics = self.progress_data['statistics']
+        for status, ids in self._status_ids.items():
+            statistics[status] = len(ids)
+
+    def _append_log_record(self, record: dict):
+        """追加一条增量记录（只写一行，不重写整个进度文件）"""
+        line = _dumps_progress(record).decode('utf-8') + '\n'
+        self._resume_fp.write(line)
+        self._log_bytes += len(line)
+
+    def _append_resume_log(self, note_id: str, status: str):
+        """追加一条笔记状态记录"""
+        self._append_log_record({'note_id': note_id, 'status': status, 'ts': time.time()})
+
+    def _append_comments_log(self):
+        """把有变化的笔记的评论进度各追加一行"""
+        notes_progress = self.progress_data['notes_progress']
+        now = time.time()
+        for note_id in self._dirty_comments:
+            note_progress = notes_progress.get(note_id)
+            if note_progress:
+                self._append_log_record({'note_id': note_id, 'comments': note_progress['comments'], 'ts': now})
+        self._dirty_comments.clear()
+
     def _create_new_progress(self, json_source: str = None) -> dict:
         """创建新的进度数据结构"""
         task_id = f"task_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
@@ -67,8 +375,8 @@ class ProgressManager:
             'task_id': task_id,
             'json_source': json_source or 'unknown',
             'output_dir': self.output_dir,
-            'start_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            'last_update': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'start_time': _now_str(),
+            'last_update': _now_str(),
             'total_notes': 0,
             'notes_progress': {},
             'statistics': {
@@ -80,64 +388,187 @@ class ProgressManager:
             }
         }
 
-    def save_progress(self):
-        """保存进度到文件（增强版：添加重试机制和详细日志）"""
-        max_retries = 3
-        retry_delay = 0.1  # 100ms
-
-        for attempt in range(max_retries):
-            try:
-                self.progress_data['last_update'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-                # 先写入临时文件，再重命名（原子操作）
-                temp_file = self.progress_file + '.tmp'
-                with open(temp_file, 'w', encoding='utf-8') as f:
-                    json.dump(self.progress_data, f, ensure_ascii=False, indent=2)
-                    f.flush()  # 确保写入磁盘
-                    os.fsync(f.fileno())  # 强制同步到磁盘
-
-                # 原子性重命名
-                os.replace(temp_file, self.progress_file)
-
-                # 验证写入成功
-                if os.path.exists(self.progress_file):
-                    file_size = os.path.getsize(self.progress_file)
-                    if file_size > 0:
-                        logger.debug(f"✅ 进度已保存: {self.progress_file} ({file_size} bytes)")
-                        return True
-                    else:
-                        logger.warning(f"⚠️ 进度文件大小为0，重试中... ({attempt + 1}/{max_retries})")
-                else:
-                    logger.warning(f"⚠️ 进度文件不存在，重试中... ({attempt + 1}/{max_retries})")
-
-            except Exception as e:
-                logger.error(f"❌ 保存进度文件失败 (尝试 {attempt + 1}/{max_retries}): {e}")
-                logger.debug(f"错误详情: {traceback.format_exc()}")
+    def save_progress(self, sync: bool = None):
+        """
+        保存进度到文件（增强版：添加重试机制和详细日志）
 
-                # 清理临时文件
-                temp_file = self.progress_file + '.tmp'
-                if os.path.exists(temp_file):
+        :param sync: 是否fsync，默认按 durability 决定（strict才fsync）
+        """
+        if sync is None:
+            sync = self.durability == 'strict'
+        with self.lock:
+            max_retries = 3
+            retry_delay = 0.1  # 100ms
+
+            for attempt in range(max_retries):
+                try:
+                    self.progress_data['last_update'] = _now_str()
+                    self._sync_statistics()
+
+                    # 先写入临时文件，再重命名（原子操作）
+                    # 直接用os级写入已序列化的字节：不经过Python文件对象的缓冲层，
+                    # 大小已知，写完无需再stat校验
+                    data = _dumps_progress(self.progress_data)
+                    temp_file = self.progress_file + '.tmp'
+                    fd = os.open(temp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
                     try:
-                        os.remove(temp_file)
-                    except:
-                        pass
+                        view = memoryview(data)
+                        while view:
+                            view = view[os.write(fd, view):]
+                        if sync:
+                            os.fsync(fd)  # 强制同步到磁盘
+                    finally:
+                        os.close(fd)
+
+                    # 原子性重命名
+                    os.replace(temp_file, self.progress_file)
+                    # 快照已包含全部状态，追加日志清空（压缩）
+                    if self._resume_fp is not None:
+                        self._resume_fp.truncate(0)
+                        self._log_bytes = 0
+                    self._dirty_comments.clear()
+                    self._dirty = False
+                    self._pending_events = 0
+                    self._last_flush_time = time.monotonic()
+
+                    logger.debug(f"✅ 进度已保存: {self.progress_file} ({len(data)} bytes)")
+                    return True
+
+                except Exception as e:
+                    logger.error(f"❌ 保存进度文件失败 (尝试 {attempt + 1}/{max_retries}): {e}")
+                    logger.opt(exception=True).debug("错误详情")
+
+                    # 清理临时文件
+                    temp_file = self.progress_file + '.tmp'
+                    if os.path.exists(temp_file):
+                        try:
+                            os.remove(temp_file)
+                        except:
+                            pass
+
+                # 等待后重试
+                if attempt < max_retries - 1:
+                    time.sleep(retry_delay)
+
+            logger.error(f"🔴 保存进度文件最终失败，已尝试 {max_retries} 次")
+            return False
+
+    def flush(self, sync: bool = None):
+        """
+        将内存中尚未落盘的进度写入文件
+
+        :param sync: 是否fsync，默认按 durability 决定
+        """
+        with self.lock:
+            if self._dirty or self._dirty_comments:
+                return self.save_progress(sync)
+            return True
 
-            # 等待后重试
-            if attempt < max_retries - 1:
-                import time
-                time.sleep(retry_delay)
+    def _flush_if_due(self):
+        """
+        后台线程调用：评论进度追加到日志；笔记状态有变化且超过间隔、
+        或日志超过 PROGRESS_LOG_COMPACT_BYTES 时全量保存
+        """
+        with self.lock:
+            if self._dirty_comments:
+                self._append_comments_log()
+            if ((self._dirty and time.monotonic() - self._last_flush_time >= COMMENTS_FLUSH_INTERVAL)
+                    or self._log_bytes > PROGRESS_LOG_COMPACT_BYTES):
+                self.save_progress()
+
+    def load_next_index(self, total_notes: int, list_key: str) -> int:
+        """
+        读取外层批处理断点
 
-        logger.error(f"🔴 保存进度文件最终失败，已尝试 {max_retries} 次")
-        return False
+        :param total_notes: 本次笔记总数
+        :param list_key: 本次笔记列表的标识（note_list_key），与记录不一致时说明笔记列表已变化，断点作废
+        :return: 可直接跳过的笔记数量
+        """
+        try:
+            with open(self.cursor_file, 'r', encoding='utf-8') as f:
+                cursor = json.load(f)
+        except (OSError, ValueError):
+            return 0
+
+        # 同一输出目录可能先后处理不同的源文件，数量相同不代表是同一份列表
+        if cursor.get('total_notes') != total_notes or cursor.get('list_key') != list_key:
+            return 0
+        return min(max(int(cursor.get('next_index', 0)), 0), total_notes)
+
+    def save_next_index(self, next_index: int, total_notes: int, list_key: str):
+        """
+        保存外层批处理断点
 
-    def extract_note_id(self, note_url: str) -> str:
+        :param next_index: 下一个待处理笔记的下标（之前的笔记均已完成）
+        :param total_notes: 笔记总数
+        :param list_key: 笔记列表的标识（note_list_key）
+        """
+        try:
+            temp_file = self.cursor_file + '.tmp'
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump({'next_index': next_index, 'total_notes': total_notes, 'list_key': list_key}, f)
+            os.replace(temp_file, self.cursor_file)
+        except OSError as e:
+            logger.warning(f"⚠️ 保存批处理断点失败: {e}")
+
+    @staticmethod
+    def extract_note_id(note_url: str) -> str:
         """从URL中提取笔记ID"""
-        match = re.search(r'/explore/([a-f0-9]+)', note_url)
-        if match:
-            return match.group(1)
-        return None
+        return note_id_from_url(note_url)
+
+    def _scan_output_files(self) -> set:
+        """
+        扫描输出目录一次，返回笔记文件名集合（空的 _full.json 不计入）
+
+        :return: 文件名集合
+        """
+        existing_files = set()
+        try:
+            with os.scandir(self.output_dir) as entries:
+                for entry in entries:
+                    name = entry.name
+                    if not name.startswith('note_'):
+                        continue
+                    if name.endswith('_full.json') and entry.stat().st_size == 0:
+                        continue
+                    existing_files.add(name)
+        except OSError as e:
+            logger.warning(f"扫描输出目录失败: {e}")
+        return existing_files
+
+    def _check_progress_completed(self, note_id: str, note_progress: dict,
+                                  min_completion_rate: float) -> bool:
+        """按进度记录判断笔记是否完成（状态 + 评论完成度）"""
+        # 首先检查基本状态
+        if note_id not in self._status_ids['completed']:
+            return False
+
+        # 检查评论完成度（如果启用了评论获取）
+        comments = note_progress.get('comments', {})
+        if comments.get('enabled', False):
+            total_expected = comments.get('total_expected', 0)
+            total_fetched = comments.get('total_fetched', 0)
+
+            # 如果有预期数量，检查完成度
+            if total_expected > 0:
+                completion_rate = total_fetched / total_expected
+                if completion_rate < min_completion_rate:
+                    logger.info(f"📊 笔记 {note_id} 评论完成度不足: {completion_rate*100:.1f}% "
+                              f"({total_fetched:,}/{total_expected:,})，需要继续获取")
+                    return False
+                else:
+                    logger.debug(f"✅ 笔记 {note_id} 评论完成度: {completion_rate*100:.1f}%")
+
+            # 如果没有预期数量但有completed标记，检查该标记
+            elif not comments.get('completed', False):
+                logger.info(f"📋 笔记 {note_id} 评论标记为未完成，需要继续获取")
+                return False
+
+        # 状态为completed且评论完成度达标
+        return True
 
-    def is_note_completed(self, note_id: str, min_completion_rate: float = 0.9) -> bool:
+    def is_note_completed(self, note_id: str, min_completion_rate: float = 0.9,
+                          existing_files: set = None) -> bool:
         """
         判断笔记是否已完成（增强版：检查评论完成度）
 
@@ -145,179 +576,141 @@ class ProgressManager:
 
         :param note_id: 笔记ID
         :param min_completion_rate: 最小评论完成度（0-1），默认0.9（90%）
+        :param existing_files: 预先扫描得到的输出目录文件名集合（批量判断时传入，避免逐个stat）
         :return: True表示已完成，False表示未完成或需要继续
         """
-        # 1. 检查进度文件
-        if note_id in self.progress_data['notes_progress']:
-            note_progress = self.progress_data['notes_progress'][note_id]
-
-            # 首先检查基本状态
-            if note_progress.get('status') != 'completed':
-                return False
-
-            # 检查评论完成度（如果启用了评论获取）
-            comments = note_progress.get('comments', {})
-            if comments.get('enabled', False):
-                total_expected = comments.get('total_expected', 0)
-                total_fetched = comments.get('total_fetched', 0)
-
-                # 如果有预期数量，检查完成度
-                if total_expected > 0:
-                    completion_rate = total_fetched / total_expected
-                    if completion_rate < min_completion_rate:
-                        logger.info(f"📊 笔记 {note_id} 评论完成度不足: {completion_rate*100:.1f}% "
-                                  f"({total_fetched:,}/{total_expected:,})，需要继续获取")
-                        return False
-                    else:
-                        logger.debug(f"✅ 笔记 {note_id} 评论完成度: {completion_rate*100:.1f}%")
-
-                # 如果没有预期数量但有completed标记，检查该标记
-                elif not comments.get('completed', False):
-                    logger.info(f"📋 笔记 {note_id} 评论标记为未完成，需要继续获取")
-                    return False
-
-            # 状态为completed且评论完成度达标
-            return True
+        # 1. 检查进度文件（结果按笔记缓存，状态或评论进度变化时失效）
+        note_progress = self.progress_data['notes_progress'].get(note_id)
+        if note_progress is not None:
+            cached = self._completed_cache.get(note_id)
+            if cached is not None and cached[0] == min_completion_rate:
+                return cached[1]
+            completed = self._check_progress_completed(note_id, note_progress, min_completion_rate)
+            self._completed_cache[note_id] = (min_completion_rate, completed)
+            return completed
 
         # 2. 检查文件存在性（向后兼容）
-        full_file = os.path.join(self.output_dir, f"note_{note_id}_full.json")
-        if os.path.exists(full_file):
-            # 文件存在但进度中没有，自动补充到进度
-            self._补充已存在文件到进度(note_id)
+        if existing_files is not None:
+            has_full_file = f"note_{note_id}_full.json" in existing_files
+        else:
+            full_file = os.path.join(self.output_dir, f"note_{note_id}_full.json")
+            has_full_file = os.path.exists(full_file) and os.path.getsize(full_file) > 0
+        if has_full_file:
+            # 文件存在但进度中没有，自动补充到进度（批量判断时由调用方统一保存）
+            self._补充已存在文件到进度(note_id, save=existing_files is None, existing_files=existing_files)
             return True
 
         return False
 
-    def _补充已存在文件到进度(self, note_id: str):
+    def _补充已存在文件到进度(self, note_id: str, save: bool = True, existing_files: set = None):
         """将已存在的文件补充到进度记录"""
-        basic_file = os.path.join(self.output_dir, f"note_{note_id}_basic.json")
-        comments_file = os.path.join(self.output_dir, f"note_{note_id}_comments.jsonl")
-        full_file = os.path.join(self.output_dir, f"note_{note_id}_full.json")
-
-        if note_id not in self.progress_data['notes_progress']:
-            self.progress_data['notes_progress'][note_id] = {
-                'status': 'completed',
-                'note_url': 'unknown',
-                'basic_info_saved': os.path.exists(basic_file),
-                'comments': {
-                    'enabled': os.path.exists(comments_file),
-                    'completed': os.path.exists(comments_file)
-                },
-                'media': {
-                    'enabled': False,
-                    'completed': False
-                },
-                'end_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                'error_message': None
-            }
-            self.progress_data['statistics']['completed'] += 1
-            self.save_progress()
-            logger.debug(f"补充已存在笔记到进度: {note_id}")
-
-    def mark_note_processing(self, note_id: str, note_url: str):
-        """标记笔记开始处理"""
-        if note_id not in self.progress_data['notes_progress']:
-            self.progress_data['notes_progress'][note_id] = {
-                'status': 'processing',
-                'note_url': note_url,
-                'basic_info_saved': False,
-                'comments': {
-                    'enabled': False,
-                    'total_expected': 0,
-                    'total_fetched': 0,
-                    'last_cursor': '',
-                    'completed': False,
-                    # ========== 实时进度字段 ==========
-                    'current_page': 0,          # 当前正在爬取的页数
-                    'crawl_speed': 0,           # 爬取速度（评论数/秒）
-                    'errors': [],               # 错误列表
-                    'warnings': [],             # 警告列表
-                    'last_update_time': None    # 最后更新时间
-                },
-                'media': {
-                    'enabled': False,
-                    'images': {
-                        'total': 0,
-                        'downloaded': 0,
-                        'urls': []
+        with self.lock:
+            basic_name = f"note_{note_id}_basic.json"
+            comments_name = f"note_{note_id}_comments.jsonl"
+            if existing_files is not None:
+                has_basic = basic_name in existing_files
+                has_comments = comments_name in existing_files
+            else:
+                has_basic = os.path.exists(os.path.join(self.output_dir, basic_name))
+                has_comments = os.path.exists(os.path.join(self.output_dir, comments_name))
+
+            if note_id not in self.progress_data['notes_progress']:
+                self.progress_data['notes_progress'][note_id] = {
+                    'status': 'completed',
+                    'note_url': 'unknown',
+                    'basic_info_saved': has_basic,
+                    'comments': {
+                        'enabled': has_comments,
+                        'completed': has_comments
                     },
-                    'videos': {
-                        'total': 0,
-                        'downloaded': 0,
-                        'urls': []
+                    'media': {
+                        'enabled': False,
+                        'completed': False
                     },
-                    'completed': False
-                },
-                'start_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                'end_time': None,
-                'error_message': None
-            }
-            self.progress_data['statistics']['processing'] += 1
-            if self.progress_data['statistics']['pending'] > 0:
-                self.progress_data['statistics']['pending'] -= 1
-        else:
-            # 重新处理失败的笔记
-            self.progress_data['notes_progress'][note_id]['status'] = 'processing'
-            self.progress_data['notes_progress'][note_id]['start_time'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            self.progress_data['notes_progress'][note_id]['error_message'] = None
-
-            # 重置实时进度字段
-            if 'comments' not in self.progress_data['notes_progress'][note_id]:
-                self.progress_data['notes_progress'][note_id]['comments'] = {}
-            comments = self.progress_data['notes_progress'][note_id]['comments']
-            comments.update({
-                'current_page': 0,
-                'crawl_speed': 0,
-                'errors': [],
-                'warnings': [],
-                'last_update_time': None
-            })
-
-            if self.progress_data['statistics']['failed'] > 0:
-                self.progress_data['statistics']['failed'] -= 1
-            self.progress_data['statistics']['processing'] += 1
+                    'end_time': _now_str(),
+                    'error_message': None
+                }
+                self._status_ids['completed'].add(note_id)
+                if save:
+                    self.save_progress()
+                else:
+                    self._dirty = True
+                logger.debug(f"补充已存在笔记到进度: {note_id}")
 
-        self.save_progress()
+    def mark_note_processing(self, note_id: str, note_url: str):
+        """标记笔记开始处理"""
+        with self.lock:
+            notes_progress = self.progress_data['notes_progress']
+            statistics = self.progress_data['statistics']
+            note_progress = notes_progress.get(note_id)
+            if note_progress is None:
+                note_progress = copy.deepcopy(_NEW_NOTE_TEMPLATE)
+                note_progress['note_url'] = note_url
+                note_progress['start_time'] = _now_str()
+                notes_progress[note_id] = note_progress
+                self._status_ids['processing'].add(note_id)
+                if statistics['pending'] > 0:
+                    statistics['pending'] -= 1
+            else:
+                # 重新处理失败的笔记
+                self._set_status(note_id, note_progress, 'processing')
+                note_progress['start_time'] = _now_str()
+                note_progress['error_message'] = None
+
+                # 重置实时进度字段
+                comments = note_progress.get('comments')
+                if comments is not None:
+                    comments.update({
+                        'current_page': 0,
+                        'crawl_speed': 0,
+                        'errors': [],
+                        'warnings': [],
+                        'last_update_time': None,
+                        'last_update_ts': None
+                    })
+
+            self._record_event()
 
     def mark_note_completed(self, note_id: str, details: dict = None):
         """标记笔记完成"""
-        if note_id in self.progress_data['notes_progress']:
-            self.progress_data['notes_progress'][note_id]['status'] = 'completed'
-            self.progress_data['notes_progress'][note_id]['end_time'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self.lock:
+            note_progress = self.progress_data['notes_progress'].get(note_id)
+            if note_progress is None:
+                return
+            self._set_status(note_id, note_progress, 'completed')
+            note_progress['end_time'] = _now_str()
 
             # 更新详细信息
             if details:
                 if 'comments' in details:
-                    self.progress_data['notes_progress'][note_id]['comments'].update(details['comments'])
+                    _note_subtree(note_progress, 'comments', _NEW_COMMENTS_TEMPLATE).update(details['comments'])
                 if 'media' in details:
-                    self.progress_data['notes_progress'][note_id]['media'].update(details['media'])
-
-            # 更新统计
-            if self.progress_data['statistics']['processing'] > 0:
-                self.progress_data['statistics']['processing'] -= 1
-            self.progress_data['statistics']['completed'] += 1
+                    _note_subtree(note_progress, 'media', _NEW_MEDIA_TEMPLATE).update(details['media'])
+                self._completed_cache.pop(note_id, None)
 
-            self.save_progress()
+            self._append_resume_log(note_id, 'completed')
+            self._record_event()
 
     def mark_note_failed(self, note_id: str, error_message: str):
         """标记笔记失败"""
-        if note_id in self.progress_data['notes_progress']:
-            self.progress_data['notes_progress'][note_id]['status'] = 'failed'
-            self.progress_data['notes_progress'][note_id]['error_message'] = error_message
-            self.progress_data['notes_progress'][note_id]['end_time'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self.lock:
+            note_progress = self.progress_data['notes_progress'].get(note_id)
+            if note_progress is None:
+                return
+            self._set_status(note_id, note_progress, 'failed')
+            note_progress['error_message'] = error_message
+            note_progress['end_time'] = _now_str()
 
-            # 更新统计
-            if self.progress_data['statistics']['processing'] > 0:
-                self.progress_data['statistics']['processing'] -= 1
-            self.progress_data['statistics']['failed'] += 1
-
-            self.save_progress()
+            self._append_resume_log(note_id, 'failed')
+            self._record_event()
 
     def update_basic_info(self, note_id: str, saved: bool = True):
         """更新基本信息保存状态"""
-        if note_id in self.progress_data['notes_progress']:
-            self.progress_data['notes_progress'][note_id]['basic_info_saved'] = saved
-            self.save_progress()
+        with self.lock:
+            note_progress = self.progress_data['notes_progress'].get(note_id)
+            if note_progress is not None:
+                note_progress['basic_info_saved'] = saved
+                self._record_event()
 
     def update_comments_progress(self, note_id: str, total_expected: int = None,
                                  total_fetched: int = None, last_cursor: str = None,
@@ -326,6 +719,9 @@ class ProgressManager:
         """
         更新评论获取进度（支持实时进度）
 
+        先合并到内存，由后台线程每 COMMENTS_FLUSH_INTERVAL 秒追加到增量日志；
+        只有完成状态变化时立即追加。频繁更新时请使用 open_note 返回的句柄
+
         :param note_id: 笔记ID
         :param total_expected: 预期评论总数
         :param total_fetched: 已获取评论数
@@ -335,68 +731,57 @@ class ProgressManager:
         :param error: 错误信息
         :param warning: 警告信息
         """
-        if note_id in self.progress_data['notes_progress']:
-            comments = self.progress_data['notes_progress'][note_id]['comments']
-
-            # 更新基本进度
+        with self.lock:
+            if note_id not in self.progress_data['notes_progress']:
+                return
+            progress = self.open_note(note_id)
             if total_expected is not None:
-                comments['total_expected'] = total_expected
+                progress.total_expected = total_expected
             if total_fetched is not None:
-                # 计算爬取速度
-                old_fetched = comments.get('total_fetched', 0)
-                last_update = comments.get('last_update_time')
-                current_time = datetime.now()
-
-                if last_update and old_fetched < total_fetched:
-                    try:
-                        last_time = datetime.strptime(last_update, "%Y-%m-%d %H:%M:%S")
-                        time_diff = (current_time - last_time).total_seconds()
-                        if time_diff > 0:
-                            comments_diff = total_fetched - old_fetched
-                            comments['crawl_speed'] = round(comments_diff / time_diff, 2)
-                    except:
-                        pass
-
-                comments['total_fetched'] = total_fetched
-                comments['last_update_time'] = current_time.strftime("%Y-%m-%d %H:%M:%S")
-
+                progress.total_fetched = total_fetched
+            if current_page is not None:
+                progress.current_page = current_page
+            if error:
+                progress.add_error(error)
+            if warning:
+                progress.add_warning(warning)
             if last_cursor is not None:
-                comments['last_cursor'] = last_cursor
+                progress.last_cursor = last_cursor
             if completed is not None:
-                comments['completed'] = completed
-                if completed:
-                    # 完成时重置实时字段
-                    comments['current_page'] = 0
-                    comments['crawl_speed'] = 0
-
-            # 更新实时进度字段
-            if current_page is not None:
-                comments['current_page'] = current_page
+                progress.completed = completed
 
-            # 添加错误/警告信息
-            if error:
-                if 'errors' not in comments:
-                    comments['errors'] = []
-                comments['errors'].append({
-                    'message': error,
-                    'time': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                })
-                # 只保留最近10条错误
-                comments['errors'] = comments['errors'][-10:]
+    def open_note(self, note_id: str) -> 'NoteProgressHandle':
+        """
+        获取笔记评论进度的句柄，后续更新直接修改同一个进度字典
 
-            if warning:
-                if 'warnings' not in comments:
-                    comments['warnings'] = []
-                comments['warnings'].append({
-                    'message': warning,
-                    'time': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                })
-                # 只保留最近10条警告
-                comments['warnings'] = comments['warnings'][-10:]
-
-            comments['enabled'] = True
+        :param note_id: 笔记ID
+        :return: NoteProgressHandle（可用作上下文管理器，退出时落盘）
+        """
+        with self.lock:
+            note_progress = self.progress_data['notes_progress'].get(note_id)
+            # 笔记未登记时返回游离的字典，更新不会写入进度文件
+            if not note_progress:
+                return NoteProgressHandle(self, None, {})
+            return NoteProgressHandle(self, note_id, _note_subtree(note_progress, 'comments', _NEW_COMMENTS_TEMPLATE))
+
+    def _record_event(self):
+        """
+        记录一次笔记状态变化，按事件数/时间间隔合并落盘
+        （完成/失败已写入追加日志，中断时可由日志恢复）
+        """
+        self._dirty = True
+        self._pending_events += 1
+        if (self._pending_events >= PROGRESS_FLUSH_EVERY
+                or time.monotonic() - self._last_flush_time > PROGRESS_FLUSH_INTERVAL):
             self.save_progress()
 
+    def _mark_comments_dirty(self, note_id: str, force: bool = False):
+        """标记笔记评论进度已修改；force时立即追加到日志，否则交给后台线程按间隔追加"""
+        self._dirty_comments.add(note_id)
+        self._completed_cache.pop(note_id, None)
+        if force:
+            self._append_comments_log()
+
     def update_media_progress(self, note_id: str, media_type: str,
                              total: int = None, downloaded: int = None,
                              urls: list = None, completed: bool = None):
@@ -405,79 +790,107 @@ class ProgressManager:
 
         :param media_type: 'images' 或 'videos'
         """
-        if note_id in self.progress_data['notes_progress']:
-            media = self.progress_data['notes_progress'][note_id]['media']
-
-            if media_type in ['images', 'videos']:
-                if total is not None:
-                    media[media_type]['total'] = total
-                if downloaded is not None:
-                    media[media_type]['downloaded'] = downloaded
-                if urls is not None:
-                    media[media_type]['urls'] = urls
-
-            if completed is not None:
-                media['completed'] = completed
-
-            media['enabled'] = True
-            self.save_progress()
+        with self.lock:
+            note_progress = self.progress_data['notes_progress'].get(note_id)
+            if note_progress is not None:
+                media = _note_subtree(note_progress, 'media', _NEW_MEDIA_TEMPLATE)
+
+                if media_type in ('images', 'videos'):
+                    media_stats = media[media_type]
+                    if total is not None:
+                        media_stats['total'] = total
+                    if downloaded is not None:
+                        media_stats['downloaded'] = downloaded
+                    if urls is not None:
+                        media_stats['urls'] = urls
+
+                if completed is not None:
+                    media['completed'] = completed
+
+                media['enabled'] = True
+                self._record_event()
 
     def get_note_progress(self, note_id: str) -> dict:
         """获取笔记的进度信息"""
         return self.progress_data['notes_progress'].get(note_id, {})
 
-    def get_pending_notes(self, all_note_urls: list, min_completion_rate: float = 0.9) -> list:
+    def get_pending_notes(self, all_note_urls: list, min_completion_rate: float = 0.9,
+                          start_index: int = 0) -> list:
         """
         获取待处理的笔记列表
 
         :param all_note_urls: 所有笔记URL列表
         :param min_completion_rate: 最小评论完成度（0-1），默认0.9（90%）
+        :param start_index: 批处理断点，前start_index个笔记视为已完成，不再逐个判断
         :return: 待处理的笔记URL列表
         """
-        # 更新总数
-        self.progress_data['total_notes'] = len(all_note_urls)
+        with self.lock:
+            # 更新总数
+            self.progress_data['total_notes'] = len(all_note_urls)
+
+            note_urls = all_note_urls[start_index:]
+            # 第一遍：批量提取笔记ID
+            extract_note_id = self.extract_note_id
+            note_ids = [extract_note_id(note_url) for note_url in note_urls]
+
+            # 只有进度中标记为完成、或目录中已有完整文件的笔记才需要逐个判断完成度，其余直接待处理
+            completed_ids = self._status_ids['completed']
+            failed_ids = self._status_ids['failed']
+            # 进度中没有记录的笔记按目录中的文件判断，目录只扫描一次
+            existing_files = self._scan_output_files()
+            notes_progress = self.progress_data['notes_progress']
+
+            pending_notes = []
+            completed_count = start_index
+            failed_count = 0
+            invalid_count = 0
+            for note_url, note_id in zip(note_urls, note_ids):
+                if not note_id:
+                    invalid_count += 1
+                    pending_notes.append(note_url)
+                    continue
+
+                # 检查是否已完成（包含评论完成度检查）
+                if ((note_id in completed_ids
+                     or (note_id not in notes_progress and f"note_{note_id}_full.json" in existing_files))
+                        and self.is_note_completed(note_id, min_completion_rate, existing_files)):
+                    completed_count += 1
+                    continue
+
+                # 失败的笔记会重新处理
+                if note_id in failed_ids:
+                    failed_count += 1
+                    logger.debug(f"重新处理失败笔记: {note_id} (原因: {notes_progress[note_id].get('error_message')})")
 
-        pending_notes = []
-        completed_count = 0
-        failed_count = 0
-
-        for note_url in all_note_urls:
-            note_id = self.extract_note_id(note_url)
-            if not note_id:
-                logger.warning(f"无法从URL提取笔记ID: {note_url}")
                 pending_notes.append(note_url)
-                continue
-
-            # 检查是否已完成（包含评论完成度检查）
-            if self.is_note_completed(note_id, min_completion_rate):
-                completed_count += 1
-                continue
 
-            # 检查是否失败（失败的会重新处理）
-            note_progress = self.get_note_progress(note_id)
-            if note_progress.get('status') == 'failed':
-                failed_count += 1
-                logger.info(f"重新处理失败笔记: {note_id} (原因: {note_progress.get('error_message')})")
+            if invalid_count:
+                logger.warning(f"{invalid_count} 个URL无法提取笔记ID，将直接处理")
 
-            pending_notes.append(note_url)
-
-        # 更新统计
-        self.progress_data['statistics']['completed'] = completed_count
-        self.progress_data['statistics']['pending'] = len(pending_notes)
-        self.save_progress()
+            # 更新统计
+            self.progress_data['statistics']['pending'] = len(pending_notes)
+            self.save_progress()
 
-        logger.info(f"📊 进度统计:")
-        logger.info(f"   总计: {len(all_note_urls)} 个笔记")
-        logger.info(f"   已完成: {completed_count} 个 (跳过)")
-        logger.info(f"   待处理: {len(pending_notes)} 个")
-        if failed_count > 0:
-            logger.info(f"   包含失败重试: {failed_count} 个")
+            logger.info(f"📊 进度统计:")
+            logger.info(f"   总计: {len(all_note_urls)} 个笔记")
+            logger.info(f"   已完成: {completed_count} 个 (跳过)")
+            logger.info(f"   待处理: {len(pending_notes)} 个")
+            if failed_count > 0:
+                logger.info(f"   包含失败重试: {failed_count} 个")
 
-        return pending_notes
+            return pending_notes
 
     def get_statistics(self) -> dict:
-        """获取统计信息"""
-        return self.progress_data['statistics'].copy()
+        """获取统计信息（completed/failed/processing 由状态索引计算）"""
+        with self.lock:
+            self._sync_statistics()
+            return self.progress_data['statistics'].copy()
+
+    def get_total_comments_fetched(self) -> int:
+        """所有笔记已获取的评论总数"""
+        with self.lock:
+            return sum(note.get('comments', {}).get('total_fetched', 0)
+                       for note in self.progress_data['notes_progress'].values())
 
     def estimate_remaining_time(self, notes_processed: int, elapsed_seconds: float) -> str:
         """
@@ -507,3 +920,121 @@ class ProgressManager:
             return f"{minutes}分钟{seconds}秒"
         else:
             return f"{seconds}秒"
+
+
+class NoteProgressHandle:
+    """
+    单个笔记评论进度的句柄
+
+    属性赋值直接修改进度数据中该笔记的comments字典；
+    completed 赋值后立即写入追加日志，其余字段（包括每页的last_cursor）由后台线程按时间间隔写入
+    """
+
+    def __init__(self, manager: ProgressManager, note_id: str, comments: dict):
+        self._manager = manager
+        self._note_id = note_id
+        self._comments = comments
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def close(self):
+        """把尚未落盘的进度写入文件"""
+        self._manager.flush()
+
+    @property
+    def total_expected(self) -> int:
+        return self._comments.get('total_expected', 0)
+
+    @total_expected.setter
+    def total_expected(self, value: int):
+        with self._manager.lock:
+            self._comments['total_expected'] = value
+            self._touch()
+
+    @property
+    def total_fetched(self) -> int:
+        return self._comments.get('total_fetched', 0)
+
+    @total_fetched.setter
+    def total_fetched(self, value: int):
+        with self._manager.lock:
+            comments = self._comments
+            # 计算爬取速度（直接用epoch秒相减，不再解析显示用的时间字符串）
+            old_fetched = comments.get('total_fetched', 0)
+            last_ts = comments.get('last_update_ts')
+            now_ts = int(time.time())
+
+            if last_ts and old_fetched < value:
+                time_diff = now_ts - last_ts
+                if time_diff > 0:
+                    comments['crawl_speed'] = round((value - old_fetched) / time_diff, 2)
+
+            comments['total_fetched'] = value
+            comments['last_update_ts'] = now_ts
+            comments['last_update_time'] = _now_str()
+            self._touch()
+
+    @property
+    def current_page(self) -> int:
+        return self._comments.get('current_page', 0)
+
+    @current_page.setter
+    def current_page(self, value: int):
+        with self._manager.lock:
+            self._comments['current_page'] = value
+            self._touch()
+
+    @property
+    def last_cursor(self) -> str:
+        return self._comments.get('last_cursor', '')
+
+    @last_cursor.setter
+    def last_cursor(self, value: str):
+        with self._manager.lock:
+            self._comments['last_cursor'] = value
+            self._touch()
+
+    @property
+    def completed(self) -> bool:
+        return self._comments.get('completed', False)
+
+    @completed.setter
+    def completed(self, value: bool):
+        with self._manager.lock:
+            self._comments['completed'] = value
+            if value:
+                # 完成时重置实时字段
+                self._comments['current_page'] = 0
+                self._comments['crawl_speed'] = 0
+            self._touch(force=True)
+
+    def add_error(self, message: str):
+        """记录错误信息（只保留最近 MAX_NOTE_MESSAGES 条）"""
+        self._append_message('errors', message)
+
+    def add_warning(self, message: str):
+        """记录警告信息（只保留最近 MAX_NOTE_MESSAGES 条）"""
+        self._append_message('warnings', message)
+
+    def _append_message(self, key: str, message: str):
+        with self._manager.lock:
+            messages = self._comments.get(key)
+            if not isinstance(messages, deque):
+                # 从文件加载的是列表，第一次追加时换成定长deque，之后超出的旧记录自动丢弃
+                messages = deque(messages or (), maxlen=MAX_NOTE_MESSAGES)
+                self._comments[key] = messages
+            messages.append({
+                'message': message,
+                'time': _now_str()
+            })
+            self._touch()
+
+    def _touch(self, force: bool = False):
+        self._comments['enabled'] = True
+        if self._note_id is not None:
+            self._manager._mark_comments_dirty(self._note_id, force)
@@ -6,19 +6,46 @@
 
 import os
 import sys
+import socket
 import subprocess
 import signal
 import time
 
+try:
+    import psutil
+except ImportError:  # psutil为可选依赖，缺失时退回lsof
+    psutil = None
+
+def _port_in_use(port):
+    """尝试连接本地端口，能连上说明仍有进程在监听"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.settimeout(0.2)
+        return sock.connect_ex(('127.0.0.1', port)) == 0
+
+def _find_port_pids(port):
+    """查找监听指定端口的进程ID（优先psutil在进程内读取，不再fork lsof）"""
+    if psutil is not None:
+        try:
+            return sorted({str(c.pid) for c in psutil.net_connections(kind='inet')
+                           if c.laddr and c.laddr.port == port
+                           and c.status == psutil.CONN_LISTEN and c.pid})
+        except psutil.AccessDenied:
+            pass  # 部分系统需要root权限才能读取其他进程的连接，退回lsof
+
+    # 端口没有被占用时无需再调用lsof
+    if not _port_in_use(port):
+        return []
+    result = subprocess.run(['lsof', '-ti', f':{port}'],
+                            capture_output=True, text=True)
+    return result.stdout.split()
+
 def kill_port_process(port):
     """停止占用指定端口的进程"""
     try:
         # 查找占用端口的进程
-        result = subprocess.run(['lsof', '-ti', f':{port}'], 
-                              capture_output=True, text=True)
+        pids = _find_port_pids(port)
         
-        if result.stdout.strip():
-            pids = result.stdout.strip().split('\n')
+        if pids:
             print(f"🔍 发现占用端口{port}的进程: {', '.join(pids)}")
             
             for pid in pids:
@@ -30,8 +57,11 @@ def kill_port_process(port):
                 except Exception as e:
                     print(f"❌ 停止进程 {pid} 失败: {e}")
             
-            # 等待进程完全停止
-            time.sleep(2)
+            # 等待进程完全停止（端口释放即返回，最多等2秒）
+            for _ in range(20):
+                if not _port_in_use(port):
+                    break
+                time.sleep(0.1)
             return True
         else:
             print(f"✅ 端口{port}当前空闲")
@@ -44,13 +74,20 @@ def kill_port_process(port):
 def start_web_app():
     """启动Web应用"""
     print("🚀 启动小红书数据爬取Web应用...")
+    # 优先使用启动脚本，不存在时直接运行Web应用
+    script = 'start_web.py' if os.path.exists('start_web.py') else 'web_app.py'
+    process = None
     try:
-        # 直接执行start_web.py
-        os.system("python3 start_web.py")
+        # 用当前解释器启动子进程，Ctrl+C 会传给子进程，并能拿到退出码
+        process = subprocess.Popen([sys.executable, script])
+        return process.wait()
     except KeyboardInterrupt:
+        if process is not None:
+            process.wait()
         print("\n👋 服务已停止")
     except Exception as e:
         print(f"❌ 启动失败: {e}")
+        return 1
 
 def main():
     print("="*60)
@@ -6,12 +6,93 @@
 
 import json
 import os
-import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from loguru import logger
 from apis.xhs_pc_apis import XHS_Apis
+from cookie_pool import RateLimiter
 from xhs_utils.common_util import init
 
+try:
+    import orjson
+except ImportError:  # orjson为可选依赖，缺失时退回标准库json
+    orjson = None
+
+
+def _dumps_bytes(obj, indent: bool = False) -> bytes:
+    """序列化为UTF-8字节，优先使用orjson"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None).encode('utf-8')
+
+
+def _convert_count(count):
+    """
+    转换数字字符串为整数
+    小红书API返回的数字可能是字符串格式，如 "37700"；无法识别的（如"1.2万"）记为0
+    """
+    cls = count.__class__
+    if cls is int:
+        return count
+    if cls is str:
+        if count.isdecimal():
+            return int(count)
+        try:
+            # 带符号或首尾空白的数字（如 "-5"、" 12"）
+            return int(count.strip())
+        except ValueError:
+            return 0
+    return 0
+
+
+def _write_search_json(output_file: str, search_info: dict, notes, pretty: bool = False):
+    """
+    流式写入搜索结果JSON：先写search_info，再逐条写入笔记，不在内存中拼出整个文档
+    先写入同目录下的临时文件，全部写完再重命名，处理笔记出错时不会留下残缺的JSON
+
+    :param output_file: 输出文件路径
+    :param search_info: 搜索信息
+    :param notes: 笔记的可迭代对象（可以是生成器）
+    :param pretty: 是否缩进（便于人工查看），默认紧凑格式
+    """
+    temp_file = output_file + '.tmp'
+    try:
+        with open(temp_file, 'wb') as out:
+            _write_search_json_body(out, search_info, notes, pretty)
+        os.replace(temp_file, output_file)
+    except BaseException:
+        try:
+            os.unlink(temp_file)
+        except OSError:
+            pass
+        raise
+
+
+def _write_search_json_body(out, search_info: dict, notes, pretty: bool):
+    """把搜索结果JSON写入已打开的二进制文件对象"""
+    if not pretty:
+        out.write(b'{"search_info":' + _dumps_bytes(search_info) + b',"notes":[')
+        first = True
+        for note in notes:
+            if not first:
+                out.write(b',')
+            out.write(_dumps_bytes(note))
+            first = False
+        out.write(b']}\n')
+        return
+
+    out.write(b'{\n  "search_info": ')
+    out.write(_dumps_bytes(search_info, indent=True).replace(b'\n', b'\n  '))
+    out.write(b',\n  "notes": [')
+    first = True
+    for note in notes:
+        out.write(b'\n    ' if first else b',\n    ')
+        out.write(_dumps_bytes(note, indent=True).replace(b'\n', b'\n    '))
+        first = False
+    out.write(b']' if first else b'\n  ]')
+    out.write(b'\n}\n')
+
 
 class SearchToJson:
     """
@@ -24,22 +105,51 @@ class SearchToJson:
         """
         self.xhs_apis = XHS_Apis()
     
-    def _convert_count(self, count_str):
+    def _process_note(self, note: dict, query: str, search_time: str) -> dict:
         """
-        转换数字字符串为整数
-        小红书API返回的数字可能是字符串格式，如 "37700"
+        把搜索接口返回的笔记整理为保存格式，添加更多有用信息
+
+        :param note: 搜索接口返回的单条结果
+        :param query: 搜索关键词
+        :param search_time: 本次搜索时间
+        :return: 整理后的笔记数据
         """
-        if isinstance(count_str, str):
-            try:
-                return int(count_str)
-            except ValueError:
-                return 0
-        return count_str if isinstance(count_str, int) else 0
+        note_id = note['id']
+        xsec_token = note.get('xsec_token', '')
+        card_get = note.get('note_card', {}).get
+        user_get = card_get('user', {}).get
+        interact_get = card_get('interact_info', {}).get
+        cover_get = card_get('cover', {}).get
+
+        return {
+            'note_id': note_id,
+            'title': card_get('display_title', '') or card_get('title', ''),
+            'desc': card_get('desc', ''),
+            'note_type': card_get('type', ''),
+            'xsec_token': xsec_token,
+            'note_url': f"https://www.xiaohongshu.com/explore/{note_id}?xsec_token={xsec_token}",
+            'user_id': user_get('user_id', ''),
+            'user_nickname': user_get('nickname', '') or user_get('nick_name', ''),
+            'user_avatar': user_get('avatar', ''),
+            'interact_info': {
+                'liked_count': _convert_count(interact_get('liked_count', 0)),
+                'collected_count': _convert_count(interact_get('collected_count', 0)),
+                'comment_count': _convert_count(interact_get('comment_count', 0)),
+                'share_count': _convert_count(interact_get('shared_count', 0))
+            },
+            'cover': {
+                'url': cover_get('url_default', '') or cover_get('url', ''),
+                'info_list': cover_get('info_list', [])
+            },
+            'search_time': search_time,
+            'search_query': query
+        }
         
     def search_notes_to_json(self, query: str, require_num: int, cookies_str: str, 
                             output_file: str = None, sort_type_choice: int = 0, 
                             note_type: int = 0, note_time: int = 0, note_range: int = 0, 
-                            pos_distance: int = 0, geo: dict = None, proxies: dict = None):
+                            pos_distance: int = 0, geo: dict = None, proxies: dict = None,
+                            notes_buffer: list = None, pretty: bool = False):
         """
         搜索指定关键词的笔记，将结果保存为JSON格式
         
@@ -54,6 +164,9 @@ class SearchToJson:
         :param pos_distance: 位置距离 0=不限, 1=同城, 2=附近
         :param geo: 地理位置信息 {"latitude": 纬度, "longitude": 经度}
         :param proxies: 代理设置
+        :param notes_buffer: 可选，调用方提供的列表，清空后用来存放本次结果（批量搜索时复用）；
+                             返回的是它的副本，下次调用清空缓冲区不影响已返回的结果
+        :param pretty: 是否以缩进格式保存（便于人工查看），默认紧凑格式
         :return: 成功状态, 消息, 笔记列表
         """
         try:
@@ -68,41 +181,9 @@ class SearchToJson:
                 return False, msg, []
             
             # 过滤出笔记类型的内容
-            filtered_notes = list(filter(lambda x: x['model_type'] == "note", notes))
+            filtered_notes = [x for x in notes if x['model_type'] == "note"]
             logger.info(f'搜索关键词 "{query}" 找到 {len(filtered_notes)} 篇笔记')
-            
-            # 处理笔记数据，添加更多有用信息
-            processed_notes = []
-            for note in filtered_notes:
-                note_card = note.get('note_card', {})
-                user_info = note_card.get('user', {})
-                interact_info = note_card.get('interact_info', {})
-                cover_info = note_card.get('cover', {})
-                
-                processed_note = {
-                    'note_id': note['id'],
-                    'title': note_card.get('display_title', '') or note_card.get('title', ''),
-                    'desc': note_card.get('desc', ''),
-                    'note_type': note_card.get('type', ''),
-                    'xsec_token': note.get('xsec_token', ''),
-                    'note_url': f"https://www.xiaohongshu.com/explore/{note['id']}?xsec_token={note.get('xsec_token', '')}",
-                    'user_id': user_info.get('user_id', ''),
-                    'user_nickname': user_info.get('nickname', '') or user_info.get('nick_name', ''),
-                    'user_avatar': user_info.get('avatar', ''),
-                    'interact_info': {
-                        'liked_count': self._convert_count(interact_info.get('liked_count', 0)),
-                        'collected_count': self._convert_count(interact_info.get('collected_count', 0)),
-                        'comment_count': self._convert_count(interact_info.get('comment_count', 0)),
-                        'share_count': self._convert_count(interact_info.get('shared_count', 0))
-                    },
-                    'cover': {
-                        'url': cover_info.get('url_default', '') or cover_info.get('url', ''),
-                        'info_list': cover_info.get('info_list', [])
-                    },
-                    'search_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    'search_query': query
-                }
-                processed_notes.append(processed_note)
+            search_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             
             # 生成输出文件名
             if output_file is None:
@@ -113,31 +194,40 @@ class SearchToJson:
                     os.makedirs(search_dir)
                 output_file = os.path.join(search_dir, f"search_{query}_{timestamp}.json")
             
-            # 创建完整的搜索结果数据
-            result_data = {
-                'search_info': {
-                    'query': query,
-                    'require_num': require_num,
-                    'actual_num': len(processed_notes),
-                    'sort_type': sort_type_choice,
-                    'note_type': note_type,
-                    'note_time': note_time,
-                    'note_range': note_range,
-                    'pos_distance': pos_distance,
-                    'geo': geo,
-                    'search_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                },
-                'notes': processed_notes
+            search_info = {
+                'query': query,
+                'require_num': require_num,
+                'actual_num': len(filtered_notes),
+                'sort_type': sort_type_choice,
+                'note_type': note_type,
+                'note_time': note_time,
+                'note_range': note_range,
+                'pos_distance': pos_distance,
+                'geo': geo,
+                'search_time': search_time
             }
             
-            # 保存为JSON文件
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(result_data, f, ensure_ascii=False, indent=2)
+            # 处理笔记数据的同时逐条写入JSON文件
+            if notes_buffer is not None:
+                notes_buffer.clear()
+                processed_notes = notes_buffer
+            else:
+                processed_notes = []
+
+            def iter_processed_notes():
+                for note in filtered_notes:
+                    processed_note = self._process_note(note, query, search_time)
+                    processed_notes.append(processed_note)
+                    yield processed_note
+
+            _write_search_json(output_file, search_info, iter_processed_notes(), pretty)
             
             logger.success(f'搜索结果已保存到: {output_file}')
             logger.info(f'共找到 {len(processed_notes)} 篇笔记')
             
-            return True, f'搜索成功，结果已保存到 {output_file}', processed_notes
+            # 复用的缓冲区下次搜索会被清空，返回副本给调用方
+            result_notes = processed_notes[:] if notes_buffer is not None else processed_notes
+            return True, f'搜索成功，结果已保存到 {output_file}', result_notes
             
         except Exception as e:
             error_msg = f'搜索过程中发生错误: {str(e)}'
@@ -145,7 +235,8 @@ class SearchToJson:
             return False, error_msg, []
     
     def batch_search_to_json(self, queries: list, require_num: int, cookies_str: str, 
-                           output_dir: str = "search_results", **kwargs):
+                           output_dir: str = "search_results", max_workers: int = 3,
+                           queries_per_second: float = 0.5, **kwargs):
         """
         批量搜索多个关键词并分别保存为JSON文件
         
@@ -153,6 +244,8 @@ class SearchToJson:
         :param require_num: 每个关键词搜索的数量
         :param cookies_str: 小红书cookies字符串
         :param output_dir: 输出目录
+        :param max_workers: 同时进行的搜索数
+        :param queries_per_second: 开始新搜索的平均速率（令牌桶限流，代替固定间隔sleep）
         :param kwargs: 其他搜索参数
         :return: 搜索结果汇总
         """
@@ -160,35 +253,50 @@ class SearchToJson:
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
         
-        results = []
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        for query in queries:
+        max_workers = max(1, min(max_workers, len(queries) or 1))
+        # 避免请求过于频繁：所有线程共享一个令牌桶，每个搜索开始前取一个令牌
+        rate_limiter = RateLimiter(rate=queries_per_second, burst=max_workers)
+        # 每个工作线程复用一个笔记列表；汇总计数随每个搜索完成累加
+        local = threading.local()
+        counters = {'successful_queries': 0, 'total_notes': 0}
+        counters_lock = threading.Lock()
+
+        def search_one(query):
+            rate_limiter.acquire()
             logger.info(f'开始搜索关键词: {query}')
             
+            if not hasattr(local, 'notes_buffer'):
+                local.notes_buffer = []
             output_file = os.path.join(output_dir, f"search_{query}_{timestamp}.json")
             success, msg, notes = self.search_notes_to_json(
-                query, require_num, cookies_str, output_file, **kwargs
+                query, require_num, cookies_str, output_file,
+                notes_buffer=local.notes_buffer, **kwargs
             )
+            note_count = len(notes) if notes else 0
+            with counters_lock:
+                counters['successful_queries'] += 1 if success else 0
+                counters['total_notes'] += note_count
             
-            results.append({
+            return {
                 'query': query,
                 'success': success,
                 'message': msg,
-                'note_count': len(notes) if notes else 0,
+                'note_count': note_count,
                 'output_file': output_file if success else None
-            })
-            
-            # 避免请求过于频繁
-            time.sleep(2)
+            }
+
+        # 各关键词的搜索和文件写入互不依赖，用线程池并行（结果保持关键词顺序）
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(search_one, queries))
         
         # 保存批量搜索汇总结果
         summary_file = os.path.join(output_dir, f"batch_search_summary_{timestamp}.json")
         summary_data = {
             'batch_info': {
                 'total_queries': len(queries),
-                'successful_queries': len([r for r in results if r['success']]),
-                'total_notes': sum([r['note_count'] for r in results]),
+                'successful_queries': counters['successful_queries'],
+                'total_notes': counters['total_notes'],
                 'search_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             },
             'results': results
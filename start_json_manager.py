@@ -5,17 +5,14 @@
 用于管理和解析search_results目录下的JSON文件
 """
 
+import importlib.util
 import sys
 import os
 
 def check_requirements():
-    """检查必要的依赖"""
-    missing_packages = []
-    
-    try:
-        import flask
-    except ImportError:
-        missing_packages.append('Flask')
+    """检查必要的依赖（只查找模块，不执行导入）"""
+    missing_packages = [package for package, module in [('Flask', 'flask')]
+                        if importlib.util.find_spec(module) is None]
     
     if missing_packages:
         print("❌ 缺少必要的依赖包:")
@@ -29,35 +26,34 @@ def check_requirements():
 
 def check_cookies():
     """检查Cookie配置"""
-    env_file = '.env'
-    if not os.path.exists(env_file):
-        print("⚠️  警告: 未找到 .env 文件")
-        print("请创建 .env 文件并配置小红书Cookie:")
+    from xhs_utils.common_util import env_values
+    
+    if not (env_values().get('COOKIES') or '').strip():
+        print("⚠️  警告: Cookie未正确配置")
+        print("请在 .env 文件中设置有效的小红书Cookie:")
         print("COOKIES=your_xiaohongshu_cookies_here")
         print("注意：没有Cookie将无法进行解析操作")
         return False
     
-    with open(env_file, 'r', encoding='utf-8') as f:
-        content = f.read()
-        if 'COOKIES=' not in content or content.strip().endswith('COOKIES='):
-            print("⚠️  警告: Cookie未正确配置")
-            print("请在 .env 文件中设置有效的小红书Cookie")
-            print("注意：没有Cookie将无法进行解析操作")
-            return False
-    
     return True
 
 def check_search_results():
     """检查search_results目录"""
     search_dir = 'search_results'
-    if not os.path.exists(search_dir):
+    try:
         os.makedirs(search_dir)
         print(f"📁 创建了 {search_dir} 目录")
         return 0
+    except FileExistsError:
+        pass
     
-    # 统计JSON文件数量
-    json_files = [f for f in os.listdir(search_dir) if f.endswith('.json')]
-    return len(json_files)
+    # 统计JSON文件数量（scandir逐项迭代，不构建中间列表）
+    count = 0
+    with os.scandir(search_dir) as entries:
+        for entry in entries:
+            if entry.name.endswith('.json') and entry.is_file(follow_symlinks=False):
+                count += 1
+    return count
 
 def main():
     print("="*60)
@@ -89,8 +85,7 @@ def main():
     # 创建必要的目录
     dirs_to_create = ['templates', 'search_results']
     for dir_name in dirs_to_create:
-        if not os.path.exists(dir_name):
-            os.makedirs(dir_name)
+        os.makedirs(dir_name, exist_ok=True)
     
     print("\n🚀 启动JSON文件管理界面...")
     print("📱 访问地址: http://localhost:5001")
@@ -107,7 +102,8 @@ def main():
     # 启动Flask应用
     try:
         from web_interface import app
-        app.run(debug=True, host='0.0.0.0', port=5001)
+        from xhs_utils.common_util import serve_app
+        serve_app(app, port=5001)
     except KeyboardInterrupt:
         print("\n👋 服务已停止")
     except Exception as e:
@@ -107,7 +107,7 @@ class XHSSpiderApp {
             
             if (data.success) {
                 this.currentSearchTaskId = data.task_id;
-                this.pollSearchStatus();
+                this.watchSearchStatus();
             } else {
                 this.showSearchStatus(data.message, 'danger');
                 this.resetSearchButton();
@@ -119,6 +119,53 @@ class XHSSpiderApp {
         }
     }
     
+    watchTask(streamUrl, handleTask, fallback) {
+        // 通过SSE接收任务状态推送，不支持或连接失败时退回轮询
+        if (!window.EventSource) {
+            fallback();
+            return;
+        }
+        
+        const source = new EventSource(streamUrl);
+        source.onmessage = (event) => {
+            if (handleTask(JSON.parse(event.data))) {
+                source.close();
+            }
+        };
+        source.onerror = () => {
+            source.close();
+            fallback();
+        };
+    }
+    
+    watchSearchStatus() {
+        if (!this.currentSearchTaskId) return;
+        
+        this.watchTask(
+            `/api/search/stream/${this.currentSearchTaskId}`,
+            (task) => this.handleSearchTask(task),
+            () => this.pollSearchStatus()
+        );
+    }
+    
+    handleSearchTask(task) {
+        // 返回任务是否已结束
+        if (task.status === 'completed') {
+            this.showSearchStatus(task.message, 'success');
+            this.searchResults = task.result.notes;
+            this.displaySearchResults();
+            this.resetSearchButton();
+            return true;
+        } else if (task.status === 'failed') {
+            this.showSearchStatus(task.message, 'danger');
+            this.resetSearchButton();
+            return true;
+        }
+        
+        this.showSearchStatus(task.message, 'info');
+        return false;
+    }
+    
     async pollSearchStatus() {
         if (!this.currentSearchTaskId) return;
         
@@ -126,21 +173,8 @@ class XHSSpiderApp {
             const response = await fetch(`/api/search/status/${this.currentSearchTaskId}`);
             const data = await response.json();
             
-            if (data.success) {
-                const task = data.task;
-                
-                if (task.status === 'running') {
-                    this.showSearchStatus(task.message, 'info');
-                    setTimeout(() => this.pollSearchStatus(), 2000); // 2秒后再次检查
-                } else if (task.status === 'completed') {
-                    this.showSearchStatus(task.message, 'success');
-                    this.searchResults = task.result.notes;
-                    this.displaySearchResults();
-                    this.resetSearchButton();
-                } else if (task.status === 'failed') {
-                    this.showSearchStatus(task.message, 'danger');
-                    this.resetSearchButton();
-                }
+            if (data.success && !this.handleSearchTask(data.task)) {
+                setTimeout(() => this.pollSearchStatus(), 2000); // 2秒后再次检查
             }
         } catch (error) {
             console.error('查询搜索状态失败:', error);
@@ -358,8 +392,8 @@ class XHSSpiderApp {
                 const modal = new bootstrap.Modal(document.getElementById('parseProgressModal'));
                 modal.show();
                 
-                // 开始轮询解析状态
-                this.pollParseStatus(modal);
+                // 开始监听解析状态
+                this.watchParseStatus(modal);
             } else {
                 this.showAlert(data.message, 'error');
             }
@@ -370,6 +404,38 @@ class XHSSpiderApp {
         }
     }
     
+    watchParseStatus(modal) {
+        if (!this.currentParseTaskId) return;
+        
+        this.watchTask(
+            `/api/parse/stream/${this.currentParseTaskId}`,
+            (task) => this.handleParseTask(task, modal),
+            () => this.pollParseStatus(modal)
+        );
+    }
+    
+    handleParseTask(task, modal) {
+        // 返回任务是否已结束
+        if (task.status === 'completed') {
+            this.updateParseProgress(100, task.message);
+            this.parseResults = task.result;
+            
+            setTimeout(() => {
+                modal.hide();
+                this.showAlert('所有笔记解析完成', 'success');
+                this.updateResultsTable(); // 更新表格显示解析按钮
+            }, 1000);
+            return true;
+        } else if (task.status === 'failed') {
+            modal.hide();
+            this.showAlert(task.message, 'error');
+            return true;
+        }
+        
+        this.updateParseProgress(task.progress || 0, task.message);
+        return false;
+    }
+    
     async pollParseStatus(modal) {
         if (!this.currentParseTaskId) return;
         
@@ -377,25 +443,8 @@ class XHSSpiderApp {
             const response = await fetch(`/api/parse/status/${this.currentParseTaskId}`);
             const data = await response.json();
             
-            if (data.success) {
-                const task = data.task;
-                
-                if (task.status === 'running') {
-                    this.updateParseProgress(task.progress || 0, task.message);
-                    setTimeout(() => this.pollParseStatus(modal), 2000); // 2秒后再次检查
-                } else if (task.status === 'completed') {
-                    this.updateParseProgress(100, task.message);
-                    this.parseResults = task.result;
-                    
-                    setTimeout(() => {
-                        modal.hide();
-                        this.showAlert('所有笔记解析完成', 'success');
-                        this.updateResultsTable(); // 更新表格显示解析按钮
-                    }, 1000);
-                } else if (task.status === 'failed') {
-                    modal.hide();
-                    this.showAlert(task.message, 'error');
-                }
+            if (data.success && !this.handleParseTask(data.task, modal)) {
+                setTimeout(() => this.pollParseStatus(modal), 2000); // 2秒后再次检查
             }
         } catch (error) {
             console.error('查询解析状态失败:', error);
@@ -6,8 +6,27 @@
 from json_to_full_data import JsonToFullData
 from cookie_pool import CookiePool
 from loguru import logger
+import json
 import os
 
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+
+def count_sub_comments(root):
+    """迭代统计评论下所有层级的子评论数（用栈代替递归，避免深层评论树触发RecursionError）"""
+    stack = [root]
+    count = 0
+    while stack:
+        subs = stack.pop().get('sub_comments') or ()
+        count += len(subs)
+        stack.extend(subs)
+    return count
+
+
 # 笔记URL（之前只获取了2.6%评论的笔记）
 note_url = "https://www.xiaohongshu.com/explore/68d9f63b000000001201deab?app_platform=ios&app_version=9.4&share_from_user_hidden=true&xsec_source=app_share&type=normal&xsec_token=CBrGTCtHs74eKIsj5-x2OyzW9Oh6DE_WMyOWtsC6xpDcM=&author_share=1&xhsshare=WeixinSession&shareRedId=N0o7ODs4STs2NzUyOTgwNjY0OTc5ODhL&apptime=1760745609&share_id=6d98ac057d7d433ca19a2fbb908237c0"
 
@@ -51,25 +70,17 @@ if success:
     # 读取并统计评论
     comments_file = os.path.join(output_dir, "note_68d9f63b000000001201deab_comments.jsonl")
     if os.path.exists(comments_file):
-        import json
-
         total_comments = 0
         total_sub_comments = 0
 
-        with open(comments_file, 'r', encoding='utf-8') as f:
+        # 二进制模式读取，直接交给orjson解析字节，省去逐行解码
+        with open(comments_file, 'rb', buffering=1 << 20) as f:
             for line in f:
-                comment = json.loads(line)
+                if not line.strip():
+                    continue
+                comment = _loads(line)
                 total_comments += 1
-
-                # 递归统计子评论
-                def count_recursive(c):
-                    count = len(c.get('sub_comments', []))
-                    for sub in c.get('sub_comments', []):
-                        count += count_recursive(sub)
-                    return count
-
-                sub_count = count_recursive(comment)
-                total_sub_comments += sub_count
+                total_sub_comments += count_sub_comments(comment)
 
         logger.info(f"\n📊 统计结果:")
         logger.info(f"  一级评论: {total_comments} 条")
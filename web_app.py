@@ -4,41 +4,370 @@
 Flask 后端API服务，提供前端界面和API接口
 """
 
+import functools
+import hashlib
+import itertools
 import os
+import shutil
+import stat
 import json
 import time
 import threading
+import types
 import uuid
-import requests
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from flask import Flask, request, jsonify, render_template, send_file, Response
+from flask import Flask, request, jsonify, render_template, send_file, Response, stream_with_context
 from flask_cors import CORS
 from loguru import logger
+from xhs_utils.common_util import install_orjson_provider, serve_app
+
+try:
+    import orjson
+except ImportError:  # orjson为可选依赖，缺失时退回标准库json
+    orjson = None
+
+# 爬虫模块（及其依赖的requests/execjs/openpyxl等）较重，在第一次用到时才导入
+
+# 解析结果写文件的线程数（各笔记文件互不依赖，写盘时释放GIL）
+NOTE_WRITE_WORKERS = 8
+# 解析任务并发获取笔记详情的默认线程数
+PARSE_WORKERS = 8
+# 解析任务请求速率（每秒请求数）与允许的突发请求数
+PARSE_REQUESTS_PER_SECOND = 2.0
+PARSE_BURST = 4
+# 图片代理转发时每次读取的块大小
+PROXY_CHUNK_SIZE = 64 * 1024
+# 图片代理请求头，模拟正常浏览器访问（只读，每次请求复制后再添加Cookie）
+_PROXY_HEADERS = types.MappingProxyType({
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Referer': 'https://www.xiaohongshu.com/',
+    'Accept': 'image/webp,image/apng,image/*,*/*;q=0.8',
+    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'Connection': 'keep-alive',
+    'Sec-Fetch-Dest': 'image',
+    'Sec-Fetch-Mode': 'no-cors',
+    'Sec-Fetch-Site': 'cross-site'
+})
+# 图片代理磁盘缓存目录、有效期与容量上限
+IMAGE_CACHE_DIR = 'image_cache'
+IMAGE_CACHE_TTL = 7 * 24 * 3600
+IMAGE_CACHE_MAX_BYTES = 512 * 1024 * 1024
+# 每写入多少张图片检查一次缓存容量
+IMAGE_CACHE_PRUNE_EVERY = 50
+# 缓存文件扩展名（send_file根据扩展名推断Content-Type）
+_IMAGE_CACHE_EXTS = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/webp': '.webp',
+    'image/gif': '.gif',
+    'image/avif': '.avif',
+    'image/heic': '.heic',
+}
+_image_cache_lock = threading.Lock()
+_image_cache_writes = itertools.count(1)  # next()在C层完成，多个请求线程并发计数不会丢失
+
+
+def _dump_json_file(file_path, data):
+    """以缩进格式写JSON文件，优先使用orjson直接写字节"""
+    if orjson is not None:
+        content = orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    else:
+        content = json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+    with open(file_path, 'wb') as f:
+        f.write(content)
 
-# 导入爬虫模块
-from search_to_json import SearchToJson
-from json_to_full_data import JsonToFullData
-from xhs_utils.common_util import init
 
 app = Flask(__name__)
+install_orjson_provider(app)  # jsonify使用orjson序列化
 CORS(app)  # 允许跨域请求
 
+# 内存中最多保留的任务数（每类任务分别计算）
+MAX_TASKS = 500
+# SSE状态推送在无变化时发送心跳的间隔（秒）
+TASK_STREAM_HEARTBEAT = 15
+# 单个SSE连接的最长保持时间（秒）：每个连接占用一个服务线程，到时关闭，前端改为轮询
+TASK_STREAM_MAX_AGE = 120
+
+
+class TaskStore:
+    """
+    线程安全的任务状态存储，超过容量时淘汰最早创建的已结束任务，并实时维护运行中任务数；
+    每次更新递增任务版本号并唤醒等待者，供SSE推送状态变化
+    """
+
+    def __init__(self, max_tasks=MAX_TASKS):
+        """
+        :param max_tasks: 最多保留的任务数
+        """
+        self.max_tasks = max_tasks
+        self.tasks = OrderedDict()
+        self.versions = {}
+        self.running = 0
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+
+    def add(self, task_id, task):
+        """添加任务，超出容量时淘汰旧任务"""
+        with self.lock:
+            self.tasks[task_id] = task
+            self.versions[task_id] = 0
+            if task['status'] == 'running':
+                self.running += 1
+            if len(self.tasks) > self.max_tasks:
+                self._evict()
+
+    def _evict(self):
+        """淘汰最早的非运行中任务（调用方需持有锁）"""
+        for old_id, old_task in self.tasks.items():
+            if old_task['status'] not in ('pending', 'running'):
+                del self.tasks[old_id]
+                del self.versions[old_id]
+                return
+
+    def get(self, task_id):
+        """获取任务状态快照，任务不存在时返回None"""
+        with self.lock:
+            task = self.tasks.get(task_id)
+            return dict(task) if task is not None else None
+
+    def update(self, task_id, **fields):
+        """在锁内更新任务字段"""
+        with self.lock:
+            task = self.tasks.get(task_id)
+            if task is None:
+                return
+            if 'status' in fields:
+                was_running = task['status'] == 'running'
+                is_running = fields['status'] == 'running'
+                self.running += is_running - was_running
+            task.update(fields)
+            self.versions[task_id] += 1
+            self.changed.notify_all()
+
+    def wait_for_change(self, task_id, version, timeout):
+        """
+        等待任务状态版本号变化
+        :param task_id: 任务ID
+        :param version: 调用方已看到的版本号
+        :param timeout: 最长等待秒数
+        :return: (当前版本号, 任务状态快照)，任务不存在时为 (None, None)
+        """
+        with self.changed:
+            self.changed.wait_for(lambda: self.versions.get(task_id) != version, timeout)
+            task = self.tasks.get(task_id)
+            if task is None:
+                return None, None
+            return self.versions[task_id], dict(task)
+
+    def running_count(self):
+        """运行中的任务数"""
+        return self.running
+
+    def values(self):
+        """所有任务状态快照"""
+        with self.lock:
+            return [dict(task) for task in self.tasks.values()]
+
+    def __len__(self):
+        with self.lock:
+            return len(self.tasks)
+
+
 # 全局变量存储任务状态
-search_tasks = {}  # 搜索任务状态
-parse_tasks = {}   # 解析任务状态
+search_tasks = TaskStore()  # 搜索任务状态
+parse_tasks = TaskStore()   # 解析任务状态
 
-# 初始化爬虫实例
-search_spider = SearchToJson()
-full_data_processor = JsonToFullData()
 
-# 初始化cookies
-try:
-    cookies_str, base_path = init()
-    logger.info("✅ Cookie初始化成功")
-except Exception as e:
-    cookies_str = ""
-    base_path = {"media": "datas/media_datas", "excel": "datas/excel_datas"}
-    logger.error(f"❌ Cookie初始化失败: {e}")
+@functools.lru_cache(maxsize=None)
+def get_search_spider():
+    """搜索爬虫实例（首次调用时创建）"""
+    from search_to_json import SearchToJson
+    return SearchToJson()
+
+
+@functools.lru_cache(maxsize=None)
+def get_full_data_processor():
+    """笔记详情处理器实例（首次调用时创建）"""
+    from json_to_full_data import JsonToFullData
+    return JsonToFullData()
+
+
+@functools.lru_cache(maxsize=None)
+def get_cookies():
+    """读取.env中的Cookie并初始化数据目录（首次调用时执行，之后直接返回缓存值）"""
+    from xhs_utils.common_util import init
+    try:
+        cookies_str, _ = init()
+        logger.info("✅ Cookie初始化成功")
+        return cookies_str or ""
+    except Exception as e:
+        logger.error(f"❌ Cookie初始化失败: {e}")
+        return ""
+
+
+@functools.lru_cache(maxsize=None)
+def get_proxy_session():
+    """图片代理共用的requests会话（首次调用时创建，复用连接池保持长连接）"""
+    import requests
+    from requests.adapters import HTTPAdapter
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=32, pool_maxsize=64, max_retries=1)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def _image_cache_key(image_url):
+    """图片URL对应的缓存键"""
+    return hashlib.blake2b(image_url.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _find_cached_image(key):
+    """
+    查找未过期的缓存图片
+    :param key: 缓存键
+    :return: 缓存文件路径，不存在或已过期时返回None
+    """
+    now = time.time()
+    for ext in _IMAGE_CACHE_EXTS.values():
+        cache_file = os.path.join(IMAGE_CACHE_DIR, key + ext)
+        try:
+            mtime = os.stat(cache_file).st_mtime
+        except OSError:
+            continue
+        if now - mtime < IMAGE_CACHE_TTL:
+            return cache_file
+    return None
+
+
+def _prune_image_cache():
+    """删除过期的缓存图片，并按修改时间从旧到新删除直到总大小不超过上限"""
+    if not _image_cache_lock.acquire(blocking=False):
+        return  # 已有线程在清理
+    try:
+        now = time.time()
+        entries = []
+        total_size = 0
+        with os.scandir(IMAGE_CACHE_DIR) as it:
+            for entry in it:
+                if not entry.is_file() or entry.name.endswith('.tmp'):
+                    continue
+                st = entry.stat()
+                if now - st.st_mtime >= IMAGE_CACHE_TTL:
+                    os.unlink(entry.path)
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total_size += st.st_size
+        
+        if total_size > IMAGE_CACHE_MAX_BYTES:
+            entries.sort()
+            for _, size, path in entries:
+                os.unlink(path)
+                total_size -= size
+                if total_size <= IMAGE_CACHE_MAX_BYTES:
+                    break
+    except OSError as e:
+        logger.warning(f"⚠️ 清理图片缓存失败: {e}")
+    finally:
+        _image_cache_lock.release()
+
+
+def _image_cache_stored():
+    """记录一次缓存写入，达到阈值时在后台清理缓存"""
+    if next(_image_cache_writes) % IMAGE_CACHE_PRUNE_EVERY == 0:
+        threading.Thread(target=_prune_image_cache, daemon=True).start()
+
+
+def _scan_processed_notes():
+    """
+    扫描已有的 parse_results_* 目录，收集已保存过完整信息的笔记（空文件不计入）
+    :return: {note_id: 笔记文件路径}，同一笔记以最新目录中的文件为准
+    """
+    processed = {}
+    try:
+        with os.scandir('.') as it:
+            result_dirs = sorted(entry.path for entry in it
+                                 if entry.name.startswith('parse_results_') and entry.is_dir())
+    except OSError:
+        return processed
+    
+    for result_dir in result_dirs:
+        try:
+            with os.scandir(result_dir) as it:
+                for entry in it:
+                    name = entry.name
+                    if name.startswith('note_') and name.endswith('_full.json') and entry.stat().st_size > 0:
+                        processed[name[len('note_'):-len('_full.json')]] = entry.path
+        except OSError:
+            continue
+    return processed
+
+
+def _search_task_view(task_id, task):
+    """搜索任务对外返回的状态字段"""
+    return {
+        'task_id': task_id,
+        'status': task['status'],
+        'message': task['message'],
+        'query': task['query'],
+        'require_num': task['require_num'],
+        'create_time': datetime.fromtimestamp(task['create_time_ts']).isoformat(),
+        'result': task['result']
+    }
+
+
+def _parse_task_view(task_id, task):
+    """解析任务对外返回的状态字段"""
+    return {
+        'task_id': task_id,
+        'status': task['status'],
+        'message': task['message'],
+        'progress': task.get('progress', 0),
+        'json_file_path': task['json_file_path'],
+        'create_time': datetime.fromtimestamp(task['create_time_ts']).isoformat(),
+        'result': task['result']
+    }
+
+
+def _task_event_stream(store, task_id, view):
+    """
+    任务状态的SSE响应：状态每变化一次推送一条事件，任务结束或超过 TASK_STREAM_MAX_AGE 后关闭连接
+    :param store: 任务存储
+    :param task_id: 任务ID
+    :param view: 任务状态转为返回字段的函数
+    """
+    def generate():
+        version = -1
+        deadline = time.monotonic() + TASK_STREAM_MAX_AGE
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return  # 释放服务线程，前端在连接断开后退回轮询
+            new_version, task = store.wait_for_change(task_id, version, min(TASK_STREAM_HEARTBEAT, remaining))
+            if task is None:
+                yield 'event: missing\ndata: {}\n\n'
+                return
+            if new_version == version:
+                yield ': keepalive\n\n'  # 无变化时发送注释行保持连接
+                continue
+            version = new_version
+            data = view(task_id, task)
+            if orjson is not None:
+                payload = orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+            else:
+                payload = json.dumps(data, ensure_ascii=False)
+            yield f'data: {payload}\n\n'
+            if task['status'] in ('completed', 'failed'):
+                return
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 
 def background_search_task(task_id, query, require_num, search_params):
@@ -46,32 +375,32 @@ def background_search_task(task_id, query, require_num, search_params):
     后台执行搜索任务
     """
     try:
-        search_tasks[task_id]['status'] = 'running'
-        search_tasks[task_id]['message'] = '正在搜索笔记...'
+        search_tasks.update(task_id, status='running', message='正在搜索笔记...')
         
         # 执行搜索
-        success, msg, notes = search_spider.search_notes_to_json(
+        success, msg, notes = get_search_spider().search_notes_to_json(
             query=query,
             require_num=require_num,
-            cookies_str=cookies_str,
+            cookies_str=get_cookies(),
             **search_params
         )
         
         if success:
-            search_tasks[task_id]['status'] = 'completed'
-            search_tasks[task_id]['message'] = f'搜索完成，找到 {len(notes)} 篇笔记'
-            search_tasks[task_id]['result'] = {
-                'notes': notes,
-                'total_count': len(notes),
-                'json_file': msg.split('保存到 ')[-1] if '保存到' in msg else ''
-            }
+            search_tasks.update(
+                task_id,
+                status='completed',
+                message=f'搜索完成，找到 {len(notes)} 篇笔记',
+                result={
+                    'notes': notes,
+                    'total_count': len(notes),
+                    'json_file': msg.split('保存到 ')[-1] if '保存到' in msg else ''
+                }
+            )
         else:
-            search_tasks[task_id]['status'] = 'failed'
-            search_tasks[task_id]['message'] = f'搜索失败: {msg}'
+            search_tasks.update(task_id, status='failed', message=f'搜索失败: {msg}')
             
     except Exception as e:
-        search_tasks[task_id]['status'] = 'failed'
-        search_tasks[task_id]['message'] = f'搜索异常: {str(e)}'
+        search_tasks.update(task_id, status='failed', message=f'搜索异常: {str(e)}')
 
 
 def background_parse_task(task_id, json_file_path, parse_params):
@@ -79,91 +408,154 @@ def background_parse_task(task_id, json_file_path, parse_params):
     后台执行解析任务
     """
     try:
-        parse_tasks[task_id]['status'] = 'running'
-        parse_tasks[task_id]['message'] = '正在解析笔记详细信息...'
-        parse_tasks[task_id]['progress'] = 0
+        parse_tasks.update(task_id, status='running', message='正在解析笔记详细信息...', progress=0)
         
         # 先解析JSON文件获取笔记列表
-        success, msg, note_urls = full_data_processor.parse_json_file(json_file_path)
+        full_data_processor = get_full_data_processor()
+        success, msg, note_refs = full_data_processor.parse_json_file(json_file_path)
         if not success:
-            parse_tasks[task_id]['status'] = 'failed'
-            parse_tasks[task_id]['message'] = f'解析JSON失败: {msg}'
+            parse_tasks.update(task_id, status='failed', message=f'解析JSON失败: {msg}')
             return
         
-        total_notes = len(note_urls)
-        successful_notes = []
-        failed_notes = []
+        from cookie_pool import RateLimiter
+        from json_to_full_data import _dumps_bytes, _fast_load_json, _note_summary_stub, _write_summary_json
+        
+        # 去重；请求中指定skip_processed时，跳过之前解析结果目录中已有完整信息的笔记（默认重新获取）
+        processed = _scan_processed_notes() if parse_params.get('skip_processed', False) else {}
+        seen = set()
+        cached_refs = []
+        pending_refs = []
+        for note_ref in note_refs:
+            note_id = note_ref['note_id']
+            if note_id in seen:
+                continue
+            seen.add(note_id)
+            if note_id in processed:
+                cached_refs.append(note_ref)
+            else:
+                pending_refs.append(note_ref)
+        if cached_refs or len(seen) < len(note_refs):
+            logger.info(f"♻️ 共 {len(note_refs)} 个笔记，去重后 {len(seen)} 个，其中 {len(cached_refs)} 个已解析过，直接复用")
+        note_refs = pending_refs
+        
+        total_notes = len(seen)
+        cookies_str = get_cookies()
+        proxies = parse_params.get('proxies')
+        include_comments = parse_params.get('include_comments', True)
+        # 令牌桶限流代替固定延时，多个线程共享同一请求速率
+        rate_limiter = RateLimiter(rate=PARSE_REQUESTS_PER_SECOND, burst=PARSE_BURST)
+        
+        def fetch_note(note_ref):
+            rate_limiter.acquire()
+            return full_data_processor.get_note_full_info(
+                note_ref, cookies_str=cookies_str, proxies=proxies,
+                include_comments=include_comments
+            )
         
-        # 逐个处理笔记
-        for i, note_url in enumerate(note_urls):
-            try:
-                parse_tasks[task_id]['progress'] = int((i / total_notes) * 100)
-                parse_tasks[task_id]['message'] = f'正在处理第 {i+1}/{total_notes} 个笔记...'
+        # 结果边处理边写入磁盘，内存中只保留计数
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_dir = f"parse_results_{timestamp}"
+        os.makedirs(output_dir, exist_ok=True)
+        successful_file = os.path.join(output_dir, "successful_notes.jsonl")
+        failed_file = os.path.join(output_dir, "failed_notes.jsonl")
+        summary_file = os.path.join(output_dir, "summary_all_notes.json")
+        
+        successful_count = 0
+        failed_count = 0
+        done_count = 0
+        write_futures = []  # (笔记文件, 写入任务)，结束前逐个检查写入结果
+        
+        # 并发处理笔记，单个笔记文件交给写线程池保存
+        with ThreadPoolExecutor(max_workers=NOTE_WRITE_WORKERS) as write_executor, \
+                ThreadPoolExecutor(max_workers=parse_params.get('workers', PARSE_WORKERS)) as executor, \
+                open(successful_file, 'wb') as successful_f, open(failed_file, 'wb') as failed_f:
+            # 已解析过的笔记直接从旧文件复制，不再发起请求
+            for note_ref in cached_refs:
+                cached_file = processed[note_ref['note_id']]
+                try:
+                    cached_note = _fast_load_json(cached_file)
+                except (OSError, ValueError) as e:
+                    logger.warning(f"⚠️ 读取已解析笔记失败，重新获取: {cached_file} - {e}")
+                    note_refs.append(note_ref)
+                    continue
+                note_file = os.path.join(output_dir, os.path.basename(cached_file))
+                write_futures.append((note_file, write_executor.submit(shutil.copyfile, cached_file, note_file)))
+                successful_f.write(_dumps_bytes(_note_summary_stub(cached_note)) + b'\n')
+                successful_count += 1
+                done_count += 1
+            
+            futures = {executor.submit(fetch_note, note_ref): note_ref['url'] for note_ref in note_refs}
+            for future in as_completed(futures):
+                note_url = futures.pop(future)
+                try:
+                    note_success, note_msg, full_note_info = future.result()
+                    if note_success and full_note_info:
+                        note_file = os.path.join(output_dir, f"note_{full_note_info['note_id']}_full.json")
+                        write_futures.append((note_file, write_executor.submit(_dump_json_file, note_file, full_note_info)))
+                        successful_f.write(_dumps_bytes(_note_summary_stub(full_note_info)) + b'\n')
+                        successful_count += 1
+                    else:
+                        failed_f.write(_dumps_bytes({'url': note_url, 'error': note_msg}) + b'\n')
+                        failed_count += 1
+                except Exception as e:
+                    failed_f.write(_dumps_bytes({'url': note_url, 'error': str(e)}) + b'\n')
+                    failed_count += 1
+                    logger.error(f'处理笔记失败: {e}')
                 
-                # 获取笔记完整信息
-                note_success, note_msg, full_note_info = full_data_processor.get_note_full_info(
-                    note_url, cookies_str, parse_params.get('proxies'), 
-                    parse_params.get('include_comments', True)
+                done_count += 1
+                parse_tasks.update(
+                    task_id,
+                    progress=int((done_count / total_notes) * 100),
+                    message=f'已处理 {done_count}/{total_notes} 个笔记...'
                 )
-                
-                if note_success and full_note_info:
-                    successful_notes.append(full_note_info)
-                else:
-                    failed_notes.append({'url': note_url, 'error': note_msg})
-                
-                # 添加延时避免请求过快
-                time.sleep(1)
-                
+        
+        # 写线程池退出时已全部执行完，逐个取结果，磁盘已满、权限不足等写入错误不能被忽略
+        write_errors = 0
+        for note_file, future in write_futures:
+            try:
+                future.result()
             except Exception as e:
-                failed_notes.append({'url': note_url, 'error': str(e)})
-                logger.error(f'处理笔记失败: {e}')
-        
-        # 保存结果
-        if successful_notes:
-            # 生成输出目录
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_dir = f"parse_results_{timestamp}"
-            os.makedirs(output_dir, exist_ok=True)
-            
-            # 保存汇总数据
-            summary_data = {
-                'process_info': {
-                    'source_json': json_file_path,
-                    'total_notes': total_notes,
-                    'successful_notes': len(successful_notes),
-                    'failed_notes': len(failed_notes),
-                    'process_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                },
-                'successful_notes': successful_notes,
-                'failed_notes': failed_notes
-            }
-            
-            # 保存汇总JSON
-            summary_file = os.path.join(output_dir, "summary_all_notes.json")
-            with open(summary_file, 'w', encoding='utf-8') as f:
-                json.dump(summary_data, f, ensure_ascii=False, indent=2)
-            
-            # 保存单个笔记文件
-            for note in successful_notes:
-                note_file = os.path.join(output_dir, f"note_{note['note_id']}_full.json")
-                with open(note_file, 'w', encoding='utf-8') as f:
-                    json.dump(note, f, ensure_ascii=False, indent=2)
-            
-            parse_tasks[task_id]['result'] = {
-                'total_notes': total_notes,
-                'successful_notes': len(successful_notes),
-                'failed_notes': len(failed_notes),
-                'output_directory': output_dir,
-                'summary_file': summary_file
-            }
-        
-        parse_tasks[task_id]['status'] = 'completed'
-        parse_tasks[task_id]['progress'] = 100
-        parse_tasks[task_id]['message'] = f'解析完成！成功: {len(successful_notes)}, 失败: {len(failed_notes)}'
+                write_errors += 1
+                logger.error(f'保存笔记文件失败: {note_file} - {e}')
+        
+        # 汇总JSON从JSONL流式拼接，汇总中只记录笔记索引，完整内容在单个笔记文件中
+        process_info = {
+            'source_json': json_file_path,
+            'total_notes': total_notes,
+            'successful_notes': successful_count,
+            'failed_notes': failed_count,
+            'process_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }
+        _write_summary_json(summary_file, process_info, successful_file, failed_file)
+        
+        parse_tasks.update(task_id, result={
+            'total_notes': total_notes,
+            'successful_notes': successful_count,
+            'failed_notes': failed_count,
+            'output_directory': output_dir,
+            'summary_file': summary_file,
+            'successful_file': successful_file,
+            'write_errors': write_errors
+        })
+        
+        if write_errors:
+            parse_tasks.update(
+                task_id,
+                status='failed',
+                progress=100,
+                message=f'解析完成，但有 {write_errors} 个笔记文件保存失败（成功: {successful_count}, 失败: {failed_count}）'
+            )
+            return
+        
+        parse_tasks.update(
+            task_id,
+            status='completed',
+            progress=100,
+            message=f'解析完成！成功: {successful_count}, 失败: {failed_count}'
+        )
         
     except Exception as e:
-        parse_tasks[task_id]['status'] = 'failed'
-        parse_tasks[task_id]['message'] = f'解析异常: {str(e)}'
+        parse_tasks.update(task_id, status='failed', message=f'解析异常: {str(e)}')
         logger.error(f'解析任务异常: {e}')
 
 
@@ -210,14 +602,14 @@ def api_search():
         
         # 生成任务ID
         task_id = str(uuid.uuid4())
-        search_tasks[task_id] = {
+        search_tasks.add(task_id, {
             'status': 'pending',
             'message': '任务已创建，等待执行...',
             'query': query,
             'require_num': require_num,
-            'create_time': datetime.now().isoformat(),
+            'create_time_ts': time.time(),
             'result': None
-        }
+        })
         
         # 启动后台任务
         thread = threading.Thread(
@@ -246,27 +638,27 @@ def api_search_status(task_id):
     """
     查询搜索任务状态
     """
-    if task_id not in search_tasks:
+    task = search_tasks.get(task_id)
+    if task is None:
         return jsonify({
             'success': False,
             'message': '任务不存在'
         })
     
-    task = search_tasks[task_id]
     return jsonify({
         'success': True,
-        'task': {
-            'task_id': task_id,
-            'status': task['status'],
-            'message': task['message'],
-            'query': task['query'],
-            'require_num': task['require_num'],
-            'create_time': task['create_time'],
-            'result': task['result']
-        }
+        'task': _search_task_view(task_id, task)
     })
 
 
+@app.route('/api/search/stream/<task_id>')
+def api_search_stream(task_id):
+    """
+    以SSE推送搜索任务状态变化
+    """
+    return _task_event_stream(search_tasks, task_id, _search_task_view)
+
+
 @app.route('/api/parse', methods=['POST'])
 def api_parse():
     """
@@ -287,18 +679,20 @@ def api_parse():
             'include_comments': data.get('include_comments', True),
             'download_media': data.get('download_media', True),
             'save_format': data.get('save_format', 'json'),
-            'proxies': data.get('proxies')
+            'proxies': data.get('proxies'),
+            'workers': data.get('workers', PARSE_WORKERS),
+            'skip_processed': data.get('skip_processed', False)
         }
         
         # 生成任务ID
         task_id = str(uuid.uuid4())
-        parse_tasks[task_id] = {
+        parse_tasks.add(task_id, {
             'status': 'pending',
             'message': '任务已创建，等待执行...',
             'json_file_path': json_file_path,
-            'create_time': datetime.now().isoformat(),
+            'create_time_ts': time.time(),
             'result': None
-        }
+        })
         
         # 启动后台任务
         thread = threading.Thread(
@@ -327,27 +721,27 @@ def api_parse_status(task_id):
     """
     查询解析任务状态
     """
-    if task_id not in parse_tasks:
+    task = parse_tasks.get(task_id)
+    if task is None:
         return jsonify({
             'success': False,
             'message': '任务不存在'
         })
     
-    task = parse_tasks[task_id]
     return jsonify({
         'success': True,
-        'task': {
-            'task_id': task_id,
-            'status': task['status'],
-            'message': task['message'],
-            'progress': task.get('progress', 0),
-            'json_file_path': task['json_file_path'],
-            'create_time': task['create_time'],
-            'result': task['result']
-        }
+        'task': _parse_task_view(task_id, task)
     })
 
 
+@app.route('/api/parse/stream/<task_id>')
+def api_parse_stream(task_id):
+    """
+    以SSE推送解析任务状态变化
+    """
+    return _task_event_stream(parse_tasks, task_id, _parse_task_view)
+
+
 @app.route('/api/single_note_detail', methods=['POST'])
 def api_single_note_detail():
     """
@@ -365,8 +759,8 @@ def api_single_note_detail():
             })
         
         # 实时获取笔记详情
-        success, msg, note_detail = full_data_processor.get_note_full_info(
-            note_url, cookies_str, None, include_comments
+        success, msg, note_detail = get_full_data_processor().get_note_full_info(
+            note_url, get_cookies(), None, include_comments
         )
         
         if success and note_detail:
@@ -437,9 +831,9 @@ def api_system_status():
     return jsonify({
         'success': True,
         'status': {
-            'cookies_available': bool(cookies_str),
-            'running_search_tasks': len([t for t in search_tasks.values() if t['status'] == 'running']),
-            'running_parse_tasks': len([t for t in parse_tasks.values() if t['status'] == 'running']),
+            'cookies_available': bool(get_cookies()),
+            'running_search_tasks': search_tasks.running_count(),
+            'running_parse_tasks': parse_tasks.running_count(),
             'total_search_tasks': len(search_tasks),
             'total_parse_tasks': len(parse_tasks)
         }
@@ -459,37 +853,67 @@ def api_proxy_image():
                 'message': '图片URL不能为空'
             }), 400
         
-        # 设置小红书请求头，模拟正常浏览器访问
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Referer': 'https://www.xiaohongshu.com/',
-            'Accept': 'image/webp,image/apng,image/*,*/*;q=0.8',
-            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
-            'Sec-Fetch-Dest': 'image',
-            'Sec-Fetch-Mode': 'no-cors',
-            'Sec-Fetch-Site': 'cross-site'
-        }
-        
-        # 添加cookie如果可用
+        # 命中磁盘缓存时直接返回，不再请求上游
+        cache_key = _image_cache_key(image_url)
+        cache_file = _find_cached_image(cache_key)
+        if cache_file:
+            response = send_file(os.path.abspath(cache_file), max_age=3600)
+            response.headers['Access-Control-Allow-Origin'] = '*'
+            return response
+        
+        # 设置小红书请求头，添加cookie如果可用
+        headers = dict(_PROXY_HEADERS)
+        cookies_str = get_cookies()
         if cookies_str:
             headers['Cookie'] = cookies_str
         
         # 请求图片
-        response = requests.get(image_url, headers=headers, timeout=10, stream=True)
+        response = get_proxy_session().get(image_url, headers=headers, timeout=10, stream=True)
         
         if response.status_code == 200:
-            # 返回图片数据
+            content_type = response.headers.get('content-type', 'image/jpeg')
+            cache_ext = _IMAGE_CACHE_EXTS.get(content_type.split(';')[0].strip().lower())
+            
+            def generate():
+                # 转发的同时写入临时文件，完整读取后再原子替换为缓存文件
+                tmp_file = None
+                f = None
+                if cache_ext:
+                    try:
+                        os.makedirs(IMAGE_CACHE_DIR, exist_ok=True)
+                        tmp_file = os.path.join(IMAGE_CACHE_DIR, f"{cache_key}.{uuid.uuid4().hex}.tmp")
+                        f = open(tmp_file, 'wb')
+                    except OSError as e:
+                        logger.warning(f"⚠️ 无法写入图片缓存: {e}")
+                        tmp_file = None
+                completed = False
+                try:
+                    for chunk in response.iter_content(chunk_size=PROXY_CHUNK_SIZE):
+                        if f:
+                            f.write(chunk)
+                        yield chunk
+                    completed = True
+                finally:
+                    response.close()
+                    if f:
+                        f.close()
+                        if completed:
+                            os.replace(tmp_file, os.path.join(IMAGE_CACHE_DIR, cache_key + cache_ext))
+                            _image_cache_stored()
+                        else:
+                            os.unlink(tmp_file)
+            
+            # 边读边转发图片数据，不在内存中缓存整张图片
             return Response(
-                response.content,
-                content_type=response.headers.get('content-type', 'image/jpeg'),
+                stream_with_context(generate()),
+                content_type=content_type,
                 headers={
                     'Cache-Control': 'public, max-age=3600',  # 缓存1小时
                     'Access-Control-Allow-Origin': '*'
                 }
             )
         else:
+            response.close()
             logger.error(f"图片请求失败: {response.status_code} - {image_url}")
             return jsonify({
                 'success': False,
@@ -510,14 +934,28 @@ def api_download_file(filename):
     文件下载API
     """
     try:
-        file_path = os.path.join(os.getcwd(), filename)
-        if os.path.exists(file_path):
-            return send_file(file_path, as_attachment=True)
-        else:
+        root = os.path.realpath(os.getcwd())
+        file_path = os.path.realpath(os.path.join(root, filename))
+        # 只允许下载工作目录内的文件
+        if os.path.commonpath([file_path, root]) != root:
+            return jsonify({
+                'success': False,
+                'message': '非法的文件路径'
+            }), 400
+        
+        # 一次stat同时判断存在性与文件类型
+        try:
+            is_file = stat.S_ISREG(os.stat(file_path).st_mode)
+        except OSError:
+            is_file = False
+        if not is_file:
             return jsonify({
                 'success': False,
                 'message': '文件不存在'
             }), 404
+        
+        # conditional=True 支持Range断点续传；WSGI服务器提供file_wrapper时走sendfile零拷贝
+        return send_file(file_path, as_attachment=True, conditional=True)
     except Exception as e:
         logger.error(f"文件下载错误: {e}")
         return jsonify({
@@ -527,17 +965,11 @@ def api_download_file(filename):
 
 
 if __name__ == '__main__':
-    # 创建模板目录
-    template_dir = 'templates'
-    if not os.path.exists(template_dir):
-        os.makedirs(template_dir)
-    
-    # 创建静态文件目录
-    static_dir = 'static'
-    if not os.path.exists(static_dir):
-        os.makedirs(static_dir)
+    # 创建模板目录和静态文件目录
+    for dir_name in ('templates', 'static'):
+        os.makedirs(dir_name, exist_ok=True)
     
     logger.info("🚀 启动小红书数据爬取Web应用")
     logger.info("📱 访问地址: http://localhost:8888")
 
-    app.run(debug=True, host='0.0.0.0', port=8888)
\ No newline at end of file
+    serve_app(app, port=8888)
\ No newline at end of file
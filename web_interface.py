@@ -7,14 +7,21 @@ Flask Web应用 - 小红书搜索结果管理界面
 """
 
 from flask import Flask, render_template, jsonify, request
+import hashlib
 import os
-import json
+import re
+import ijson
+import threading
 import time
+import uuid
 import sys
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
-from xhs_utils.common_util import init
-from json_to_full_data import JsonToFullData
+from xhs_utils.common_util import init, install_orjson_provider, serve_app
+from json_to_full_data import JsonToFullData, _fast_load_json
+from progress_manager import load_progress_snapshot
 from typing import Dict, List, Any
 from cookie_pool import cookie_pool, initialize_pool_from_env
 from loguru import logger
@@ -37,12 +44,23 @@ logger.add(
     level="DEBUG",
     format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}"
 )
+# 可选：结构化JSON日志（每行一条记录，包含bind的note_id等字段，便于用jq过滤）
+if os.getenv('LOG_JSON', '').lower() in ('1', 'true', 'yes'):
+    logger.add(
+        "logs/web_interface.jsonl",
+        rotation="10 MB",
+        retention="7 days",
+        encoding="utf-8",
+        level="DEBUG",
+        serialize=True
+    )
 
 logger.info("=" * 60)
 logger.info("小红书JSON文件管理系统启动中...")
 logger.info("=" * 60)
 
 app = Flask(__name__)
+install_orjson_provider(app)  # jsonify使用orjson序列化
 
 # ========== 启动时清理临时文件 ==========
 def cleanup_temp_files():
@@ -72,6 +90,28 @@ cleanup_temp_files()
 # 配置
 SEARCH_RESULTS_DIR = "search_results"
 TEMPLATES_DIR = "templates"
+_SEARCH_DIR_ABS = os.path.abspath(SEARCH_RESULTS_DIR)
+
+# 文件名中不允许出现的路径成分（防止路径遍历）
+_BAD_NAME = re.compile(r'\.\.|[/\\]')
+
+def _safe_name(filename) -> bool:
+    """检查文件名是否为不含路径成分的普通文件名"""
+    return isinstance(filename, str) and bool(filename) and not _BAD_NAME.search(filename)
+
+# 读取搜索结果文件用的IO线程池（文件读取释放GIL，多个文件的磁盘等待可以重叠）
+_IO_POOL = ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4))
+
+# 搜索结果文件元信息缓存：{文件名: ((st_mtime_ns, st_size), 元信息)}
+_META_CACHE = {}
+_META_CACHE_LOCK = threading.Lock()
+
+# 后台解析任务队列：同时执行的解析任务数，以及内存中保留的任务记录上限
+PARSE_JOB_WORKERS = 2
+MAX_PARSE_JOBS = 100
+_PARSE_JOB_POOL = ThreadPoolExecutor(max_workers=PARSE_JOB_WORKERS)
+_parse_jobs = OrderedDict()
+_parse_jobs_lock = threading.Lock()
 
 # 初始化环境
 cookies_str, base_path = init()
@@ -96,93 +136,179 @@ def cookie_pool_page():
     """渲染Cookie池管理页面"""
     return render_template('cookie_pool.html')
 
+def _parse_json_meta(json_path: str, filename: str) -> dict:
+    """
+    用ijson流式扫描搜索结果文件，只提取关键词、笔记数和预期评论总数，不把笔记列表整体载入内存
+
+    :param json_path: JSON文件路径
+    :param filename: 文件名
+    :return: {'keyword', 'note_count', 'total_expected_comments'}，列表格式的文件没有keyword
+    """
+    meta = {}
+    note_count = 0
+    total_expected_comments = 0
+    # 根节点为对象时笔记在 notes 下，为列表时根节点本身就是笔记列表
+    note_prefix = None
+    with open(json_path, 'rb') as f:
+        for prefix, event, value in ijson.parse(f):
+            if note_prefix is None:
+                if event == 'start_map':
+                    note_prefix = 'notes.item'
+                    meta['keyword'] = '未知'
+                elif event == 'start_array':
+                    note_prefix = 'item'
+                continue
+            if prefix == note_prefix:
+                if event == 'start_map':
+                    note_count += 1
+            elif prefix == note_prefix + '.interact_info.comment_count':
+                try:
+                    # 将字符串转为整数（去掉可能的逗号等）
+                    total_expected_comments += int(str(value).replace(',', ''))
+                except (TypeError, ValueError):
+                    pass
+            elif prefix == 'query' and event == 'string':
+                meta['keyword'] = value
+    
+    if note_prefix == 'item' and 'search_' in filename:
+        # 尝试从文件名提取关键词
+        parts = os.path.splitext(filename)[0].split('_')
+        if len(parts) >= 2:
+            meta['keyword'] = parts[1]
+    meta['note_count'] = note_count
+    meta['total_expected_comments'] = total_expected_comments
+    return meta
+
+def _cached_json_meta(entry: os.DirEntry, file_stat) -> dict:
+    """
+    获取文件元信息，文件的修改时间和大小未变时直接复用上次的解析结果
+
+    :param entry: 目录项
+    :param file_stat: 文件的stat结果
+    :return: 同 _parse_json_meta
+    """
+    key = (file_stat.st_mtime_ns, file_stat.st_size)
+    with _META_CACHE_LOCK:
+        cached = _META_CACHE.get(entry.name)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    meta = _parse_json_meta(entry.path, entry.name)
+    with _META_CACHE_LOCK:
+        _META_CACHE[entry.name] = (key, meta)
+    return meta
+
+def _scan_json_entries():
+    """
+    列出search_results目录下的JSON文件（与glob('*.json')一致，不含隐藏文件）
+
+    :return: 目录项列表，目录不存在时返回None
+    """
+    try:
+        with os.scandir(SEARCH_RESULTS_DIR) as it:
+            return [entry for entry in it
+                    if entry.name.endswith('.json') and not entry.name.startswith('.') and entry.is_file()]
+    except FileNotFoundError:
+        return None
+
+def _json_listing_etag(json_entries) -> str:
+    """
+    根据目录修改时间、文件数和文件最新修改时间生成ETag，目录内容不变时ETag不变
+
+    :param json_entries: _scan_json_entries 返回的目录项列表
+    :return: ETag字符串
+    """
+    try:
+        dir_mtime = os.stat(SEARCH_RESULTS_DIR).st_mtime_ns
+    except FileNotFoundError:
+        dir_mtime = 0
+    stamp = (dir_mtime, len(json_entries), max((entry.stat().st_mtime_ns for entry in json_entries), default=0))
+    return hashlib.blake2b(repr(stamp).encode('utf-8'), digest_size=8).hexdigest()
+
+def _with_etag(response, etag: str):
+    """为响应设置ETag，并要求浏览器每次使用前重新验证"""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def _not_modified(etag: str):
+    """304 Not Modified 响应"""
+    return _with_etag(app.response_class(status=304), etag)
+
+def _prune_meta_cache(existing_names):
+    """移除已不存在的文件的缓存"""
+    with _META_CACHE_LOCK:
+        for name in _META_CACHE.keys() - set(existing_names):
+            del _META_CACHE[name]
+
+def _read_json_file_info(entry: os.DirEntry):
+    """
+    读取单个搜索结果文件的信息（在IO线程池中执行）
+
+    :param entry: 目录项
+    :return: 文件信息字典，读取失败时返回None
+    """
+    try:
+        file_stat = entry.stat()
+        file_info = {
+            'filename': entry.name,
+            'size': file_stat.st_size,
+            'created_time': file_stat.st_ctime,
+            'modified_time': file_stat.st_mtime
+        }
+        
+        # 尝试读取文件内容获取更多信息
+        try:
+            file_info.update(_cached_json_meta(entry, file_stat))
+        except Exception:
+            file_info['note_count'] = 0
+            file_info['keyword'] = '未知'
+            file_info['total_expected_comments'] = 0
+        
+        return file_info
+        
+    except Exception as e:
+        logger.warning(f"处理文件 {entry.path} 时出错: {e}")
+        return None
+
+def _count_json_file_notes(entry: os.DirEntry) -> int:
+    """统计单个搜索结果文件中的笔记数，读取失败时返回0"""
+    try:
+        return _cached_json_meta(entry, entry.stat())['note_count']
+    except Exception:
+        return 0
+
 @app.route('/api/list-json-files')
 def list_json_files():
     """获取search_results目录下的所有JSON文件信息"""
     try:
-        files_info = []
-        search_dir = Path(SEARCH_RESULTS_DIR)
+        json_entries = _scan_json_entries()
         
-        if not search_dir.exists():
+        if json_entries is None:
             return jsonify({
                 'success': True,
                 'files': [],
                 'message': 'search_results目录不存在'
             })
         
-        # 遍历所有JSON文件
-        for json_file in search_dir.glob('*.json'):
-            try:
-                file_stat = json_file.stat()
-                file_info = {
-                    'filename': json_file.name,
-                    'size': file_stat.st_size,
-                    'created_time': file_stat.st_ctime,
-                    'modified_time': file_stat.st_mtime
-                }
-                
-                # 尝试读取文件内容获取更多信息
-                try:
-                    with open(json_file, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-
-                        # 提取关键词和笔记数量
-                        if isinstance(data, dict):
-                            file_info['keyword'] = data.get('query', '未知')
-                            notes = data.get('notes', [])
-                            file_info['note_count'] = len(notes)
-
-                            # 统计预期评论总数
-                            total_expected_comments = 0
-                            for note in notes:
-                                interact_info = note.get('interact_info', {})
-                                comment_count_str = interact_info.get('comment_count', '0')
-                                try:
-                                    # 将字符串转为整数（去掉可能的逗号等）
-                                    comment_count = int(str(comment_count_str).replace(',', ''))
-                                    total_expected_comments += comment_count
-                                except:
-                                    pass
-                            file_info['total_expected_comments'] = total_expected_comments
-
-                        elif isinstance(data, list):
-                            file_info['note_count'] = len(data)
-                            # 尝试从文件名提取关键词
-                            if 'search_' in json_file.name:
-                                parts = json_file.stem.split('_')
-                                if len(parts) >= 2:
-                                    file_info['keyword'] = parts[1]
-
-                            # 统计预期评论总数
-                            total_expected_comments = 0
-                            for note in data:
-                                interact_info = note.get('interact_info', {})
-                                comment_count_str = interact_info.get('comment_count', '0')
-                                try:
-                                    comment_count = int(str(comment_count_str).replace(',', ''))
-                                    total_expected_comments += comment_count
-                                except:
-                                    pass
-                            file_info['total_expected_comments'] = total_expected_comments
-                except:
-                    file_info['note_count'] = 0
-                    file_info['keyword'] = '未知'
-                    file_info['total_expected_comments'] = 0
-                
-                files_info.append(file_info)
-                
-            except Exception as e:
-                logger.warning(f"处理文件 {json_file} 时出错: {e}")
-                continue
+        # 目录内容未变化时直接返回304，跳过读取文件
+        etag = _json_listing_etag(json_entries)
+        if request.if_none_match.contains(etag):
+            return _not_modified(etag)
+        
+        # 并发读取所有JSON文件，磁盘等待时间相互重叠
+        files_info = [info for info in _IO_POOL.map(_read_json_file_info, json_entries)
+                      if info is not None]
+        _prune_meta_cache(entry.name for entry in json_entries)
         
         # 按创建时间排序（最新的在前）
         files_info.sort(key=lambda x: x['created_time'], reverse=True)
         
-        return jsonify({
+        response = jsonify({
             'success': True,
             'files': files_info,
             'total': len(files_info)
         })
+        return _with_etag(response, etag)
         
     except Exception as e:
         return jsonify({
@@ -195,7 +321,7 @@ def view_json(filename):
     """查看JSON文件内容"""
     try:
         # 安全检查：确保文件名不包含路径遍历
-        if '..' in filename or '/' in filename or '\\' in filename:
+        if not _safe_name(filename):
             return jsonify({
                 'success': False,
                 'message': '非法文件名'
@@ -209,8 +335,7 @@ def view_json(filename):
                 'message': '文件不存在'
             }), 404
         
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = json.load(f)
+        content = _fast_load_json(file_path)
         
         return jsonify({
             'success': True,
@@ -224,22 +349,172 @@ def view_json(filename):
             'message': f'读取文件失败: {str(e)}'
         }), 500
 
+def _parse_one_file(filename: str, options: Dict[str, Any]):
+    """
+    解析单个搜索结果文件（在文件级线程池中执行）
+
+    :param filename: 文件名
+    :param options: 解析参数（save_format、include_comments等）
+    :return: (是否成功, 输出目录或错误信息)
+    """
+    logger.info(f"正在处理文件: {filename}")
+    json_path = os.path.join(SEARCH_RESULTS_DIR, filename)
+
+    try:
+        os.stat(json_path)
+    except FileNotFoundError:
+        logger.error(f"文件不存在: {filename}")
+        return False, '文件不存在'
+
+    # 生成输出目录名
+    if options['output_name']:
+        output_dir = options['output_name']
+    else:
+        # 从文件名提取信息作为输出目录名
+        base_name = Path(filename).stem
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_dir = f"parsed_{base_name}_{timestamp}"
+
+    # 检查Cookie池是否有可用账号
+    if len(cookie_pool.accounts) == 0:
+        logger.error(f"Cookie池中没有可用账号")
+        return False, '没有可用的Cookie账号，请检查号池'
+
+    logger.info(f"开始解析文件，Cookie池将自动重试所有账号")
+
+    # 解析器实例保存了当前批次的进度状态，每个文件单独创建
+    parser = JsonToFullData(cookie_pool=cookie_pool)
+
+    # 调用解析函数（内部会自动使用Cookie池重试）
+    try:
+        success, message, stats = parser.process_json_to_full_data(
+            json_file_path=json_path,
+            cookies_str=None,  # 不再需要手动传Cookie，由Cookie池管理
+            output_dir=output_dir,
+            include_comments=options['include_comments'],
+            download_media=options['download_media'],
+            save_format=options['save_format'],
+            min_completion_rate=options['min_completion_rate'],
+            force_retry=options['force_retry'],
+            resume_incomplete=options['resume_incomplete'],
+            max_concurrency=options['max_concurrency']
+        )
+
+        if success:
+            notes_count = stats.get('total_notes', 0) if isinstance(stats, dict) else 1
+            comments_count = stats.get('total_comments', 0)
+            logger.info(f"文件 {filename} 解析成功: 共{notes_count}条笔记, {comments_count}条评论")
+        else:
+            logger.error(f"文件 {filename} 解析失败: {message}")
+
+    except Exception as e:
+        logger.error(f"文件 {filename} 解析异常: {e}")
+        success = False
+        message = str(e)
+
+    return (True, output_dir) if success else (False, message)
+
+def _parse_files(files_to_parse: List[str], options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    并发解析多个搜索结果文件，线程数不超过Cookie池账号数
+
+    :param files_to_parse: 文件名列表
+    :param options: 解析参数（save_format、include_comments等）
+    :return: 统计结果 {success_count, failed_count, failed_files, output_paths}
+    """
+    # 统计结果
+    results = {
+        'success_count': 0,
+        'failed_count': 0,
+        'failed_files': [],
+        'output_paths': []
+    }
+
+    # 指定了输出目录名时所有文件写入同一目录，只能逐个处理
+    if options['output_name']:
+        max_workers = 1
+    else:
+        max_workers = max(1, min(len(files_to_parse), len(cookie_pool.accounts)))
+    logger.info(f"Cookie池状态: {len(cookie_pool.accounts)} 个账号，同时解析 {max_workers} 个文件")
+
+    # 批量处理文件
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(_parse_one_file, filename, options): filename
+                   for filename in files_to_parse}
+        for future in as_completed(futures):
+            filename = futures[future]
+            try:
+                success, detail = future.result()
+            except Exception as e:
+                success, detail = False, str(e)
+
+            if success:
+                results['success_count'] += 1
+                results['output_paths'].append(detail)
+            else:
+                results['failed_count'] += 1
+                results['failed_files'].append({
+                    'filename': filename,
+                    'error': detail
+                })
+
+    logger.info(f"解析任务完成: 成功 {results['success_count']} 个, 失败 {results['failed_count']} 个")
+    return results
+
+def _run_parse_job(job_id: str, files_to_parse: List[str], options: Dict[str, Any]):
+    """在任务线程池中执行解析任务，并更新任务状态"""
+    _update_parse_job(job_id, status='running', message=f'正在解析 {len(files_to_parse)} 个文件...')
+    try:
+        results = _parse_files(files_to_parse, options)
+        _update_parse_job(
+            job_id,
+            status='completed',
+            results=results,
+            message=f'处理完成: 成功 {results["success_count"]} 个, 失败 {results["failed_count"]} 个'
+        )
+    except Exception as e:
+        logger.error(f"解析任务 {job_id} 异常: {e}")
+        _update_parse_job(job_id, status='failed', message=f'解析过程出错: {str(e)}')
+
+def _update_parse_job(job_id: str, **fields):
+    """在锁内更新解析任务状态"""
+    with _parse_jobs_lock:
+        job = _parse_jobs.get(job_id)
+        if job is not None:
+            job.update(fields)
+
+def _add_parse_job(job_id: str, job: Dict[str, Any]):
+    """登记解析任务，超过上限时移除最早的已结束任务"""
+    with _parse_jobs_lock:
+        _parse_jobs[job_id] = job
+        if len(_parse_jobs) > MAX_PARSE_JOBS:
+            for old_id, old_job in _parse_jobs.items():
+                if old_job['status'] in ('completed', 'failed'):
+                    del _parse_jobs[old_id]
+                    break
+
 @app.route('/api/parse-json', methods=['POST'])
 def parse_json():
-    """解析JSON文件并获取完整数据"""
+    """
+    解析JSON文件并获取完整数据
+    请求中 async 为 true 时放入后台任务队列立即返回 job_id，通过 /api/parse-json/status/<job_id> 查询结果
+    """
     try:
         data = request.json
         files_to_parse = data.get('files', [])
-        save_format = data.get('save_format', 'all')
-        include_comments = data.get('include_comments', True)
-        download_media = data.get('download_media', True)
-        output_name = data.get('output_name', '')
-        # 新增参数
-        min_completion_rate = data.get('min_completion_rate', 0.9)
-        force_retry = data.get('force_retry', False)
-        resume_incomplete = data.get('resume_incomplete', False)
+        options = {
+            'save_format': data.get('save_format', 'all'),
+            'include_comments': data.get('include_comments', True),
+            'download_media': data.get('download_media', True),
+            'output_name': data.get('output_name', ''),
+            # 新增参数
+            'min_completion_rate': data.get('min_completion_rate', 0.9),
+            'force_retry': data.get('force_retry', False),
+            'resume_incomplete': data.get('resume_incomplete', False),
+            'max_concurrency': data.get('max_concurrency'),  # 同时处理的笔记数，默认按Cookie池账号数
+        }
 
-        logger.info(f"开始解析任务: 文件数={len(files_to_parse)}, 格式={save_format}, 评论={include_comments}, 媒体={download_media}")
+        logger.info(f"开始解析任务: 文件数={len(files_to_parse)}, 格式={options['save_format']}, 评论={options['include_comments']}, 媒体={options['download_media']}")
 
         if not files_to_parse:
             return jsonify({
@@ -247,99 +522,25 @@ def parse_json():
                 'message': '没有选择要解析的文件'
             }), 400
 
-        # 创建解析器实例，传入Cookie池
-        parser = JsonToFullData(cookie_pool=cookie_pool)
-        logger.info(f"解析器已初始化，Cookie池状态: {len(cookie_pool.accounts)} 个账号")
-
-        # 统计结果
-        results = {
-            'success_count': 0,
-            'failed_count': 0,
-            'failed_files': [],
-            'output_paths': []
-        }
-
-        # 批量处理文件
-        for filename in files_to_parse:
-            try:
-                logger.info(f"正在处理文件: {filename}")
-                json_path = os.path.join(SEARCH_RESULTS_DIR, filename)
-
-                if not os.path.exists(json_path):
-                    logger.error(f"文件不存在: {filename}")
-                    results['failed_count'] += 1
-                    results['failed_files'].append({
-                        'filename': filename,
-                        'error': '文件不存在'
-                    })
-                    continue
-
-                # 生成输出目录名
-                if output_name:
-                    output_dir = output_name
-                else:
-                    # 从文件名提取信息作为输出目录名
-                    base_name = Path(filename).stem
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    output_dir = f"parsed_{base_name}_{timestamp}"
-
-                # 检查Cookie池是否有可用账号
-                if len(cookie_pool.accounts) == 0:
-                    logger.error(f"Cookie池中没有可用账号")
-                    results['failed_count'] += 1
-                    results['failed_files'].append({
-                        'filename': filename,
-                        'error': '没有可用的Cookie账号，请检查号池'
-                    })
-                    continue
-
-                logger.info(f"开始解析文件，Cookie池将自动重试所有账号")
-
-                # 调用解析函数（内部会自动使用Cookie池重试）
-                try:
-                    success, message, stats = parser.process_json_to_full_data(
-                        json_file_path=json_path,
-                        cookies_str=None,  # 不再需要手动传Cookie，由Cookie池管理
-                        output_dir=output_dir,
-                        include_comments=include_comments,
-                        download_media=download_media,
-                        save_format=save_format,
-                        min_completion_rate=min_completion_rate,
-                        force_retry=force_retry,
-                        resume_incomplete=resume_incomplete
-                    )
-
-                    if success:
-                        notes_count = stats.get('total_notes', 0) if isinstance(stats, dict) else 1
-                        comments_count = stats.get('total_comments', 0)
-                        logger.info(f"文件 {filename} 解析成功: 共{notes_count}条笔记, {comments_count}条评论")
-                    else:
-                        logger.error(f"文件 {filename} 解析失败: {message}")
+        if data.get('async'):
+            job_id = str(uuid.uuid4())
+            _add_parse_job(job_id, {
+                'status': 'pending',
+                'message': '任务已创建，等待执行...',
+                'files': files_to_parse,
+                'create_time': time.time(),
+                'results': None
+            })
+            _PARSE_JOB_POOL.submit(_run_parse_job, job_id, files_to_parse, options)
+            return jsonify({
+                'success': True,
+                'job_id': job_id,
+                'message': '解析任务已加入队列'
+            })
 
-                except Exception as e:
-                    logger.error(f"文件 {filename} 解析异常: {e}")
-                    success = False
-                    message = str(e)
-
-                if success:
-                    results['success_count'] += 1
-                    results['output_paths'].append(output_dir)
-                else:
-                    results['failed_count'] += 1
-                    results['failed_files'].append({
-                        'filename': filename,
-                        'error': message
-                    })
-                    
-            except Exception as e:
-                results['failed_count'] += 1
-                results['failed_files'].append({
-                    'filename': filename,
-                    'error': str(e)
-                })
+        results = _parse_files(files_to_parse, options)
 
         # 返回结果
-        logger.info(f"解析任务完成: 成功 {results['success_count']} 个, 失败 {results['failed_count']} 个")
         return jsonify({
             'success': True,
             'results': results,
@@ -352,6 +553,22 @@ def parse_json():
             'message': f'解析过程出错: {str(e)}'
         }), 500
 
+@app.route('/api/parse-json/status/<job_id>')
+def parse_json_status(job_id):
+    """查询后台解析任务状态"""
+    with _parse_jobs_lock:
+        job = _parse_jobs.get(job_id)
+        job = dict(job) if job is not None else None
+    if job is None:
+        return jsonify({
+            'success': False,
+            'message': '任务不存在'
+        }), 404
+    return jsonify({
+        'success': True,
+        'job': {'job_id': job_id, **job}
+    })
+
 @app.route('/api/delete-json', methods=['POST'])
 def delete_json():
     """删除JSON文件"""
@@ -370,20 +587,22 @@ def delete_json():
         
         for filename in files_to_delete:
             try:
+                file_path = os.path.join(_SEARCH_DIR_ABS, filename)
+                
                 # 安全检查
-                if '..' in filename or '/' in filename or '\\' in filename:
+                if (not _safe_name(filename)
+                        or os.path.commonpath([_SEARCH_DIR_ABS, os.path.normpath(file_path)]) != _SEARCH_DIR_ABS):
                     failed_files.append({
                         'filename': filename,
                         'error': '非法文件名'
                     })
                     continue
                 
-                file_path = Path(SEARCH_RESULTS_DIR) / filename
-                
-                if file_path.exists():
-                    file_path.unlink()
+                # 直接删除，文件不存在时由异常判断，省去一次stat
+                try:
+                    os.unlink(file_path)
                     deleted_count += 1
-                else:
+                except FileNotFoundError:
                     failed_files.append({
                         'filename': filename,
                         'error': '文件不存在'
@@ -413,32 +632,29 @@ def system_info():
     """获取系统信息"""
     try:
         # 统计信息
-        search_dir = Path(SEARCH_RESULTS_DIR)
-        json_files = list(search_dir.glob('*.json')) if search_dir.exists() else []
+        json_entries = _scan_json_entries()
+        dir_exists = json_entries is not None
+        json_entries = json_entries or []
         
-        total_notes = 0
-        for json_file in json_files:
-            try:
-                with open(json_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    if isinstance(data, dict):
-                        notes = data.get('notes', [])
-                        total_notes += len(notes)
-                    elif isinstance(data, list):
-                        total_notes += len(data)
-            except:
-                continue
+        # 目录内容未变化时直接返回304，跳过统计
+        etag = _json_listing_etag(json_entries)
+        if request.if_none_match.contains(etag):
+            return _not_modified(etag)
         
-        return jsonify({
+        total_notes = sum(_IO_POOL.map(_count_json_file_notes, json_entries))
+        _prune_meta_cache(entry.name for entry in json_entries)
+        
+        response = jsonify({
             'success': True,
             'info': {
-                'total_json_files': len(json_files),
+                'total_json_files': len(json_entries),
                 'total_notes': total_notes,
                 'cookies_configured': bool(cookies_str),
                 'base_path': base_path,
-                'search_results_dir': str(search_dir.absolute()) if search_dir.exists() else None
+                'search_results_dir': os.path.abspath(SEARCH_RESULTS_DIR) if dir_exists else None
             }
         })
+        return _with_etag(response, etag)
         
     except Exception as e:
         return jsonify({
@@ -695,16 +911,15 @@ def list_parsed_dirs():
                 # 如果有进度文件，读取进度信息
                 if dir_info['has_progress']:
                     try:
-                        with open(progress_file, 'r', encoding='utf-8') as f:
-                            progress_data = json.load(f)
-                            dir_info['progress'] = {
-                                'task_id': progress_data.get('task_id'),
-                                'json_source': progress_data.get('json_source'),
-                                'start_time': progress_data.get('start_time'),
-                                'last_update': progress_data.get('last_update'),
-                                'total_notes': progress_data.get('total_notes', 0),
-                                'statistics': progress_data.get('statistics', {})
-                            }
+                        progress_data = _fast_load_json(progress_file)
+                        dir_info['progress'] = {
+                            'task_id': progress_data.get('task_id'),
+                            'json_source': progress_data.get('json_source'),
+                            'start_time': progress_data.get('start_time'),
+                            'last_update': progress_data.get('last_update'),
+                            'total_notes': progress_data.get('total_notes', 0),
+                            'statistics': progress_data.get('statistics', {})
+                        }
                     except Exception as e:
                         logger.warning(f"读取进度文件失败: {progress_file}, 错误: {e}")
                         dir_info['progress'] = None
@@ -747,18 +962,16 @@ def list_all_notes():
                 progress_file = os.path.join(item, 'progress.json')
                 if os.path.exists(progress_file):
                     try:
-                        with open(progress_file, 'r', encoding='utf-8') as f:
-                            prog = json.load(f)
-                            # 保存这个输出目录的进度数据
-                            progress_data[item] = prog
+                        prog = _fast_load_json(progress_file)
+                        # 保存这个输出目录的进度数据
+                        progress_data[item] = prog
                     except:
                         pass
 
         # 2. 遍历所有JSON文件，提取笔记信息
         for json_file in search_dir.glob('*.json'):
             try:
-                with open(json_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
+                data = _fast_load_json(json_file)
 
                 # 提取笔记列表
                 notes = []
@@ -909,8 +1122,7 @@ def parse_single_note():
             }), 404
 
         try:
-            with open(json_path, 'r', encoding='utf-8') as f:
-                file_data = json.load(f)
+            file_data = _fast_load_json(json_path)
 
             # 查找目标笔记
             notes = file_data.get('notes', []) if isinstance(file_data, dict) else file_data
@@ -940,12 +1152,11 @@ def parse_single_note():
                 progress_file = os.path.join(item, 'progress.json')
                 if os.path.exists(progress_file):
                     try:
-                        with open(progress_file, 'r', encoding='utf-8') as f:
-                            prog = json.load(f)
-                            if note_id in prog.get('notes_progress', {}):
-                                output_dir = item
-                                logger.info(f"找到现有进度目录: {output_dir}")
-                                break
+                        prog = _fast_load_json(progress_file)
+                        if note_id in prog.get('notes_progress', {}):
+                            output_dir = item
+                            logger.info(f"找到现有进度目录: {output_dir}")
+                            break
                     except:
                         pass
 
@@ -1009,7 +1220,7 @@ def get_progress(dirname):
     """获取指定目录的进度详情"""
     try:
         # 安全检查
-        if '..' in dirname or '/' in dirname or '\\' in dirname:
+        if not _safe_name(dirname):
             return jsonify({
                 'success': False,
                 'message': '非法目录名'
@@ -1023,8 +1234,8 @@ def get_progress(dirname):
                 'message': '进度文件不存在'
             }), 404
 
-        with open(progress_file, 'r', encoding='utf-8') as f:
-            progress_data = json.load(f)
+        # 快照之后的评论进度记录在追加日志中，一并读取
+        progress_data = load_progress_snapshot(dirname)
 
         # 读取源JSON文件获取真实的预期评论数
         json_source = progress_data.get('json_source', '')
@@ -1032,22 +1243,21 @@ def get_progress(dirname):
 
         if json_source and os.path.exists(json_source):
             try:
-                with open(json_source, 'r', encoding='utf-8') as f:
-                    source_data = json.load(f)
-                    source_notes = []
-                    if isinstance(source_data, dict):
-                        source_notes = source_data.get('notes', [])
-                    elif isinstance(source_data, list):
-                        source_notes = source_data
-
-                    for note in source_notes:
-                        note_id = note.get('note_id', '')
-                        interact_info = note.get('interact_info', {})
-                        comment_count_str = interact_info.get('comment_count', '0')
-                        try:
-                            expected_comments_map[note_id] = int(str(comment_count_str).replace(',', ''))
-                        except:
-                            expected_comments_map[note_id] = 0
+                source_data = _fast_load_json(json_source)
+                source_notes = []
+                if isinstance(source_data, dict):
+                    source_notes = source_data.get('notes', [])
+                elif isinstance(source_data, list):
+                    source_notes = source_data
+
+                for note in source_notes:
+                    note_id = note.get('note_id', '')
+                    interact_info = note.get('interact_info', {})
+                    comment_count_str = interact_info.get('comment_count', '0')
+                    try:
+                        expected_comments_map[note_id] = int(str(comment_count_str).replace(',', ''))
+                    except:
+                        expected_comments_map[note_id] = 0
             except:
                 pass
 
@@ -1148,7 +1358,7 @@ def main():
     logger.info("💡 提示: 按 Ctrl+C 停止服务")
     logger.info("=" * 50)
 
-    app.run(debug=True, host='0.0.0.0', port=5001)
+    serve_app(app, port=5001)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -1,9 +1,20 @@
+import functools
 import os
 from loguru import logger
-from dotenv import load_dotenv
+from dotenv import dotenv_values, find_dotenv
+
+@functools.lru_cache(maxsize=None)
+def env_values():
+    """解析一次.env文件并缓存结果（未找到.env时返回空字典）"""
+    env_file = find_dotenv()
+    if not env_file:
+        return {}
+    return {key: value for key, value in dotenv_values(env_file).items() if value is not None}
 
 def load_env():
-    load_dotenv()
+    # 与load_dotenv()一致：已存在的环境变量不覆盖
+    for key, value in env_values().items():
+        os.environ.setdefault(key, value)
     cookies_str = os.getenv('COOKIES')
     return cookies_str
 
@@ -20,3 +31,52 @@ def init():
         'excel': excel_base_path,
     }
     return cookies_str, base_path
+
+def install_orjson_provider(app):
+    """
+    让Flask的jsonify/request.json使用orjson编解码（未安装orjson时保持默认实现）
+    :param app: Flask应用
+    """
+    try:
+        import orjson
+    except ImportError:
+        return
+    from flask.json.provider import DefaultJSONProvider
+
+    class OrjsonJSONProvider(DefaultJSONProvider):
+        def dumps(self, obj, **kwargs):
+            option = orjson.OPT_NON_STR_KEYS
+            if kwargs.get('sort_keys', self.sort_keys):
+                option |= orjson.OPT_SORT_KEYS
+            if kwargs.get('indent'):
+                option |= orjson.OPT_INDENT_2
+            try:
+                return orjson.dumps(obj, option=option).decode('utf-8')
+            except TypeError:
+                # orjson不支持的类型（如Decimal、超过64位的整数）交给默认实现
+                return super().dumps(obj, **kwargs)
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+
+    app.json = OrjsonJSONProvider(app)
+
+def serve_app(app, host='0.0.0.0', port=8888, threads=16):
+    """
+    启动Flask应用：设置XHS_DEBUG环境变量时使用带重载的调试服务器，
+    否则优先使用waitress多线程服务，未安装waitress时退回多线程开发服务器
+    :param app: Flask应用
+    :param host: 监听地址
+    :param port: 监听端口
+    :param threads: 处理请求的线程数
+    """
+    if os.environ.get('XHS_DEBUG'):
+        app.run(debug=True, host=host, port=port)
+        return
+    try:
+        from waitress import serve
+    except ImportError:
+        logger.warning('未安装waitress，使用Flask开发服务器（pip install waitress）')
+        app.run(debug=False, host=host, port=port, threaded=True)
+        return
+    serve(app, host=host, port=port, threads=threads)
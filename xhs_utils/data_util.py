@@ -176,18 +176,27 @@ def handle_comment_info(data):
         'pictures': pictures,
     }
 def save_to_xlsx(datas, file_path, type='note'):
-    wb = openpyxl.Workbook()
-    ws = wb.active
     if type == 'note':
         headers = ['笔记id', '笔记url', '笔记类型', '用户id', '用户主页url', '昵称', '头像url', '标题', '描述', '点赞数量', '收藏数量', '评论数量', '分享数量', '视频封面url', '视频地址url', '图片地址url列表', '标签', '上传时间', 'ip归属地']
     elif type == 'user':
         headers = ['用户id', '用户主页url', '用户名', '头像url', '小红书号', '性别', 'ip地址', '介绍', '关注数量', '粉丝数量', '作品被赞和收藏数量', '标签']
     else:
         headers = ['笔记id', '笔记url', '评论id', '用户id', '用户主页url', '昵称', '头像url', '评论内容', '评论标签', '点赞数量', '上传时间', 'ip归属地', '图片地址url列表']
+    rows = ([norm_text(str(v)) for v in data.values()] for data in datas)
+    save_to_xlsx_streaming(rows, file_path, headers)
+
+def save_to_xlsx_streaming(rows_iter, file_path, headers):
+    """
+    以只写模式逐行写入Excel，datas可以是生成器，内存占用与行数无关
+    :param rows_iter: 行数据（列表）的可迭代对象
+    :param file_path: 保存路径
+    :param headers: 表头
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet()
     ws.append(headers)
-    for data in datas:
-        data = {k: norm_text(str(v)) for k, v in data.items()}
-        ws.append(list(data.values()))
+    for row in rows_iter:
+        ws.append(row)
     wb.save(file_path)
     logger.info(f'数据保存至 {file_path}')
 